@@ -0,0 +1,84 @@
+"""
+Benchmarks loading a synthetic .lvbitx file: the time and peak Python memory
+of parsing it with Bitfile(), and the time of loading it again through
+load_bitfile()'s in-process and on-disk caches.
+
+The bitfile has the given number of U32 registers, a cluster register with
+the given number of fixed-point elements, and a bitstream of the given
+number of megabytes.
+
+Usage:
+    python benchmarks/bench_bitfile.py [registers] [cluster elements] [bitstream MB]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from helpers import measure
+import nifpga.bitfile
+from nifpga.bitfile import Bitfile, load_bitfile
+from nifpga.tests.test_bitfile import (bitfile_xml_string,
+                                       cluster_type_descriptor,
+                                       fixpoint_flattened_type,
+                                       register_xml_string)
+
+
+def _cluster_register(number_of_elements):
+    elements = "".join("<FXP><Name>e%d</Name></FXP>" % i
+                       for i in range(number_of_elements))
+    datatype = ("<Cluster><Name>Cluster</Name><TypeList>%s</TypeList></Cluster>"
+                % elements)
+    flattened = cluster_type_descriptor(*[fixpoint_flattened_type("405F", 16, 8, 1)
+                                          for _ in range(number_of_elements)])
+    return register_xml_string("Cluster", datatype, flattened, offset=0x8)
+
+
+def _write_bitfile(path, number_of_registers, number_of_elements, bitstream_mb):
+    registers = [register_xml_string("U32 %d" % i, "<U32></U32>", "000C40070000",
+                                     offset=0x10 + 4 * i)
+                 for i in range(number_of_registers)]
+    registers.append(_cluster_register(number_of_elements))
+    with open(path, "w") as bitfile:
+        bitfile.write(bitfile_xml_string(registers, [],
+                                         bitstream="0" * (bitstream_mb << 20)))
+
+
+def main():
+    number_of_registers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    number_of_elements = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    bitstream_mb = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "bench.lvbitx")
+        _write_bitfile(path, number_of_registers, number_of_elements, bitstream_mb)
+        print("%d registers, %d cluster elements, %d MB bitstream (%.1f MB file)"
+              % (number_of_registers, number_of_elements, bitstream_mb,
+                 os.path.getsize(path) / float(1 << 20)))
+
+        # NumPy is imported the first time a datatype needs it; import it
+        # first so the parse is not charged for it
+        seconds = timeit.timeit(lambda: __import__("numpy"), number=1)
+        print("%-24s %10.2f ms" % ("import numpy", seconds * 1e3))
+
+        seconds, peak = measure(lambda: Bitfile(path))
+        print("%-24s %10.2f ms %10.2f MB peak"
+              % ("Bitfile()", seconds * 1e3, peak / float(1 << 20)))
+
+        cache_dir = os.path.join(directory, "cache")
+        load_bitfile(path, cache_dir=cache_dir)
+        seconds, _ = measure(lambda: load_bitfile(path), number=1000)
+        print("%-24s %10.2f ms" % ("load_bitfile(), memory", seconds * 1e3))
+
+        def load_from_disk():
+            nifpga.bitfile._bitfile_cache.clear()
+            load_bitfile(path, cache_dir=cache_dir)
+        seconds, _ = measure(load_from_disk, number=10)
+        print("%-24s %10.2f ms" % ("load_bitfile(), disk", seconds * 1e3))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmarks the steady state cost of register and FIFO accesses, counts how
+many buffers are handed to the driver while doing so, and measures the
+memory one call allocates.
+
+A stand-in for _NiFpga does no work except to keep a reference to every
+buffer it is passed, so each distinct buffer it sees is one the register or
+FIFO wrapper created for the driver. With per-object buffer reuse the count
+is one per thread, independent of the number of calls. read(out=...) passes
+a new ctypes view of the caller's array on every call instead.
+
+Reusing the driver's buffer does not make a call allocation-free, so the
+peak memory tracemalloc traces during one call is printed too. It includes
+the values returned, e.g. the new array read(as_numpy=True) returns, and
+small ctypes and Python objects such as the view read(out=...) creates,
+which stays the same size however long the register is.
+
+Usage:
+    python benchmarks/bench_buffers.py [number of calls]
+"""
+import ctypes
+import sys
+import threading
+
+import numpy as np
+from helpers import BitfileFifo, BitfileRegister, measure
+from nifpga.nifpga import DataType
+from nifpga.session import _ArrayRegister, _FIFO, _Register  # noqa: E402
+
+
+class _RecordingNiFpga(object):
+    def __init__(self):
+        self.buffers = []
+
+    def __getitem__(self, name):
+        buffers = self.buffers
+        # Scalar writes pass their value, everything else passes a buffer as
+        # the third argument.
+        is_scalar_write = name.startswith("Write") and name[5:] in [str(d) for d in DataType]
+        records_buffer = not is_scalar_write
+
+        def function(*args):
+            if records_buffer:
+                buffers.append(args[2])
+            return 0
+        return function
+
+
+def _count_buffers(name, create, call, number, threads=1):
+    nifpga = _RecordingNiFpga()
+    target = create(nifpga)
+
+    def run():
+        for _ in range(number):
+            call(target)
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    distinct = len(set(id(b) for b in nifpga.buffers))
+    seconds, peak = measure(lambda: call(target), number=number)
+    print("%-34s %2d thread(s): %8d calls, %5d driver buffers, %6.2f us/call, %6d B peak/call"
+          % (name, threads, number * threads, distinct, 1e6 * seconds, peak))
+
+
+def main(number):
+    session = ctypes.c_uint32(0)
+    out = np.empty(256, dtype=np.int16)
+    large_out = np.empty(16384, dtype=np.int16)
+    benchmarks = [
+        ("_Register.read",
+         lambda nifpga: _Register(session, nifpga, BitfileRegister(DataType.U32), 0),
+         lambda register: register.read()),
+        ("_ArrayRegister.read",
+         lambda nifpga: _ArrayRegister(session, nifpga, BitfileRegister(DataType.I16, 256), 0),
+         lambda register: register.read(as_numpy=True)),
+        ("_ArrayRegister.read(out=)",
+         lambda nifpga: _ArrayRegister(session, nifpga, BitfileRegister(DataType.I16, 256), 0),
+         lambda register: register.read(out=out)),
+        ("_ArrayRegister.read, 16384",
+         lambda nifpga: _ArrayRegister(session, nifpga, BitfileRegister(DataType.I16, 16384), 0),
+         lambda register: register.read(as_numpy=True)),
+        ("_ArrayRegister.read(out=), 16384",
+         lambda nifpga: _ArrayRegister(session, nifpga, BitfileRegister(DataType.I16, 16384), 0),
+         lambda register: register.read(out=large_out)),
+        ("_ArrayRegister.write",
+         lambda nifpga: _ArrayRegister(session, nifpga, BitfileRegister(DataType.I16, 256), 0),
+         lambda register: register.write(range(256))),
+        ("_FIFO.read",
+         lambda nifpga: _FIFO(session, nifpga, BitfileFifo()),
+         lambda fifo: fifo.read(1024)),
+    ]
+    for name, create, call in benchmarks:
+        for threads in (1, 4):
+            _count_buffers(name, create, call, number, threads)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
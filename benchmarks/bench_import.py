@@ -0,0 +1,43 @@
+"""
+Benchmarks the time it takes a new Python process to import nifpga, which
+command line tools and boot scripts pay on every run, and lists which heavy
+modules the import pulls in.
+
+Each import is timed in a fresh interpreter, less the time of starting an
+interpreter that imports nothing.
+
+Usage:
+    python benchmarks/bench_import.py [runs]
+"""
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HEAVY_MODULES = ["numpy", "future", "ctypes.util"]
+
+
+def _run(code):
+    subprocess.check_call([sys.executable, "-c", code], cwd=ROOT)
+
+
+def _seconds(code, runs):
+    return min(timeit.repeat(lambda: _run(code), number=1, repeat=runs))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    startup = _seconds("pass", runs)
+    for statement in ["import nifpga", "import nifpga; nifpga.FifoTimeoutError",
+                      "from nifpga.bitfile import Bitfile"]:
+        seconds = _seconds(statement, runs) - startup
+        print("%-45s %8.1f ms" % (statement, seconds * 1e3))
+    loaded = subprocess.check_output(
+        [sys.executable, "-c", "import sys, nifpga; print(' '.join(m for m in %r if m in sys.modules))"
+         % HEAVY_MODULES], cwd=ROOT).decode().split()
+    print("heavy modules imported by 'import nifpga': %s" % (", ".join(loaded) or "none"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Stand-ins and measurements shared by the benchmarks.
+
+The stand-ins for the registers and FIFOs of a parsed bitfile let the
+benchmarks create _Register, _ArrayRegister and _FIFO objects without an
+.lvbitx file.
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nifpga.nifpga import DataType  # noqa: E402
+
+
+class BitfileRegister(object):
+    """ Stands in for a nifpga.bitfile.Register. """
+    def __init__(self, datatype, num_elements=1):
+        self.name = str(datatype)
+        self.datatype = datatype
+        self.offset = 0
+        self._num_elements = num_elements
+
+    def __len__(self):
+        return self._num_elements
+
+    def is_array(self):
+        return self._num_elements > 1
+
+    def access_may_timeout(self):
+        return False
+
+
+class BitfileFifo(object):
+    """ Stands in for a nifpga.bitfile.Fifo of U32. """
+    name = "Fifo"
+    number = 0
+    datatype = DataType.U32
+
+
+def measure(function, number=1):
+    """ Returns the seconds per call of function, and the peak memory of
+    one more call, traced separately since tracing slows it down. """
+    seconds = timeit.timeit(function, number=number) / number
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
@@ -1,7 +1,40 @@
-from .status import *
+from .status import (check_status, add_call_hook, remove_call_hook,
+                     WARN_ALWAYS, WARN_AGGREGATE, WARN_INTERVAL,
+                     set_warning_policy, get_warning_policy,
+                     get_warning_summary, reset_warning_summary,
+                     Status, WarningStatus, ErrorStatus, UnknownWarning,
+                     UnknownError, error_codes, codes_to_exception_classes)
 from .statuscheckedlibrary import FunctionInfo, StatusCheckedLibrary
 from .nifpga import *
 from .session import Session
-from .bitfile import Bitfile
+from .bitfile import Bitfile, load_bitfile
+from .bitfileindex import build_index, find_bitfile
+from .datalogger import RegisterSampler, NpyChunkWriter
+from .profiler import CallProfiler
+from . import status as _status
+import sys as _sys
+
+# the status classes, e.g. FifoTimeoutError, are not created until they are
+# used, so list them for "from nifpga import *"
+__all__ = sorted(set(name for name in globals() if not name.startswith("_"))
+                 | set(_status.__all__))
+
+
+def __getattr__(name):
+    # status classes, e.g. FifoTimeoutError, are created on first use
+    try:
+        return getattr(_status, name)
+    except AttributeError:
+        raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(dir(_status)))
+
+
+if _sys.version_info < (3, 7):
+    # module __getattr__ is not supported, so export the classes that status
+    # has already created
+    globals().update((name, getattr(_status, name)) for name in _status.__all__)
 
 # flake8: noqa
@@ -1,7 +1,29 @@
+import hashlib
+import json
 import os
+import tempfile
+import threading
 import warnings
-from xml.etree.ElementTree import ElementTree
-from nifpga import DataType, parseFlattenedFixpoint, parseFlattenedCluster
+from collections import OrderedDict
+from xml.etree.ElementTree import iterparse
+from nifpga import (DataType, ArrayDatatype, ClusterDatatype, FixpointDatatype,
+                    ComplexFixpointDatatype, parseFlattenedFixpoint,
+                    parseFlattenedCluster)
+
+
+# Paths below the root element of the elements Bitfile reads
+_SIGNATURE_PATH = ("SignatureRegister",)
+_REGISTER_PATH = ("VI", "RegisterList", "Register")
+_NIFPGA_PATH = ("Project", "CompilationResultsTree", "CompilationResults", "NiFpga")
+_BASE_ADDRESS_PATH = _NIFPGA_PATH + ("BaseAddressOnDevice",)
+_CHANNEL_PATH = _NIFPGA_PATH + ("DmaChannelAllocationList", "Channel")
+_BITSTREAM_PATH = ("Bitstream",)
+# The elements below the root holding every register and DMA channel
+_SECTION_PATHS = (("VI",), ("Project",))
+
+
+def _is_within(path, ancestor_path):
+    return len(path) > len(ancestor_path) and path[:len(ancestor_path)] == ancestor_path
 
 
 class Bitfile(object):
@@ -10,32 +32,97 @@ class Bitfile(object):
     Bitfile is a class that parses and contains the data from the XML based
     .lvbitx file.  This class can be used to lookup registers and FIFOs and
     is mostly intended to be used by Session.
+
+    With header_only, only the signature, base address and the names of the
+    registers and FIFOs are read, without parsing their datatypes, which is
+    enough to index bitfiles. registers and fifos are then empty.
     """
-    def __init__(self, filepath):
+    def __init__(self, filepath, header_only=False):
         self._filepath = os.path.abspath(filepath)
-        tree = ElementTree().parse(self._filepath)
-        self._signature = tree.find("SignatureRegister").text.upper()
-
-        project = tree.find("Project")
-        nifpga = project.find("CompilationResultsTree") \
-                        .find("CompilationResults") \
-                        .find("NiFpga")
-        self._base_address_on_device = int(nifpga.find("BaseAddressOnDevice").text)
+        self._header_only = header_only
+        self._signature = None
+        self._base_address_on_device = None
         self._registers = {}
-        for reg_xml in tree.find("VI").find("RegisterList"):
-            try:
-                reg = Register(reg_xml)
-                if reg.datatype is not None:
-                    assert reg.name not in self._registers, \
-                        "One or more registers have the same name '%s', this is not supported" % reg.name
-                    self._registers[reg.name] = reg
-            except RuntimeError as E:
-                print ("Cannot read register %s: %s" % (reg_xml, E))
-
         self._fifos = {}
-        for channel_xml in nifpga.find("DmaChannelAllocationList"):
-            fifo = Fifo(channel_xml)
-            self._fifos[fifo.name] = fifo
+        self._register_names = []
+        self._fifo_names = []
+        self._parse()
+
+    @classmethod
+    def from_values(cls, filepath, signature, base_address_on_device,
+                    registers, fifos):
+        """ Returns a Bitfile made of already parsed parts, without reading
+        the file, e.g. in a module generated by nifpga.codegen.
+
+        Args:
+            filepath (str): The path of the .lvbitx file.
+            signature (str): The signature of the bitfile.
+            base_address_on_device (int): The base address of the registers.
+            registers (list): The Registers of the bitfile.
+            fifos (list): The Fifos of the bitfile.
+        """
+        bitfile = cls.__new__(cls)
+        bitfile._filepath = os.path.abspath(filepath)
+        bitfile._header_only = False
+        bitfile._signature = signature.upper()
+        bitfile._base_address_on_device = base_address_on_device
+        bitfile._registers = dict((register.name, register) for register in registers)
+        bitfile._fifos = dict((fifo.name, fifo) for fifo in fifos)
+        bitfile._register_names = []
+        bitfile._fifo_names = []
+        return bitfile
+
+    def _parse(self):
+        """ Reads the file incrementally, keeping only the elements that are
+        needed in memory at any time, and stops at the bitstream, which
+        only the driver reads, if every section read comes before it. """
+        # the tags from the root to the current element
+        path = []
+        sections_left = set(_SECTION_PATHS)
+        for event, element in iterparse(self._filepath, events=("start", "end")):
+            if event == "start":
+                path.append(element.tag)
+                at_bitstream = tuple(path[1:]) == _BITSTREAM_PATH
+                if at_bitstream and not sections_left and self._parsed_everything():
+                    break
+                continue
+            element_path = tuple(path[1:])
+            path.pop()
+            sections_left.discard(element_path)
+            if element_path == _REGISTER_PATH:
+                if self._header_only:
+                    self._register_names.append(element.find("Name").text)
+                else:
+                    self._add_register(element)
+            elif element_path == _CHANNEL_PATH:
+                if self._header_only:
+                    self._fifo_names.append(element.get("name"))
+                else:
+                    fifo = Fifo(element)
+                    self._fifos[fifo.name] = fifo
+            elif element_path == _SIGNATURE_PATH:
+                self._signature = element.text.upper()
+            elif element_path == _BASE_ADDRESS_PATH:
+                self._base_address_on_device = int(element.text)
+            elif _is_within(element_path, _REGISTER_PATH) or _is_within(element_path, _CHANNEL_PATH):
+                # still needed by the Register or Fifo being read
+                continue
+            element.clear()
+        if not self._parsed_everything():
+            raise RuntimeError("Bitfile '%s' has no SignatureRegister or BaseAddressOnDevice" % self._filepath)
+
+    def _parsed_everything(self):
+        return self._signature is not None and self._base_address_on_device is not None
+
+    def _add_register(self, reg_xml):
+        try:
+            reg = Register(reg_xml)
+            if reg.datatype is not None:
+                assert reg.name not in self._registers, \
+                    "One or more registers have the same name '%s', this is not supported" % reg.name
+                self._registers[reg.name] = reg
+        except (RuntimeError, ValueError) as E:
+            print("Cannot read register %s: %s" % (reg_xml.find("Name").text, E))
 
     @property
     def filepath(self):
@@ -62,6 +149,25 @@ class Bitfile(object):
         """
         return self._fifos
 
+    @property
+    def header_only(self):
+        """ Returns whether only the header of the bitfile was read. """
+        return self._header_only
+
+    @property
+    def register_names(self):
+        """ Returns the sorted names of the registers in the bitfile. """
+        if self._header_only:
+            return sorted(self._register_names)
+        return sorted(self._registers)
+
+    @property
+    def fifo_names(self):
+        """ Returns the sorted names of the FIFOs in the bitfile. """
+        if self._header_only:
+            return sorted(self._fifo_names)
+        return sorted(self._fifos)
+
     def base_address_on_device(self):
         """ Returns the base address on the device.  This is the offset on the
         device that Registers are located at.  So a Registers offset is
@@ -70,6 +176,191 @@ class Bitfile(object):
         return self._base_address_on_device
 
 
+# The number of Bitfiles load_bitfile keeps in memory
+_BITFILE_CACHE_SIZE = 16
+# Bump when the layout of on-disk cache entries changes. Entries written by
+# another version of this package are parsed again too.
+_BITFILE_CACHE_FORMAT = 2
+# The environment variable that enables load_bitfile's on-disk cache
+BITFILE_CACHE_DIR_ENV = "NIFPGA_BITFILE_CACHE_DIR"
+
+_bitfile_cache = OrderedDict()
+_bitfile_cache_lock = threading.Lock()
+
+
+def load_bitfile(filepath, cache_dir=None):
+    """ Returns the Bitfile of an .lvbitx file, only parsing the file if it
+    was not loaded before or has changed since.
+
+    Parsed bitfiles are kept in an in-process cache of the most recently used
+    bitfiles, keyed by the absolute path, modification time and size of the
+    file. If cache_dir is given, or the NIFPGA_BITFILE_CACHE_DIR environment
+    variable is set, parsed bitfiles are also written to that directory as
+    JSON and reused by later processes as long as the file's modification
+    time, size and signature still match. Entries written by another version
+    of this package are ignored.
+
+    Args:
+        filepath (str): The path of the .lvbitx file.
+        cache_dir (str): The directory of the on-disk cache.
+
+    Returns:
+        (Bitfile): The parsed bitfile, shared with other callers.
+    """
+    filepath = os.path.abspath(filepath)
+    stat = os.stat(filepath)
+    key = (filepath, stat.st_mtime, stat.st_size)
+    with _bitfile_cache_lock:
+        bitfile = _bitfile_cache.pop(key, None)
+        if bitfile is not None:
+            _bitfile_cache[key] = bitfile
+            return bitfile
+
+    if cache_dir is None:
+        cache_dir = os.environ.get(BITFILE_CACHE_DIR_ENV)
+    bitfile = None
+    if cache_dir:
+        bitfile = _load_cached_bitfile(cache_dir, key)
+    if bitfile is None:
+        bitfile = Bitfile(filepath)
+        if cache_dir:
+            _store_cached_bitfile(cache_dir, key, bitfile)
+
+    with _bitfile_cache_lock:
+        _bitfile_cache[key] = bitfile
+        while len(_bitfile_cache) > _BITFILE_CACHE_SIZE:
+            _bitfile_cache.popitem(last=False)
+    return bitfile
+
+
+def read_signature(filepath):
+    """ Returns the signature of an .lvbitx file, reading only as much of the
+    file as needed to find it. """
+    for _, element in iterparse(filepath):
+        if element.tag == "SignatureRegister":
+            return element.text.upper()
+    raise RuntimeError("Bitfile '%s' has no SignatureRegister" % filepath)
+
+
+def _package_version():
+    """ Returns the version in the VERSION file the build writes next to
+    this module, or None if there is none. """
+    try:
+        with open(os.path.join(os.path.dirname(__file__), "VERSION")) as version_file:
+            return version_file.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _datatype_values(datatype):
+    """ Returns datatype as plain JSON values that _datatype_from_values()
+    turns back into it. """
+    if isinstance(datatype, DataType):
+        return ["DataType", datatype.name]
+    if isinstance(datatype, ComplexFixpointDatatype):
+        return ["ComplexFixpoint", datatype.name, datatype._integer, datatype._fractional]
+    if isinstance(datatype, FixpointDatatype):
+        return ["Fixpoint", datatype.name, datatype._integer, datatype._fractional,
+                datatype._signed]
+    if isinstance(datatype, ArrayDatatype):
+        return ["Array", _datatype_values(datatype.element_datatype), len(datatype)]
+    if isinstance(datatype, ClusterDatatype):
+        return ["Cluster", [[name, _datatype_values(element)]
+                            for name, element in datatype._elements]]
+    raise TypeError("Cannot cache datatype %s" % datatype)
+
+
+def _datatype_from_values(values):
+    kind = values[0]
+    if kind == "DataType":
+        return DataType[values[1]]
+    if kind == "ComplexFixpoint":
+        return ComplexFixpointDatatype(*values[1:])
+    if kind == "Fixpoint":
+        return FixpointDatatype(*values[1:])
+    if kind == "Array":
+        return ArrayDatatype(_datatype_from_values(values[1]), values[2])
+    if kind == "Cluster":
+        return ClusterDatatype([(name, _datatype_from_values(element))
+                                for name, element in values[1]])
+    raise ValueError("Unknown cached datatype %r" % kind)
+
+
+def _cached_bitfile_path(cache_dir, filepath):
+    digest = hashlib.sha1(filepath.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest + ".json")
+
+
+def _load_cached_bitfile(cache_dir, key):
+    """ Returns the Bitfile cached for key, or None if there is none or it is
+    out of date. """
+    try:
+        with open(_cached_bitfile_path(cache_dir, key[0]), "r") as cached:
+            contents = json.load(cached)
+        if contents["format"] != _BITFILE_CACHE_FORMAT \
+                or contents["version"] != _package_version() \
+                or tuple(contents["key"]) != key:
+            return None
+        if read_signature(key[0]) != contents["signature"]:
+            return None
+        return Bitfile.from_values(
+            filepath=key[0],
+            signature=contents["signature"],
+            base_address_on_device=contents["base_address_on_device"],
+            registers=[Register.from_values(name, offset, _datatype_from_values(datatype),
+                                            num_elements, is_array, access_may_timeout,
+                                            internal)
+                       for name, offset, datatype, num_elements, is_array,
+                       access_may_timeout, internal in contents["registers"]],
+            fifos=[Fifo.from_values(name, number, _datatype_from_values(datatype))
+                   for name, number, datatype in contents["fifos"]])
+    except Exception:
+        # missing, partially written or from an incompatible version
+        return None
+
+
+def _replace_file(source, destination):
+    """ Renames source to destination, replacing destination if it exists. """
+    if hasattr(os, "replace"):
+        os.replace(source, destination)
+    else:  # Python 2
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+
+def _store_cached_bitfile(cache_dir, key, bitfile):
+    """ Writes bitfile to the on-disk cache. The cache is only an
+    optimization, so failing to write it is not an error. """
+    try:
+        contents = json.dumps({
+            "format": _BITFILE_CACHE_FORMAT,
+            "version": _package_version(),
+            "key": key,
+            "signature": bitfile.signature,
+            "base_address_on_device": bitfile.base_address_on_device(),
+            "registers": [[register.name, register.offset, _datatype_values(register.datatype),
+                           len(register), register.is_array(), register.access_may_timeout(),
+                           register.is_internal()]
+                          for register in bitfile.registers.values()],
+            "fifos": [[fifo.name, fifo.number, _datatype_values(fifo.datatype)]
+                      for fifo in bitfile.fifos.values()],
+        })
+    except TypeError as e:
+        warnings.warn("Could not cache bitfile '%s': %s" % (key[0], e))
+        return
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # write and rename, so readers never see a partially written file
+        fd, temporary_path = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, "w") as temporary:
+            temporary.write(contents)
+        _replace_file(temporary_path, _cached_bitfile_path(cache_dir, key[0]))
+    except (IOError, OSError) as e:
+        warnings.warn("Could not write bitfile cache in '%s': %s" % (cache_dir, e))
+
+
 class Register(object):
     def __init__(self, reg_xml):
         """
@@ -122,24 +413,42 @@ class Register(object):
             self._is_array = False
             typeholder = datatype
             self._num_elements = 1
-        for child in typeholder.getchildren():
+        for child in typeholder:
             self._datatype = None
             for datatype in DataType:
                 if str(datatype).lower() in child.tag.lower():
                     self._datatype = datatype
             if self._datatype is None:
                 typeName = child.tag.upper()
-                if self._is_array:
+                if self._is_array and typeName not in ['FXP', 'CFXP', 'CLUSTER']:
                     warnings.warn("Array for type %s not supported!" % typeName)
                     continue
 
                 if typeName in ['FXP', 'CFXP']:
                     self._datatype = parseFlattenedFixpoint(typeName, flattened)
+                    if self._is_array:
+                        self._datatype = ArrayDatatype(self._datatype, self._num_elements)
                 elif typeName == 'CLUSTER':
+                    # parses arrays of clusters, too
                     self._datatype = parseFlattenedCluster(reg_xml)
                 else:
                     warnings.warn("Register '%s' has unsupported type" % self._name)
 
+    @classmethod
+    def from_values(cls, name, offset, datatype, num_elements=1, is_array=False,
+                    access_may_timeout=False, internal=False):
+        """ Returns a Register from already parsed values instead of its
+        XML. """
+        register = cls.__new__(cls)
+        register._name = name
+        register._offset = offset
+        register._datatype = datatype
+        register._num_elements = num_elements
+        register._is_array = is_array
+        register._access_may_timeout = access_may_timeout
+        register._internal = internal
+        return register
+
     def __len__(self):
         """ Returns the number of elements in this register. """
         return self._num_elements
@@ -183,18 +492,48 @@ class Register(object):
             import ipdb; ipdb.set_trace()
 
 
+def _parseFifoFixpoint(subtype, datatype_xml):
+    """ Returns the datatype of a fixed-point DMA channel, whose word length
+    and integer word length apply to each part of a complex number. """
+    signed = datatype_xml.find("Signed").text.lower() == "true"
+    word_length = int(datatype_xml.find("WordLength").text)
+    integer_word_length = int(datatype_xml.find("IntegerWordLength").text)
+    prefix = "I" if signed else "U"
+    name = "%s%d.%d" % (prefix, integer_word_length, word_length - integer_word_length)
+    if subtype == "CFXP":
+        return ComplexFixpointDatatype(name=name, integer=integer_word_length,
+                                       fractional=word_length - integer_word_length)
+    return FixpointDatatype(name=name, integer=integer_word_length,
+                            fractional=word_length - integer_word_length,
+                            signed=signed)
+
+
 class Fifo(object):
     def __init__(self, channel_xml):
         self._name = channel_xml.attrib["name"]
         self._number = int(channel_xml.find("Number").text)
-        # title() will change SGL/DBL/FXP to Sgl/Dbl/Fxp
-        string_datatype = channel_xml.find("DataType").find("SubType").text.title()
+        datatype_xml = channel_xml.find("DataType")
+        subtype = datatype_xml.find("SubType").text.upper()
         self._datatype = None
-        for datatype in DataType:
-            if str(datatype) in string_datatype:
-                self._datatype = datatype
+        if subtype in ("FXP", "CFXP"):
+            self._datatype = _parseFifoFixpoint(subtype, datatype_xml)
+        else:
+            # title() will change SGL/DBL to Sgl/Dbl
+            string_datatype = subtype.title()
+            for datatype in DataType:
+                if str(datatype) in string_datatype:
+                    self._datatype = datatype
         assert self._datatype is not None, "FIFO '%s' has unknown type" % self._name
 
+    @classmethod
+    def from_values(cls, name, number, datatype):
+        """ Returns a Fifo from already parsed values instead of its XML. """
+        fifo = cls.__new__(cls)
+        fifo._name = name
+        fifo._number = number
+        fifo._datatype = datatype
+        return fifo
+
     @property
     def datatype(self):
         """ Returns the datatype string of the FIFO. """
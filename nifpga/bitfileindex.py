@@ -0,0 +1,187 @@
+"""
+An index of the .lvbitx files in a set of directories by signature, so a
+bitfile can be found by the signature of the FPGA image it holds.
+
+The index is built with build_index(), or from the command line with::
+
+    python -m nifpga.bitfileindex index.json directory [directory ...]
+
+and used to open a session with Session.from_signature().
+
+Copyright (c) 2017 National Instruments
+"""
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import warnings
+from .bitfile import Bitfile, _replace_file, read_signature
+
+# Bump when the layout of the index file changes
+_INDEX_FORMAT = 1
+_BITFILE_EXTENSION = ".lvbitx"
+
+
+def find_bitfiles(paths):
+    """ Returns the sorted paths of the .lvbitx files in paths, which are
+    files or directories that are searched recursively. """
+    if isinstance(paths, str):
+        paths = [paths]
+    bitfiles = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, filenames in os.walk(path):
+                bitfiles.update(os.path.abspath(os.path.join(directory, filename))
+                                for filename in filenames
+                                if filename.lower().endswith(_BITFILE_EXTENSION))
+        else:
+            bitfiles.add(os.path.abspath(path))
+    return sorted(bitfiles)
+
+
+def _index_entry(filepath):
+    """ Reads the header of one bitfile in a worker process.
+
+    Returns:
+        (tuple): (filepath, signature, entry), or (filepath, None, error
+        message) if the file could not be read.
+    """
+    try:
+        stat = os.stat(filepath)
+        bitfile = Bitfile(filepath, header_only=True)
+    except Exception as e:
+        return filepath, None, "%s: %s" % (type(e).__name__, e)
+    return filepath, bitfile.signature, {
+        "path": bitfile.filepath,
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "base_address_on_device": bitfile.base_address_on_device(),
+        "registers": bitfile.register_names,
+        "fifos": bitfile.fifo_names,
+    }
+
+
+def build_index(paths, index_path=None, processes=None):
+    """ Indexes the .lvbitx files in paths by their signature.
+
+    Only the headers of the files are read, in a pool of processes. Files
+    that cannot be read are skipped with a warning. If several files have
+    the same signature, the first by path is indexed.
+
+    Args:
+        paths (str)(list): Files or directories to search for .lvbitx files.
+        index_path (str): If given, the index is written to this JSON file.
+        processes (int): The number of worker processes. None uses one per
+            CPU; 1 reads the files in this process.
+
+    Returns:
+        (dict): Each signature mapped to a dictionary of the bitfile's
+        "path", "mtime", "size", "base_address_on_device", "registers"
+        and "fifos".
+    """
+    filepaths = find_bitfiles(paths)
+    if processes == 1 or len(filepaths) < 2:
+        results = [_index_entry(filepath) for filepath in filepaths]
+    else:
+        chunksize = max(1, len(filepaths) // (4 * (processes or _cpu_count())))
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+        except ImportError:  # Python 2 without the futures backport
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = pool.map(_index_entry, filepaths, chunksize)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_index_entry, filepaths, chunksize=chunksize))
+
+    index = {}
+    for filepath, signature, entry in results:
+        if signature is None:
+            warnings.warn("Cannot index bitfile '%s': %s" % (filepath, entry))
+        elif signature in index:
+            warnings.warn("Bitfiles '%s' and '%s' have the same signature %s, indexing the first"
+                          % (index[signature]["path"], filepath, signature))
+        else:
+            index[signature] = entry
+    if index_path is not None:
+        write_index(index, index_path)
+    return index
+
+
+def _cpu_count():
+    """ Returns the number of CPUs, or 1 if it is not known. """
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def write_index(index, index_path):
+    """ Writes an index returned by build_index to a JSON file. """
+    contents = json.dumps({"format": _INDEX_FORMAT, "bitfiles": index},
+                          indent=1, sort_keys=True)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    # write and rename, so readers never see a partially written index
+    fd, temporary_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "w") as temporary:
+        temporary.write(contents)
+    _replace_file(temporary_path, index_path)
+
+
+def read_index(index_path):
+    """ Returns the index in a JSON file written by build_index. """
+    with open(index_path) as index_file:
+        contents = json.load(index_file)
+    if contents.get("format") != _INDEX_FORMAT:
+        raise RuntimeError("Bitfile index '%s' has unsupported format %s"
+                           % (index_path, contents.get("format")))
+    return contents["bitfiles"]
+
+
+def find_bitfile(signature, index):
+    """ Returns the path of the bitfile with the given signature.
+
+    The signature of the file is checked again, so an index that is out of
+    date is not silently trusted.
+
+    Args:
+        signature (str): The signature of the bitfile.
+        index (dict)(str): An index returned by build_index, or the path of
+            an index file.
+
+    Raises:
+        KeyError: If the index has no bitfile with the signature, or the
+            file no longer has it.
+    """
+    if not isinstance(index, dict):
+        index = read_index(index)
+    signature = signature.upper()
+    try:
+        path = index[signature]["path"]
+    except KeyError:
+        raise KeyError("No bitfile with signature %s in the index" % signature)
+    try:
+        found = read_signature(path)
+    except Exception:
+        found = None
+    if found != signature:
+        raise KeyError("Bitfile '%s' no longer has signature %s, rebuild the index"
+                       % (path, signature))
+    return path
+
+
+def main(argv):
+    if len(argv) < 3:
+        print("Usage: python -m nifpga.bitfileindex index.json directory [directory ...]")
+        return 2
+    index = build_index(argv[2:], index_path=argv[1])
+    print("Indexed %d bitfiles into %s" % (len(index), argv[1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,418 @@
+"""
+Records the calls made into the C API to a compact binary trace, and plays
+a trace back, to reproduce the call pattern of an application offline::
+
+    with TraceRecorder("calls.trace"):
+        run_application()
+
+    # call a library, e.g. a StatusCheckedLibrary, with the recorded calls
+    result = replay(read_trace("calls.trace"), library)
+
+    # or run the application against a stand-in that answers each call
+    # with its recorded status and output buffers
+    with mock.patch("nifpga.session._get_nifpga",
+                    return_value=TraceLibrary(read_trace("calls.trace"))):
+        run_application()
+
+To summarize a trace and time replaying it against TraceLibrary::
+
+    python -m nifpga.calltrace calls.trace
+
+A trace starts with _MAGIC, followed by records that each start with a tag
+byte: _NAME records give an entry point name an id the first time it is
+called, and _CALL records hold the name id, status, duration and
+arguments of a call. Arguments are stored as an int, float, bytes, None or
+the contents of the memory they refer to after the call, so output
+buffers hold what the driver returned.
+
+Copyright (c) 2017 National Instruments
+"""
+import ctypes
+import io
+import struct
+import sys
+import threading
+import warnings
+from collections import namedtuple
+from .status import ErrorStatus, _perf_counter, add_call_hook, remove_call_hook
+from .statuscheckedlibrary import FunctionInfo, StatusCheckedFunctions
+
+_MAGIC = b"NIFPGA-TRACE\x00\x01"
+
+# record tags
+_NAME = b"N"
+_CALL = b"C"
+
+# argument tags
+_NONE = b"n"
+_INT = b"i"
+_UNSIGNED = b"u"
+_FLOAT = b"d"
+_BYTES = b"s"
+_MEMORY = b"m"
+
+_name_header = struct.Struct("<HH")
+_call_header = struct.Struct("<HidB")
+_int64 = struct.Struct("<q")
+_uint64 = struct.Struct("<Q")
+_float64 = struct.Struct("<d")
+_uint32 = struct.Struct("<I")
+_memory_header = struct.Struct("<II")
+
+TracedCall = namedtuple("TracedCall", ["name", "args", "status", "seconds"])
+TracedCall.__doc__ = """ One call in a trace. Arguments that referred to
+memory are TracedMemory. """
+
+TracedMemory = namedtuple("TracedMemory", ["size", "data"])
+TracedMemory.__doc__ = """ The memory an argument referred to: its size,
+and its contents after the call, truncated if data is shorter. """
+
+ReplayResult = namedtuple("ReplayResult", ["calls", "seconds", "status_mismatches"])
+
+
+def _is_pointer_to_pointer(pointer_type):
+    return issubclass(pointer_type._type_, (ctypes._Pointer, ctypes.c_void_p, ctypes.c_char_p))
+
+
+def _element_count(pointer_type, next_arg):
+    """ Returns how many elements an array or pointer argument of
+    pointer_type holds: as many as the next argument says, which is how
+    the C API passes arrays, or None if the next argument is not a count. """
+    count = getattr(next_arg, "value", next_arg)
+    if _is_pointer_to_pointer(pointer_type) or not isinstance(count, int) \
+            or isinstance(count, bool):
+        return None
+    return count
+
+
+def _memory(arg, next_arg):
+    """ Returns the address and size of the memory a ctypes argument refers
+    to, or None if it does not refer to memory.
+
+    Arrays and pointers are taken to hold as many elements as the next
+    argument says, so only the elements transferred are recorded and not
+    the rest of a reused buffer. Pointers without a count hold one element,
+    and arrays without one their whole length.
+    """
+    if isinstance(arg, ctypes._Pointer):
+        address = ctypes.cast(arg, ctypes.c_void_p).value
+        if not address:
+            return None
+        count = _element_count(type(arg), next_arg)
+        return address, ctypes.sizeof(arg._type_) * (1 if count is None else count)
+    if isinstance(arg, ctypes.Array):
+        count = _element_count(type(arg), next_arg)
+        size = ctypes.sizeof(arg)
+        if count is not None:
+            size = min(size, ctypes.sizeof(arg._type_) * count)
+        return ctypes.addressof(arg), size
+    if isinstance(arg, (ctypes.Structure, ctypes.Union, ctypes._SimpleCData)):
+        return ctypes.addressof(arg), ctypes.sizeof(arg)
+    return None
+
+
+class TraceRecorder(object):
+    """
+    Appends every call made through check_status, e.g. by a Session, to a
+    binary trace while it is started.
+
+    Recording a call reads the memory its arguments refer to, so it costs
+    more than the call itself for large buffers; use max_buffer_bytes to
+    keep only the start of each buffer.
+    """
+    def __init__(self, trace, max_buffer_bytes=None):
+        """
+        Args:
+            trace (str)(file): The path of the trace file to write, or a
+                binary file object to write it to.
+            max_buffer_bytes (int): If given, at most this many bytes of the
+                memory each argument refers to are recorded.
+        """
+        if isinstance(trace, (str, bytes)):
+            self._file = io.open(trace, "wb")
+            self._owns_file = True
+        else:
+            self._file = trace
+            self._owns_file = False
+        self._max_buffer_bytes = max_buffer_bytes
+        self._name_ids = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._file.write(_MAGIC)
+
+    def __call__(self, name, function_name, args, status, seconds):
+        chunks = []
+        for i, arg in enumerate(args):
+            chunks.append(self._encode(arg, args[i + 1] if i + 1 < len(args) else None))
+        with self._lock:
+            write = self._file.write
+            name_id = self._name_ids.get(name)
+            if name_id is None:
+                name_id = self._name_ids[name] = len(self._name_ids)
+                encoded_name = name.encode("utf-8")
+                write(_NAME + _name_header.pack(name_id, len(encoded_name)) + encoded_name)
+            write(_CALL + _call_header.pack(name_id, status, seconds, len(args)))
+            write(b"".join(chunks))
+
+    def _encode(self, arg, next_arg):
+        if isinstance(arg, (ctypes.c_char_p, ctypes.c_void_p)):
+            arg = arg.value
+        if arg is None:
+            return _NONE
+        if isinstance(arg, bytes):
+            return _BYTES + _uint32.pack(len(arg)) + arg
+        if isinstance(arg, float):
+            return _FLOAT + _float64.pack(arg)
+        if isinstance(arg, int):
+            if arg >= 1 << 63:
+                return _UNSIGNED + _uint64.pack(arg)
+            return _INT + _int64.pack(arg)
+        memory = _memory(arg, next_arg)
+        if memory is None:
+            return _NONE
+        address, size = memory
+        recorded = size if self._max_buffer_bytes is None else min(size, self._max_buffer_bytes)
+        return _MEMORY + _memory_header.pack(size, recorded) + ctypes.string_at(address, recorded)
+
+    def start(self):
+        """ Starts recording calls. """
+        if not self._started:
+            add_call_hook(self)
+            self._started = True
+
+    def stop(self):
+        """ Stops recording calls and flushes the trace. """
+        if self._started:
+            remove_call_hook(self)
+            self._started = False
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        """ Stops recording calls and closes the trace, if it opened it. """
+        self.stop()
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exception_type, exception_val, trace):
+        self.close()
+
+
+def _read_exactly(trace_file, size):
+    data = trace_file.read(size)
+    if len(data) != size:
+        raise ValueError("Call trace is truncated")
+    return data
+
+
+def _read_argument(trace_file):
+    tag = _read_exactly(trace_file, 1)
+    if tag == _NONE:
+        return None
+    if tag == _INT:
+        return _int64.unpack(_read_exactly(trace_file, _int64.size))[0]
+    if tag == _UNSIGNED:
+        return _uint64.unpack(_read_exactly(trace_file, _uint64.size))[0]
+    if tag == _FLOAT:
+        return _float64.unpack(_read_exactly(trace_file, _float64.size))[0]
+    if tag == _BYTES:
+        size, = _uint32.unpack(_read_exactly(trace_file, _uint32.size))
+        return _read_exactly(trace_file, size)
+    if tag == _MEMORY:
+        size, recorded = _memory_header.unpack(_read_exactly(trace_file, _memory_header.size))
+        return TracedMemory(size, _read_exactly(trace_file, recorded))
+    raise ValueError("Unknown argument tag %r in call trace" % tag)
+
+
+def iter_trace(trace):
+    """ Yields each TracedCall in a trace written by TraceRecorder, given its
+    path or a binary file object. """
+    if isinstance(trace, (str, bytes)):
+        with io.open(trace, "rb") as trace_file:
+            for call in iter_trace(trace_file):
+                yield call
+        return
+    if trace.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError("Not a call trace")
+    names = {}
+    while True:
+        tag = trace.read(1)
+        if not tag:
+            return
+        if tag == _NAME:
+            name_id, size = _name_header.unpack(_read_exactly(trace, _name_header.size))
+            names[name_id] = _read_exactly(trace, size).decode("utf-8")
+        elif tag == _CALL:
+            name_id, status, seconds, number_of_args = \
+                _call_header.unpack(_read_exactly(trace, _call_header.size))
+            args = tuple(_read_argument(trace) for _ in range(number_of_args))
+            yield TracedCall(names[name_id], args, status, seconds)
+        else:
+            raise ValueError("Unknown record tag %r in call trace" % tag)
+
+
+def read_trace(trace):
+    """ Returns the list of TracedCalls in a trace written by TraceRecorder,
+    given its path or a binary file object. """
+    return list(iter_trace(trace))
+
+
+def _default_library_function_infos(library_function_infos):
+    if library_function_infos is None:
+        from .nifpga import _nifpga_library_function_infos
+        library_function_infos = _nifpga_library_function_infos()
+    return dict((lfi.pretty_name, lfi) for lfi in library_function_infos)
+
+
+def _replay_argument(arg, argtype):
+    """ Converts a recorded argument to one to call an entry point with. """
+    if not isinstance(arg, TracedMemory):
+        if argtype is not None and issubclass(argtype, ctypes._Pointer) \
+                and _is_pointer_to_pointer(argtype):
+            # a pointer, e.g. an IRQ context, that was passed by reference
+            # and recorded as the address it held
+            return ctypes.pointer(argtype._type_(arg))
+        return arg
+    buf = ctypes.create_string_buffer(arg.data, max(arg.size, len(arg.data), 1))
+    if argtype is None:
+        return buf
+    if issubclass(argtype, ctypes._Pointer):
+        return ctypes.cast(buf, argtype)
+    # an argument passed by value, e.g. a session handle
+    return argtype.from_buffer(buf)
+
+
+def replay(trace, library, library_function_infos=None):
+    """
+    Calls the entry points of library with each recorded call in trace, e.g.
+    to benchmark a library or the code around it with a recorded call
+    pattern.
+
+    Memory arguments are passed as new buffers holding the recorded
+    contents. Warnings are not raised, and errors are only counted when
+    the status differs from the recorded one.
+
+    Args:
+        trace (list): TracedCalls, e.g. from read_trace().
+        library (StatusCheckedFunctions): A StatusCheckedLibrary, or any
+            object whose entry points can be looked up by name.
+        library_function_infos (list): The LibraryFunctionInfos of the
+            entry points, used to convert memory arguments to their
+            argtypes. Defaults to those of library, or of the NiFpga
+            library.
+
+    Returns:
+        (ReplayResult): The number of calls, the total seconds spent in
+        them, and the number of calls whose status differs from the
+        recorded one.
+    """
+    if library_function_infos is None and hasattr(library, "_library_function_infos"):
+        infos = library._library_function_infos
+    else:
+        infos = _default_library_function_infos(library_function_infos)
+    seconds = 0.0
+    mismatches = 0
+    with warnings.catch_warnings(record=True):
+        warnings.simplefilter("always")
+        for call in trace:
+            lfi = infos.get(call.name)
+            argtypes = [named_argtype.argtype for named_argtype in lfi.named_argtypes] \
+                if lfi is not None else [None] * len(call.args)
+            args = [_replay_argument(arg, argtype)
+                    for arg, argtype in zip(call.args, argtypes)]
+            function = library[call.name]
+            status = 0
+            start = _perf_counter()
+            try:
+                function(*args)
+            except ErrorStatus as e:
+                status = e.get_code()
+            seconds += _perf_counter() - start
+            if status != min(call.status, 0):
+                mismatches += 1
+    return ReplayResult(len(trace), seconds, mismatches)
+
+
+class TraceLibrary(StatusCheckedFunctions):
+    """
+    A stand-in for the NiFpga library that answers calls with a recorded
+    trace: each call returns the status of the next recorded call, after
+    copying the recorded contents of its output buffers into the memory
+    the arguments refer to.
+
+    Raises RuntimeError from a call if it is not to the entry point the
+    trace has next, or the trace has ended.
+    """
+    def __init__(self, trace, library_function_infos=None):
+        """
+        Args:
+            trace (list): TracedCalls, e.g. from read_trace().
+            library_function_infos (list): The LibraryFunctionInfos of the
+                entry points, which say which arguments are pointers.
+                Defaults to those of the NiFpga library.
+        """
+        self._library_function_infos = _default_library_function_infos(library_function_infos)
+        self._calls = iter(trace)
+        self._lock = threading.Lock()
+        super(TraceLibrary, self).__init__([])
+
+    def _next_call(self, name):
+        with self._lock:
+            call = next(self._calls, None)
+        if call is None:
+            raise RuntimeError("Call to %s after the end of the trace" % name)
+        if call.name != name:
+            raise RuntimeError("Call to %s where the trace has %s" % (name, call.name))
+        return call
+
+    def _resolve(self, name):
+        lfi = self._library_function_infos[name]
+        argtypes = [named_argtype.argtype for named_argtype in lfi.named_argtypes]
+        # only copy into memory that pointer arguments refer to, and not the
+        # addresses that pointers to pointers held when recorded
+        outputs = [i for i, argtype in enumerate(argtypes)
+                   if issubclass(argtype, ctypes._Pointer) and not _is_pointer_to_pointer(argtype)]
+
+        def function(*args):
+            call = self._next_call(name)
+            for i in outputs:
+                recorded = call.args[i] if i < len(call.args) else None
+                if not isinstance(recorded, TracedMemory):
+                    continue
+                memory = _memory(args[i], args[i + 1] if i + 1 < len(args) else None)
+                if memory is not None:
+                    address, size = memory
+                    ctypes.memmove(address, recorded.data, min(size, len(recorded.data)))
+            return call.status
+        function.__name__ = lfi.name_in_library
+        function.argtypes = argtypes
+        return self._wrap(FunctionInfo(function=function,
+                                       name=name,
+                                       argument_names=[named_argtype.name for named_argtype in lfi.named_argtypes]))
+
+
+def main(argv):
+    if len(argv) != 2:
+        print("Usage: python -m nifpga.calltrace calls.trace")
+        return 2
+    trace = read_trace(argv[1])
+    counts = {}
+    for call in trace:
+        count, seconds = counts.get(call.name, (0, 0.0))
+        counts[call.name] = (count + 1, seconds + call.seconds)
+    print("%-32s %10s %14s" % ("entry point", "calls", "recorded ms"))
+    for name in sorted(counts):
+        count, seconds = counts[name]
+        print("%-32s %10d %14.3f" % (name, count, seconds * 1e3))
+    result = replay(trace, TraceLibrary(trace))
+    print("Replayed %d calls against TraceLibrary in %.3f ms"
+          % (result.calls, result.seconds * 1e3))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
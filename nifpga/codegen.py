@@ -0,0 +1,183 @@
+"""
+Generates a Python module from a bitfile, holding the parsed bitfile and a
+Session subclass with each register and FIFO as an attribute::
+
+    python -m nifpga.codegen myBitfilePath.lvbitx my_fpga.py
+
+    from my_fpga import MyBitfilePathSession
+    with MyBitfilePathSession(resource="RIO0") as session:
+        session.MyControl.write(4)
+
+Importing the generated module does not read the bitfile's XML, which makes
+opening a session cheaper for short-lived processes. Generate the module
+again whenever the bitfile changes; the driver refuses to open a bitfile
+whose signature does not match the generated one.
+
+Copyright (c) 2017 National Instruments
+"""
+import keyword
+import os
+import re
+import sys
+from .bitfile import Bitfile
+from .nifpga import (ArrayDatatype, ClusterDatatype, ComplexFixpointDatatype,
+                     DataType, FixpointDatatype)
+from .session import Session
+
+
+class SessionAttribute(object):
+    """ A register or FIFO as an attribute of a generated Session subclass.
+
+    The register or FIFO is looked up the first time the attribute is read
+    and then stored on the session, so every later access is a plain
+    attribute lookup.
+    """
+    def __init__(self, attribute, accessors, name):
+        """
+        Args:
+            attribute (str): The name of the attribute.
+            accessors (str): "registers" or "fifos".
+            name (str): The name of the register or FIFO.
+        """
+        self._attribute = attribute
+        self._accessors = accessors
+        self._name = name
+
+    def __get__(self, session, owner):
+        if session is None:
+            return self
+        accessor = getattr(session, self._accessors)[self._name]
+        session.__dict__[self._attribute] = accessor
+        return accessor
+
+
+def _datatype_source(datatype):
+    """ Returns the Python expression that creates datatype. """
+    if isinstance(datatype, DataType):
+        return "DataType.%s" % datatype.name
+    if isinstance(datatype, ComplexFixpointDatatype):
+        return "ComplexFixpointDatatype(%r, %d, %d)" % (
+            datatype.name, datatype._integer, datatype._fractional)
+    if isinstance(datatype, FixpointDatatype):
+        return "FixpointDatatype(%r, %d, %d, %r)" % (
+            datatype.name, datatype._integer, datatype._fractional, datatype._signed)
+    if isinstance(datatype, ArrayDatatype):
+        return "ArrayDatatype(%s, %d)" % (_datatype_source(datatype.element_datatype),
+                                          len(datatype))
+    if isinstance(datatype, ClusterDatatype):
+        return "ClusterDatatype([%s])" % ", ".join(
+            "(%r, %s)" % (name, _datatype_source(element))
+            for name, element in datatype._elements)
+    raise TypeError("Cannot generate code for datatype %s" % datatype)
+
+
+def _identifier(name, used):
+    """ Returns a Python identifier for a register or FIFO name that is not
+    a keyword, a Session attribute or in used, and adds it to used. """
+    identifier = re.sub(r"\W", "_", name)
+    if not identifier or identifier[0].isdigit():
+        identifier = "_" + identifier
+    while keyword.iskeyword(identifier) or hasattr(Session, identifier) \
+            or identifier in used:
+        identifier += "_"
+    used.add(identifier)
+    return identifier
+
+
+def _class_name(filepath):
+    basename = os.path.splitext(os.path.basename(filepath))[0]
+    words = re.split(r"[\W_]+", basename)
+    name = "".join(word[:1].upper() + word[1:] for word in words)
+    if not name or name[0].isdigit():
+        name = "Fpga" + name
+    return name + "Session"
+
+
+def generate_module(bitfile, class_name=None):
+    """ Returns the source of a module holding bitfile and a Session subclass
+    with its registers and FIFOs as attributes.
+
+    Args:
+        bitfile (str)(Bitfile): A Bitfile or the path of an .lvbitx file.
+        class_name (str): The name of the Session subclass. Defaults to the
+            name of the bitfile followed by "Session".
+    """
+    if not isinstance(bitfile, Bitfile):
+        bitfile = Bitfile(bitfile)
+    if class_name is None:
+        class_name = _class_name(bitfile.filepath)
+    registers = [bitfile.registers[name] for name in bitfile.register_names]
+    fifos = [bitfile.fifos[name] for name in bitfile.fifo_names]
+
+    lines = [
+        '"""',
+        "Registers and FIFOs of %s, generated by nifpga.codegen." % os.path.basename(bitfile.filepath),
+        "Do not edit; generate it again when the bitfile changes.",
+        '"""',
+        "from nifpga.bitfile import Bitfile, Fifo, Register",
+        "from nifpga.codegen import SessionAttribute",
+        "from nifpga.nifpga import (ArrayDatatype, ClusterDatatype, ComplexFixpointDatatype,",
+        "                           DataType, FixpointDatatype)",
+        "from nifpga.session import Session",
+        "",
+        "BITFILE = Bitfile.from_values(",
+        "    filepath=%r," % bitfile.filepath,
+        "    signature=%r," % bitfile.signature,
+        "    base_address_on_device=%d," % bitfile.base_address_on_device(),
+        "    registers=[",
+    ]
+    for register in registers:
+        lines.append("        Register.from_values(%r, %d, %s, num_elements=%d, is_array=%r, "
+                     "access_may_timeout=%r, internal=%r),"
+                     % (register.name, register.offset, _datatype_source(register.datatype),
+                        len(register), register.is_array(), register.access_may_timeout(),
+                        register.is_internal()))
+    lines.append("    ],")
+    lines.append("    fifos=[")
+    for fifo in fifos:
+        lines.append("        Fifo.from_values(%r, %d, %s),"
+                     % (fifo.name, fifo.number, _datatype_source(fifo.datatype)))
+    lines.extend([
+        "    ])",
+        "",
+        "",
+        "class %s(Session):" % class_name,
+        '    """ A Session of %s with each register and FIFO as an attribute. """'
+        % os.path.basename(bitfile.filepath),
+    ])
+    used = set()
+    for register in registers:
+        if not register.is_internal():
+            identifier = _identifier(register.name, used)
+            lines.append("    %s = SessionAttribute(%r, %r, %r)"
+                         % (identifier, identifier, "registers", register.name))
+    for fifo in fifos:
+        identifier = _identifier(fifo.name, used)
+        lines.append("    %s = SessionAttribute(%r, %r, %r)"
+                     % (identifier, identifier, "fifos", fifo.name))
+    lines.extend([
+        "",
+        "    def __init__(self, resource, **kwargs):",
+        "        super(%s, self).__init__(BITFILE, resource, **kwargs)" % class_name,
+        "",
+    ])
+    return "\n".join(lines)
+
+
+def write_module(bitfile, path, class_name=None):
+    """ Writes the module generate_module returns to path. """
+    source = generate_module(bitfile, class_name)
+    with open(path, "w") as module:
+        module.write(source)
+
+
+def main(argv):
+    if len(argv) not in (3, 4):
+        print("Usage: python -m nifpga.codegen bitfile.lvbitx module.py [ClassName]")
+        return 2
+    write_module(argv[1], argv[2], argv[3] if len(argv) == 4 else None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,201 @@
+"""
+RegisterSampler, a fixed-rate logger of controls and indicators into NumPy
+time-series buffers.
+
+Copyright (c) 2017 National Instruments
+"""
+from .nifpga import DataType
+import ctypes
+import os
+import time
+from .lazyimport import LazyModule
+
+np = LazyModule("numpy")
+
+_clock = getattr(time, "perf_counter", time.time)
+
+
+class _Column(object):
+    """ The raw, preallocated buffer of one register in a RegisterSampler.
+
+    The buffer is a ctypes array holding chunk_size samples, and every sample
+    is read by the driver straight into its row, so taking a sample does not
+    convert or allocate anything. Conversion to the register's value type
+    happens once per chunk.
+    """
+    def __init__(self, name, register, chunk_size):
+        self.name = name
+        self.register = register
+        ctype, count = register._raw_layout()
+        self.row_bytes = ctypes.sizeof(ctype) * count
+        self.raw = (ctype * (chunk_size * count))()
+        self.raw_rows = np.ctypeslib.as_array(self.raw).reshape(chunk_size, count)
+        # A single pointer that is moved from row to row by overwriting the
+        # address it holds, so no pointer object is created per sample.
+        self.row_pointer = ctypes.POINTER(ctype)()
+        self._row_address = ctypes.c_void_p.from_buffer(self.row_pointer)
+        self._base_address = ctypes.addressof(self.raw)
+
+    def read(self, row):
+        self._row_address.value = self._base_address + row * self.row_bytes
+        self.register._read_raw(self.row_pointer)
+
+    def convert(self, number_of_rows):
+        """ Returns a new array with the values of the first rows. """
+        raw_rows = self.raw_rows[:number_of_rows]
+        datatype = self.register.datatype
+        if isinstance(datatype, DataType):
+            values = raw_rows.astype(datatype._return_numpy_dtype())
+        else:
+            try:
+                values = datatype.decode_batch(raw_rows)
+            except NotImplementedError:
+                values = np.empty(number_of_rows, dtype=object)
+                for i, boolarray in enumerate(raw_rows):
+                    values[i] = datatype.fromBoolArray(boolarray)
+        if not self.register._is_array and values.ndim > 1:
+            values = values.reshape(number_of_rows)
+        return values
+
+
+class RegisterSampler(object):
+    """
+    Reads a set of controls and indicators at a fixed rate and stores the
+    samples in preallocated, columnar NumPy buffers along with a host
+    timestamp for each sample.
+
+    Samples are handed out in chunks of chunk_size samples, so memory use does
+    not grow with the length of the recording. Each chunk is a dictionary of
+    register name to a NumPy array with one row per sample, plus a
+    'timestamp' column of seconds since the epoch, so no register named
+    'timestamp' can be sampled::
+
+        with Session(bitfile="myBitfilePath.lvbitx", resource="RIO0") as session:
+            writer = NpyChunkWriter("recording")
+            sampler = RegisterSampler(session, ["Temperature", "Pressure"],
+                                      rate_hz=1000, on_chunk=writer)
+            sampler.run(duration_s=60)
+
+    If on_chunk is not given, chunks are kept in RegisterSampler.chunks.
+    """
+    def __init__(self, session, register_names, rate_hz, chunk_size=4096,
+                 on_chunk=None):
+        """
+        Args:
+            session (Session): The session to read the registers from.
+            register_names (list): Names of the registers to sample.
+            rate_hz (float): The rate at which samples are taken by run().
+            chunk_size (int): The number of samples in each chunk.
+            on_chunk (callable): Called with each full chunk. If None, chunks
+                are appended to RegisterSampler.chunks.
+        """
+        assert rate_hz > 0, "Rate must be positive: %s is invalid" % rate_hz
+        assert chunk_size > 0, "Chunk size must be positive: %s is invalid" % chunk_size
+        if "timestamp" in register_names:
+            raise ValueError("A register named 'timestamp' collides with the timestamp column")
+        self._period = 1.0 / rate_hz
+        self._chunk_size = chunk_size
+        self._columns = [_Column(name, session.registers[name], chunk_size)
+                         for name in register_names]
+        self._timestamps = np.empty(chunk_size, dtype=np.float64)
+        self._row = 0
+        self._overruns = 0
+        self.chunks = []
+        self._on_chunk = on_chunk if on_chunk is not None else self.chunks.append
+
+    @property
+    def overruns(self):
+        """ The number of samples run() took later than their scheduled time
+        by more than one period. """
+        return self._overruns
+
+    def sample(self):
+        """ Reads every register once, storing the values and the current
+        time as one sample. Flushes the chunk if it is full. """
+        row = self._row
+        self._timestamps[row] = time.time()
+        for column in self._columns:
+            column.read(row)
+        self._row = row + 1
+        if self._row == self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        """ Hands the samples taken since the last flush to on_chunk as a
+        chunk, even if the chunk is not full. """
+        if self._row == 0:
+            return
+        chunk = dict((column.name, column.convert(self._row))
+                     for column in self._columns)
+        chunk["timestamp"] = self._timestamps[:self._row].copy()
+        self._row = 0
+        self._on_chunk(chunk)
+
+    def run(self, number_of_samples=None, duration_s=None, stop_event=None):
+        """ Samples at the fixed rate until number_of_samples samples are
+        taken, duration_s seconds have passed or stop_event is set, then
+        flushes.
+
+        Samples are scheduled against absolute deadlines, so a late sample
+        does not shift the samples after it. If sampling falls more than one
+        period behind, the schedule restarts from the current time and the
+        sample is counted in overruns.
+
+        Args:
+            number_of_samples (int): Stop after this many samples.
+            duration_s (float): Stop after this many seconds.
+            stop_event (threading.Event): Stop once this event is set.
+        """
+        assert number_of_samples is not None or duration_s is not None \
+            or stop_event is not None, "run() needs a condition to stop on"
+        period = self._period
+        start = _clock()
+        deadline = start
+        taken = 0
+        try:
+            while True:
+                if number_of_samples is not None and taken >= number_of_samples:
+                    break
+                if duration_s is not None and deadline - start >= duration_s:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    break
+                delay = deadline - _clock()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -period:
+                    self._overruns += 1
+                    deadline = _clock()
+                self.sample()
+                taken += 1
+                deadline += period
+        finally:
+            self.flush()
+
+
+class NpyChunkWriter(object):
+    """
+    Saves each chunk from a RegisterSampler as one NumPy structured array in
+    its own .npy file, e.g. 'recording/chunk000000.npy'. The files can be
+    loaded without reading them into memory with
+    numpy.load(path, mmap_mode='r').
+    """
+    def __init__(self, directory, prefix="chunk"):
+        self._directory = directory
+        self._prefix = prefix
+        self._index = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __call__(self, chunk):
+        names = ["timestamp"] + sorted(name for name in chunk if name != "timestamp")
+        number_of_rows = len(chunk["timestamp"])
+        dtype = np.dtype([(name, chunk[name].dtype, chunk[name].shape[1:])
+                          for name in names])
+        records = np.empty(number_of_rows, dtype=dtype)
+        for name in names:
+            records[name] = chunk[name]
+        path = os.path.join(self._directory,
+                            "%s%06d.npy" % (self._prefix, self._index))
+        np.save(path, records)
+        self._index += 1
@@ -0,0 +1,44 @@
+"""
+LazyModule, a stand-in for a module that is only imported when it is first
+used, so importing nifpga does not pay for importing NumPy up front.
+
+Copyright (c) 2017 National Instruments
+"""
+import importlib
+
+
+class LazyModule(object):
+    """ Stands in for the module of the given name, importing it the first
+    time one of its attributes is used::
+
+        np = LazyModule("numpy")  # numpy is not imported yet
+        np.zeros(4)               # imports numpy
+
+    Once imported, the module's attributes are copied onto the stand-in, so
+    later attribute lookups cost the same as on the module itself.
+    """
+    def __init__(self, name):
+        self.__dict__["_LazyModule__name"] = name
+        self.__dict__["_LazyModule__module"] = None
+
+    def _load(self):
+        module = self.__module
+        if module is None:
+            module = importlib.import_module(self.__name)
+            self.__dict__.update(module.__dict__)
+            self.__dict__["_LazyModule__module"] = module
+        return module
+
+    def __getattr__(self, attribute):
+        # only called for attributes that are not copied yet, e.g. all of
+        # them before the import, or submodules imported later
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+        self.__dict__[attribute] = value
+
+    def __repr__(self):
+        if self.__module is None:
+            return "<lazy module '%s'>" % self.__name
+        return repr(self.__module)
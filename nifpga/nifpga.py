@@ -8,10 +8,16 @@ from .statuscheckedlibrary import (NamedArgtype,
                                    StatusCheckedLibrary,
                                    LibraryNotFoundError)
 import ctypes
+import functools
+import numbers
+import struct
+import sys
+import threading
 from enum import Enum  # Third-party enum34
-from collections import namedtuple
-import numpy as np
+from collections import namedtuple, OrderedDict
+from .lazyimport import LazyModule
 
+np = LazyModule("numpy")
 
 
 class DataType(Enum):
@@ -50,6 +56,24 @@ class DataType(Enum):
         }
         return _datatype_ctype[self]
 
+    def _return_numpy_dtype(self):
+        """ Returns the numpy dtype with the same memory layout as the
+        associated ctype of a given datatype. """
+        _datatype_numpy_dtype = {
+            DataType.Bool: np.bool_,
+            DataType.I8: np.int8,
+            DataType.U8: np.uint8,
+            DataType.I16: np.int16,
+            DataType.U16: np.uint16,
+            DataType.I32: np.int32,
+            DataType.U32: np.uint32,
+            DataType.I64: np.int64,
+            DataType.U64: np.uint64,
+            DataType.Sgl: np.float32,
+            DataType.Dbl: np.float64,
+        }
+        return np.dtype(_datatype_numpy_dtype[self])
+
 NUMBER_TO_TYPES = {
     '4001' : 'I8',
     '4002' : 'I16',
@@ -76,6 +100,14 @@ TYPE_TO_BITS = {
     'U64' : 64,
     'BOOLEAN' : 1,
     }
+def _intoOut(bits, out):
+    """ Returns bits, or copies them into out and returns out if given. """
+    if out is None:
+        return bits
+    out[:] = bits
+    return out
+
+
 # BoolArrayMappedDatatype = namedtuple("BoolArrayMappedDatatype", "name, num_bits")
 class BoolArrayMappedDatatype(object):
     num_bits = None
@@ -91,31 +123,219 @@ class BoolArrayMappedDatatype(object):
     def _return_ctype(self):
         return ctypes.c_uint8 * self.num_bits
 
-    def toBoolArray(self, data):
+    def toBoolArray(self, data, out=None):
+        """ Converts a value to a uint8 array of num_bits bits.
+
+        Args:
+            data: The value.
+            out (numpy.ndarray): A uint8 array of num_bits to fill. If None,
+                a new array is returned.
+        """
         raise NotImplementedError()
 
     def fromBoolArray(self, boolArray):
         raise NotImplementedError()
 
-def _fixpointFromBoolArray(integer, fractional, signed, boolArray):
-    num_bits = integer+fractional
+    def encode_batch(self, values, max_workers=None):
+        """ Converts N values to an (N, num_bits) uint8 bool matrix.
+
+        Args:
+            values: A sequence or array of N values.
+            max_workers (int): If given, large batches are split into chunks
+                that are converted on a pool of this many threads.
+        """
+        return _inChunks(self._encode_batch, values, max_workers)
+
+    def decode_batch(self, boolMatrix, max_workers=None, **kwargs):
+        """ Converts an (N, num_bits) bool matrix to an array of N values.
+
+        Args:
+            boolMatrix (numpy.ndarray): One row of bits per value.
+            max_workers (int): If given, large batches are split into chunks
+                that are converted on a pool of this many threads.
+        """
+        if kwargs:
+            return _inChunks(functools.partial(self._decode_batch, **kwargs),
+                             boolMatrix, max_workers)
+        return _inChunks(self._decode_batch, boolMatrix, max_workers)
+
+    def _encode_batch(self, values):
+        raise NotImplementedError()
+
+    def _decode_batch(self, boolMatrix):
+        raise NotImplementedError()
+
+
+# Batches are only split into chunks of at least this many values, so each
+# chunk amortizes the cost of handing it to a thread.
+_MIN_CHUNK_SIZE = 4096
+
+
+def _inChunks(function, items, max_workers):
+    """ Returns function(items), computed in chunks on a pool of max_workers
+    threads if max_workers is given and items is large enough to split.
+    NumPy releases the GIL in the codecs' array operations, so the chunks are
+    converted in parallel. """
+    if not max_workers or max_workers < 2 or len(items) < 2 * _MIN_CHUNK_SIZE:
+        return function(items)
+    number_of_items = len(items)
+    # a few chunks per thread, so threads finishing early pick up more work
+    chunk_size = max(_MIN_CHUNK_SIZE, -(-number_of_items // (4 * max_workers)))
+    chunks = [items[start:start + chunk_size]
+              for start in range(0, number_of_items, chunk_size)]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(function, chunks))
+    return np.concatenate(results)
+
+
+def _fixpointWeights(num_bits):
+    """ Returns the value of each bit of a num_bits wide word, MSB first. """
+    return np.left_shift(np.uint64(1), np.arange(num_bits, dtype=np.uint64)[::-1])
+
+
+def _fixpointFromBoolMatrix(fractional, signed, weights, boolMatrix):
+    """ Decodes each row of boolMatrix, MSB first, with one dot product. """
+    values = np.dot(boolMatrix.astype(np.uint64), weights)
+    return _fixpointFromIntegers(fractional, signed, len(weights), values)
+
+
+def _fixpointFromIntegers(fractional, signed, num_bits, integers):
+    """ Decodes an array of uint64 words holding num_bits wide fixed-point
+    integers in their low bits. Higher bits must be zero. """
+    values = integers
+    if signed:
+        if num_bits == 64:
+            values = values.view(np.int64)
+        else:
+            # flipping the sign bit and subtracting its weight sign extends
+            # without ever leaving the int64 range
+            sign = 1 << (num_bits - 1)
+            values = (values ^ np.uint64(sign)).astype(np.int64) - np.int64(sign)
+    return _fixpointScaleIntegers(fractional, values)
+
+
+def _fixpointScaleIntegers(fractional, integers):
+    """ Returns the fixed-point values represented by an array of integers. """
+    if fractional > 0:
+        return integers * 2.0 ** -fractional
+    return integers * (1 << -fractional)
+
+
+def _fixpointToIntegers(fractional, signed, values):
+    """ Returns the uint64 words whose bits represent an array of values. """
+    values = np.asarray(values)
+    if not signed and np.any(values < 0):
+        raise RuntimeError("Unsigned value cannot create negative number")
+    if values.dtype.kind in 'ui' and fractional == 0:
+        as_int = values
+    else:
+        as_int = np.round(values * 2.0 ** fractional)
+    return as_int.astype(np.int64 if signed else np.uint64).view(np.uint64)
+
+
+def _fixpointToBoolMatrix(fractional, signed, weights, values):
+    """ Encodes each value into a row of bits, MSB first. """
+    as_int = _fixpointToIntegers(fractional, signed, np.atleast_1d(values))
+    bits = np.bitwise_and(as_int[:, np.newaxis], weights) != 0
+    return bits.astype(np.uint8)
+
+
+# Fixed-point types at most this wide are converted with lookup tables of
+# every value of the type, at most 2**16 values per table. With the bits,
+# the values and a list of the values as Python floats, a 16 bit table takes
+# about 3.6 MB.
+_FIXPOINT_TABLE_MAX_BITS = 16
+# The total size in bytes of the tables kept for sharing between datatypes
+# of the same type, beyond those held by live datatypes.
+_FIXPOINT_TABLE_CACHE_BYTES = 32 * 1024 * 1024
+_fixpoint_tables = OrderedDict()
+_fixpoint_tables_lock = threading.Lock()
+
+
+class _FixpointTable(object):
+    """ The value and the bits of every integer of a narrow fixed-point type,
+    indexed by the integer the bits represent. """
+    def __init__(self, num_bits, fractional, signed):
+        weights = _fixpointWeights(num_bits)
+        integers = np.arange(1 << num_bits, dtype=np.uint64)
+        self.mask = (1 << num_bits) - 1
+        self.bits = (np.bitwise_and(integers[:, np.newaxis], weights) != 0).astype(np.uint8)
+        self.bits.flags.writeable = False
+        self.values = _fixpointFromBoolMatrix(fractional, signed, weights, self.bits)
+        self.values.flags.writeable = False
+        # python numbers for scalar reads
+        self.value_list = self.values.tolist()
+        # approximate, as small ints are shared
+        list_nbytes = sys.getsizeof(self.value_list) + len(self.value_list) * sys.getsizeof(self.value_list[-1])
+        self.nbytes = self.bits.nbytes + self.values.nbytes + list_nbytes
+
+
+def _packedIntegers(boolMatrix, num_bits):
+    """ Returns the integer each row of a bool matrix at most 16 bits wide
+    represents, MSB first. """
+    boolMatrix = np.asarray(boolMatrix)
+    if num_bits in (8, 16) and boolMatrix.flags.c_contiguous:
+        # whole bytes, so the rows can be packed as one stream of bits
+        packed = np.packbits(boolMatrix.reshape(-1))
+        return packed if num_bits == 8 else packed.view('>u2')
+    # float32 holds every 16 bit integer exactly, and its dot product is much
+    # faster than an integer one
+    weights = np.exp2(np.arange(num_bits - 1, -1, -1, dtype=np.float32))
+    return np.dot(boolMatrix.astype(np.float32), weights).astype(np.intp)
+
+
+def _fixpointTable(num_bits, fractional, signed):
+    """ Returns the shared _FixpointTable of a fixed-point type, building it
+    on first use, or None if the type is too wide for a table. """
+    if num_bits > _FIXPOINT_TABLE_MAX_BITS:
+        return None
+    key = (num_bits, fractional, bool(signed))
+    with _fixpoint_tables_lock:
+        table = _fixpoint_tables.get(key)
+        if table is not None:
+            _fixpoint_tables[key] = _fixpoint_tables.pop(key)
+            return table
+    table = _FixpointTable(num_bits, fractional, signed)
+    with _fixpoint_tables_lock:
+        table = _fixpoint_tables.setdefault(key, table)
+        total = sum(cached.nbytes for cached in _fixpoint_tables.values())
+        while total > _FIXPOINT_TABLE_CACHE_BYTES and len(_fixpoint_tables) > 1:
+            total -= _fixpoint_tables.popitem(last=False)[1].nbytes
+    return table
+
+
+def _fixpointFromBoolArray(fractional, signed, weights, boolArray):
+    """ Decodes boolArray, MSB first, with a dot product against the
+    precomputed weights of its bits. """
+    num_bits = len(weights)
     assert len(boolArray) == num_bits
-    vals = 2**np.arange(num_bits, dtype=np.uint64)[::-1]
-    value = (boolArray * vals).sum()
+    value = int(np.dot(boolArray, weights))
     if signed and boolArray[0]:
-        value = value - 2**num_bits
+        value = value - (1 << num_bits)
     if fractional > 0:
-        return float(value)  / 2**(fractional)
-    else:
-        return value  // 2**(fractional)
+        return value / float(1 << fractional)
+    return value * (1 << -fractional)
 
-def _fixpointToBoolArray(integer, fractional, signed, value):
+
+def _fixpointToInteger(fractional, signed, value):
+    """ Returns the (unmasked) integer whose bits represent value. """
     if value < 0 and not signed:
         raise RuntimeError("Unsigned value cannot create negative number")
-    num_bits = integer + fractional
-    as_int = int(np.round(value * 2**fractional))
-    bits = np.array([as_int & (1 << (b)) for b in range(num_bits)[::-1]])
-    return (bits != 0).astype(np.uint8)
+    if isinstance(value, numbers.Integral) and fractional >= 0:
+        return int(value) << fractional
+    # round() rounds half to even, like np.round, without going through a
+    # numpy array
+    return int(round(value * 2.0 ** fractional))
+
+
+def _fixpointToBoolArray(fractional, signed, weights, value):
+    """ Encodes value by unpacking the bits of its big-endian two's complement
+    integer representation. """
+    num_bits = len(weights)
+    as_int = _fixpointToInteger(fractional, signed, value)
+    word = struct.pack('>Q', as_int & 0xFFFFFFFFFFFFFFFF)
+    return np.unpackbits(np.frombuffer(word, dtype=np.uint8))[64 - num_bits:]
 
 
 class FixpointDatatype(BoolArrayMappedDatatype):
@@ -124,6 +344,8 @@ class FixpointDatatype(BoolArrayMappedDatatype):
         self._integer = integer
         self._fractional = fractional
         self._signed = signed
+        self._weights = _fixpointWeights(self.num_bits)
+        self._table = None
 
     def __str__(self):
         if self._signed:
@@ -134,11 +356,73 @@ class FixpointDatatype(BoolArrayMappedDatatype):
     def getEmptyValue(self):
         return 0
 
-    def toBoolArray(self, data):
-        return _fixpointToBoolArray(self._integer, self._fractional, self._signed, data)
+    def _fields(self):
+        """ Returns (width, signed, fractional) of each fixed-point field. """
+        return [(self.num_bits, self._signed, self._fractional)]
+
+    def _return_numpy_dtype(self):
+        """ Returns the NumPy type decode_batch returns values as. """
+        if self.name == 'Boolean':
+            return np.dtype(np.bool_)
+        if self._fractional > 0:
+            return np.dtype(np.float64)
+        return np.dtype(np.int64 if self._signed else np.uint64)
+
+    def __getstate__(self):
+        # the lookup table is shared, so it is looked up again after
+        # unpickling instead of being pickled with every datatype
+        state = self.__dict__.copy()
+        state['_table'] = None
+        return state
+
+    def _lookup_table(self):
+        """ Returns the lookup table of this type, or None if it is too wide
+        for one. """
+        if self._table is None:
+            self._table = _fixpointTable(self.num_bits, self._fractional, self._signed)
+        return self._table
+
+    def toBoolArray(self, data, out=None):
+        table = self._lookup_table()
+        if table is None:
+            return _intoOut(_fixpointToBoolArray(self._fractional, self._signed, self._weights, data), out)
+        bits = table.bits[_fixpointToInteger(self._fractional, self._signed, data) & table.mask]
+        if out is None:
+            return bits.copy()
+        out[:] = bits
+        return out
 
     def fromBoolArray(self, boolArray):
-        return _fixpointFromBoolArray(self._integer, self._fractional, self._signed, boolArray)
+        table = self._lookup_table()
+        if table is None:
+            return _fixpointFromBoolArray(self._fractional, self._signed, self._weights, boolArray)
+        assert len(boolArray) == self.num_bits
+        return table.value_list[int(np.dot(boolArray, self._weights))]
+
+    def _encode_batch(self, values):
+        table = self._lookup_table()
+        if table is None:
+            return _fixpointToBoolMatrix(self._fractional, self._signed, self._weights, values)
+        integers = _fixpointToIntegers(self._fractional, self._signed, np.atleast_1d(values))
+        return table.bits[integers & np.uint64(table.mask)]
+
+    def _decode_batch(self, boolMatrix):
+        table = self._lookup_table()
+        if table is None:
+            return _fixpointFromBoolMatrix(self._fractional, self._signed, self._weights, boolMatrix)
+        return table.values[_packedIntegers(boolMatrix, self.num_bits)]
+
+    def encode_words(self, values):
+        """ Converts N values to N uint64 words holding the bits of each value
+        in their low num_bits bits, as fixed-point FIFOs transfer them. """
+        mask = np.uint64((1 << self.num_bits) - 1)
+        return _fixpointToIntegers(self._fractional, self._signed, np.atleast_1d(values)) & mask
+
+    def decode_words(self, words):
+        """ Converts N uint64 words from a fixed-point FIFO to N values. """
+        mask = np.uint64((1 << self.num_bits) - 1)
+        words = np.asarray(words, dtype=np.uint64) & mask
+        return _fixpointFromIntegers(self._fractional, self._signed, self.num_bits, words)
 
 
 class ComplexFixpointDatatype(BoolArrayMappedDatatype):
@@ -146,6 +430,8 @@ class ComplexFixpointDatatype(BoolArrayMappedDatatype):
         super(ComplexFixpointDatatype, self).__init__(name, 2*(integer+fractional))
         self._integer = integer
         self._fractional = fractional
+        self._weights = _fixpointWeights(integer + fractional)
+        self._table = None
 
     def __str__(self):
         return "C%d.%d (%d bits)" % (self._integer, self._fractional, self.num_bits)
@@ -153,17 +439,160 @@ class ComplexFixpointDatatype(BoolArrayMappedDatatype):
     def getEmptyValue(self):
         return 0+0j
 
-    def toBoolArray(self, data):
-        bits_real = _fixpointToBoolArray(self._integer, self._fractional, True, np.real(data))
-        bits_imag = _fixpointToBoolArray(self._integer, self._fractional, True, np.imag(data))
-        both = np.hstack([bits_real, bits_imag])
-        return both
+    def _fields(self):
+        half = self.num_bits // 2
+        return [(half, True, self._fractional), (half, True, self._fractional)]
+
+    def _return_numpy_dtype(self):
+        return np.dtype(np.complex128)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_table'] = None
+        return state
+
+    def _lookup_table(self):
+        """ Returns the lookup table of the real and imaginary parts, or None
+        if they are too wide for one. """
+        if self._table is None:
+            self._table = _fixpointTable(self.num_bits // 2, self._fractional, True)
+        return self._table
+
+    def toBoolArray(self, data, out=None):
+        table = self._lookup_table()
+        if table is None:
+            return _intoOut(self.encode_batch(data).reshape(self.num_bits), out)
+        real = _fixpointToInteger(self._fractional, True, data.real) & table.mask
+        imag = _fixpointToInteger(self._fractional, True, data.imag) & table.mask
+        if out is None:
+            return table.bits[[real, imag]].reshape(-1)
+        half = self.num_bits // 2
+        out[:half] = table.bits[real]
+        out[half:] = table.bits[imag]
+        return out
 
     def fromBoolArray(self, boolarray):
         half = self.num_bits // 2
-        real = _fixpointFromBoolArray(self._integer, self._fractional, True, boolarray[:half])
-        imag = _fixpointFromBoolArray(self._integer, self._fractional, True, boolarray[half:])
-        return real + 1j*imag
+        table = self._lookup_table()
+        if table is None:
+            real = _fixpointFromBoolArray(self._fractional, True, self._weights, boolarray[:half])
+            imag = _fixpointFromBoolArray(self._fractional, True, self._weights, boolarray[half:])
+        else:
+            assert len(boolarray) == self.num_bits
+            real = table.value_list[int(np.dot(boolarray[:half], self._weights))]
+            imag = table.value_list[int(np.dot(boolarray[half:], self._weights))]
+        return complex(real, imag)
+
+    def _parts(self, values):
+        """ Returns an (N, 2) float64 array of the real and imaginary part of
+        N complex values, without copying complex128 input. """
+        values = np.atleast_1d(np.asarray(values, dtype=np.complex128))
+        return np.ascontiguousarray(values).reshape(-1).view(np.float64).reshape(-1, 2)
+
+    def _from_parts(self, parts, dtype):
+        """ Reinterprets an (N, 2) array of real and imaginary parts as N
+        complex values. """
+        parts = np.ascontiguousarray(parts, dtype=np.float64)
+        values = parts.view(np.complex128).reshape(-1)
+        if dtype is not None and np.dtype(dtype) != values.dtype:
+            values = values.astype(dtype)
+        return values
+
+    def _encode_batch(self, values):
+        """ Converts N complex values to an (N, num_bits) bool matrix, the
+        bits of the real part followed by those of the imaginary part. """
+        half = self.num_bits // 2
+        integers = _fixpointToIntegers(self._fractional, True, self._parts(values))
+        table = self._lookup_table()
+        if table is None:
+            bits = np.bitwise_and(integers[:, :, np.newaxis], self._weights) != 0
+            return bits.astype(np.uint8).reshape(-1, 2 * half)
+        return table.bits[integers & np.uint64(table.mask)].reshape(-1, 2 * half)
+
+    def _decode_batch(self, boolMatrix, dtype=None):
+        """ Converts an (N, num_bits) bool matrix to N complex values.
+
+        Args:
+            boolMatrix (numpy.ndarray): One row of bits per value.
+            dtype: numpy.complex64, or None for numpy.complex128.
+        """
+        half = self.num_bits // 2
+        halves = np.reshape(boolMatrix, (-1, half))
+        table = self._lookup_table()
+        if table is None:
+            parts = _fixpointFromBoolMatrix(self._fractional, True, self._weights, halves)
+        else:
+            parts = table.values[_packedIntegers(halves, half)]
+        return self._from_parts(parts.reshape(-1, 2), dtype)
+
+    def encode_words(self, values):
+        """ Converts N complex values to N uint64 words holding the bits of
+        the real part above those of the imaginary part, in the low num_bits
+        bits of each word. """
+        half = self.num_bits // 2
+        mask = np.uint64((1 << half) - 1)
+        integers = _fixpointToIntegers(self._fractional, True, self._parts(values)) & mask
+        return (integers[:, 0] << np.uint64(half)) | integers[:, 1]
+
+    def decode_words(self, words, dtype=None):
+        """ Converts N uint64 words from a FIFO to N complex values. """
+        half = self.num_bits // 2
+        mask = np.uint64((1 << half) - 1)
+        words = np.asarray(words, dtype=np.uint64)
+        integers = np.empty((len(words), 2), dtype=np.uint64)
+        np.bitwise_and(words >> np.uint64(half), mask, out=integers[:, 0])
+        np.bitwise_and(words, mask, out=integers[:, 1])
+        parts = _fixpointFromIntegers(self._fractional, True, half, integers)
+        return self._from_parts(parts, dtype)
+
+
+class ArrayDatatype(BoolArrayMappedDatatype):
+    """ A fixed size array of a BoolArrayMappedDatatype, e.g. an array of
+    fixed-point numbers. The whole array is transferred as a single bool
+    array, and all elements are converted at once with the element's batch
+    codec.
+    """
+    def __init__(self, element_datatype, size):
+        super(ArrayDatatype, self).__init__("Array of %s" % element_datatype.name,
+                                            size * element_datatype.num_bits)
+        self._element_datatype = element_datatype
+        self._size = size
+
+    def __str__(self):
+        return "Array of %d %s" % (self._size, self._element_datatype)
+
+    def _return_numpy_dtype(self):
+        return np.dtype((self._element_datatype._return_numpy_dtype(), (self._size,)))
+
+    @property
+    def element_datatype(self):
+        return self._element_datatype
+
+    def __len__(self):
+        return self._size
+
+    def getEmptyValue(self):
+        return [self._element_datatype.getEmptyValue() for _ in range(self._size)]
+
+    def toBoolArray(self, data, out=None):
+        if len(data) != self._size:
+            raise RuntimeError("Bad data length %d, expected %d" % (len(data), self._size))
+        return _intoOut(self._element_datatype.encode_batch(data).reshape(-1), out)
+
+    def fromBoolArray(self, boolarray):
+        assert len(boolarray) == self.num_bits
+        boolMatrix = np.reshape(boolarray, (self._size, self._element_datatype.num_bits))
+        return self._element_datatype.decode_batch(boolMatrix)
+
+    def _encode_batch(self, values):
+        values = np.asarray(values)
+        elements = values.reshape((-1,) + values.shape[2:])
+        return self._element_datatype.encode_batch(elements).reshape(len(values), self.num_bits)
+
+    def _decode_batch(self, boolMatrix):
+        elements = np.reshape(boolMatrix, (-1, self._element_datatype.num_bits))
+        return self._element_datatype.decode_batch(elements).reshape(len(boolMatrix), self._size)
+
 
 class dotdict(dict):
     """dot.notation access to dictionary attributes"""
@@ -172,54 +601,227 @@ class dotdict(dict):
     __delattr__ = dict.__delitem__
 
 
+class _FixpointLayout(object):
+    """ A bool array made of consecutive fixed-point fields, compiled into
+    per-bit and per-field arrays so that all fields are converted in one
+    vectorized pass.
+
+    fields is a list of (offset, width, signed, fractional). Bits that are
+    not covered by a field have a weight of 0 and are ignored when decoding.
+    """
+    def __init__(self, num_bits, fields):
+        self.num_bits = num_bits
+        self.offsets = np.array([f[0] for f in fields], dtype=np.intp)
+        self.signed = [f[2] for f in fields]
+        self.fractional = [f[3] for f in fields]
+        # XORing the sign bit and subtracting its weight sign extends each
+        # field; int64 wraparound makes this work for 64 bit fields, too.
+        sign_bits = [1 << (f[1] - 1) if f[2] else 0 for f in fields]
+        self.sign_bits = np.array(sign_bits, dtype=np.uint64)
+        self.sign_offsets = self.sign_bits.view(np.int64)
+        # weight and field index of every bit, MSB first within each field
+        self.bit_weights = np.zeros(num_bits, dtype=np.uint64)
+        self.bit_fields = np.zeros(num_bits, dtype=np.intp)
+        for i, (offset, width, signed, fractional) in enumerate(fields):
+            self.bit_weights[offset:offset + width] = _fixpointWeights(width)
+            self.bit_fields[offset:offset + width] = i
+
+    def decode(self, boolArray):
+        """ Returns the unsigned and the sign extended integers of each field
+        along the last axis of boolArray. """
+        if len(self.offsets) == 0:
+            empty = np.zeros(np.shape(boolArray)[:-1] + (0,), dtype=np.uint64)
+            return empty, empty.view(np.int64)
+        weighted = np.multiply(boolArray, self.bit_weights, dtype=np.uint64)
+        unsigned = np.add.reduceat(weighted, self.offsets, axis=-1)
+        signed = (unsigned ^ self.sign_bits).view(np.int64) - self.sign_offsets
+        return unsigned, signed
+
+    def encode(self, integers, out):
+        """ Fills out with the bits of the integer of each field along the
+        last axis of integers. """
+        if len(self.offsets) == 0:
+            out[...] = 0
+            return out
+        np.not_equal(np.bitwise_and(np.take(integers, self.bit_fields, axis=-1),
+                                    self.bit_weights), 0, out=out)
+        return out
+
+
 class ClusterDatatype(BoolArrayMappedDatatype):
+    """ A cluster of named elements, transferred as one bool array.
+
+    The fixed-point fields of all elements are compiled into a single
+    _FixpointLayout when the datatype is created, so reading or writing a
+    cluster converts all of its fields at once.
+    """
     def __init__(self, elements):
+        self.name = "Cluster"
         self._elements = elements
         self.num_bits = sum(e[1].num_bits for e in elements)
+        self._types = dotdict((name, str(typ)) for name, typ in elements)
+        self._field_names = frozenset(name for name, typ in elements)
+        # (name, datatype, offset, index of first field, number of fields)
+        # for each element. Elements that are not fixed-point numbers, e.g.
+        # nested clusters and arrays, use their own compiled codec on their
+        # slice of the bool array.
+        self._element_layout = []
+        fields = []
+        offset = 0
+        for name, typ in elements:
+            typ_fields = typ._fields() if hasattr(typ, "_fields") else []
+            self._element_layout.append((name, typ, offset, len(fields), len(typ_fields)))
+            field_offset = offset
+            for width, signed, fractional in typ_fields:
+                fields.append((field_offset, width, signed, fractional))
+                field_offset += width
+            offset += typ.num_bits
+        self._layout = _FixpointLayout(self.num_bits, fields)
 
     def __str__(self):
         return ("Cluster (%d bits)\n" % self.num_bits) + "\t\t".join("%10s : %s\n" % (n, t) for (n, t) in self._elements)
 
+    def _return_numpy_dtype(self):
+        """ Returns the structured NumPy type decode_batch returns values as,
+        with one field per element. """
+        return np.dtype([(name, typ._return_numpy_dtype()) for name, typ in self._elements])
+
     def getEmptyValue(self):
         result = dotdict()
-        result['__types__'] = dotdict()
+        result['__types__'] = dotdict(self._types)
         for name, typ in self._elements:
             result[name] = typ.getEmptyValue()
-            result['__types__'][name] = str(typ)
         return result
 
-    def toBoolArray(self, value):
-        input_fields = set(value.keys()) - set(["__types__"])
-        expected_fields = set([e[0] for e in self._elements])
-        if input_fields != expected_fields:
-            raise RuntimeError("Mismatching fields of cluster!\n\tGiven: %s\n\tExpected: %s" % (str(input_fields), str(expected_fields)))
+    def toBoolArray(self, value, out=None):
+        """ Converts the cluster value to a bool array.
 
-        parts = [typ.toBoolArray(value[name]) for name, typ in self._elements]
-        result = np.hstack(parts)
-        assert len(result) == self.num_bits
-        return result
+        Args:
+            value (dict): The value of each element by name.
+            out (numpy.ndarray): A uint8 array of num_bits to fill. If None,
+                a new array is returned.
+        """
+        input_fields = set(value.keys())
+        input_fields.discard("__types__")
+        if input_fields != self._field_names:
+            raise RuntimeError("Mismatching fields of cluster!\n\tGiven: %s\n\tExpected: %s" % (str(input_fields), str(set(self._field_names))))
+
+        layout = self._layout
+        integers = []
+        for name, typ, offset, first, count in self._element_layout:
+            if count == 1:
+                integers.append(_fixpointToInteger(layout.fractional[first],
+                                                   layout.signed[first],
+                                                   value[name]))
+            elif count == 2:
+                element = value[name]
+                integers.append(_fixpointToInteger(layout.fractional[first], True, np.real(element)))
+                integers.append(_fixpointToInteger(layout.fractional[first], True, np.imag(element)))
+        integers = np.array([i & 0xFFFFFFFFFFFFFFFF for i in integers], dtype=np.uint64)
+        if out is None:
+            out = np.empty(self.num_bits, dtype=np.uint8)
+        layout.encode(integers, out)
+        for name, typ, offset, first, count in self._element_layout:
+            if count == 0:
+                typ.toBoolArray(value[name], out=out[offset:offset + typ.num_bits])
+        return out
 
     def fromBoolArray(self, boolarray):
         assert len(boolarray) == self.num_bits
-        index = 0
-        result = self.getEmptyValue()
+        layout = self._layout
+        unsigned, signed = layout.decode(boolarray)
+        unsigned = unsigned.tolist()
+        signed = signed.tolist()
+        result = dotdict()
+        result['__types__'] = dotdict(self._types)
+        for name, typ, offset, first, count in self._element_layout:
+            if count == 0:
+                result[name] = typ.fromBoolArray(boolarray[offset:offset + typ.num_bits])
+                continue
+            values = []
+            for i in range(first, first + count):
+                value = signed[i] if layout.signed[i] else unsigned[i]
+                fractional = layout.fractional[i]
+                if fractional > 0:
+                    value = value / float(1 << fractional)
+                else:
+                    value = value * (1 << -fractional)
+                values.append(value)
+            result[name] = values[0] if count == 1 else values[0] + 1j * values[1]
+        return result
+
+    def _encode_batch(self, values):
+        """ Converts a structured array of N clusters, with a field for each
+        element, to an (N, num_bits) uint8 bool matrix. A sequence of
+        dictionaries is converted to a structured array first. """
+        values = self._as_structured(values)
+        layout = self._layout
+        integers = np.empty((len(values), len(layout.offsets)), dtype=np.uint64)
+        for name, typ, offset, first, count in self._element_layout:
+            element = values[name]
+            if count == 1:
+                integers[:, first] = _fixpointToIntegers(layout.fractional[first],
+                                                         layout.signed[first], element)
+            elif count == 2:
+                integers[:, first] = _fixpointToIntegers(layout.fractional[first], True, np.real(element))
+                integers[:, first + 1] = _fixpointToIntegers(layout.fractional[first], True, np.imag(element))
+        out = np.empty((len(values), self.num_bits), dtype=np.uint8)
+        layout.encode(integers, out)
+        for name, typ, offset, first, count in self._element_layout:
+            if count == 0:
+                out[:, offset:offset + typ.num_bits] = typ.encode_batch(values[name])
+        return out
+
+    def _as_structured(self, values):
+        """ Returns values as a structured array of this cluster's type. """
+        if isinstance(values, np.ndarray) and values.dtype.names is not None:
+            return np.atleast_1d(values)
+        if isinstance(values, dict):
+            values = [values]
+        result = np.empty(len(values), dtype=self._return_numpy_dtype())
         for name, typ in self._elements:
-            part = boolarray[index:(index+typ.num_bits)]
-            index = index + typ.num_bits
-            result[name] = typ.fromBoolArray(part)
+            column = [value[name] for value in values]
+            if isinstance(typ, ClusterDatatype):
+                column = typ._as_structured(column)
+            elif isinstance(typ, ArrayDatatype) and isinstance(typ.element_datatype, ClusterDatatype):
+                column = [typ.element_datatype._as_structured(array) for array in column]
+            result[name] = column
+        return result
+
+    def _decode_batch(self, boolMatrix):
+        """ Converts an (N, num_bits) bool matrix to a structured array of N
+        clusters, decoding all fields of all clusters at once. """
+        boolMatrix = np.asarray(boolMatrix)
+        layout = self._layout
+        unsigned, signed = layout.decode(boolMatrix)
+        result = np.empty(len(boolMatrix), dtype=self._return_numpy_dtype())
+        for name, typ, offset, first, count in self._element_layout:
+            if count == 0:
+                result[name] = typ.decode_batch(boolMatrix[:, offset:offset + typ.num_bits])
+                continue
+            fractional = layout.fractional[first]
+            values = [_fixpointScaleIntegers(fractional, signed[:, i] if layout.signed[i] else unsigned[:, i])
+                      for i in range(first, first + count)]
+            result[name] = values[0] if count == 1 else values[0] + 1j * values[1]
         return result
 
 
-def _parseFixpoint(t, flattened):
+def _parseFixpoint(t, flattened, position=0):
+    """ Returns the datatype of the fixed-point type descriptor whose type code
+    starts at position in flattened. """
     try:
-        assert flattened[:4] == TYPE_TO_NUMBER[t]
+        code = TYPE_TO_NUMBER[t]
     except KeyError:
         raise RuntimeError("type %s not supported" % t)
+    # the high byte holds flags, e.g. whether the type descriptor is named
+    if flattened[position + 2:position + 4].upper() != code[2:]:
+        raise ValueError("Type code %s at %d is not %s"
+                         % (flattened[position:position + 4], position, t))
 
-    signed = int(flattened[20:24])
-    fullStr = flattened[8:12]
+    signed = int(flattened[position + 20:position + 24])
+    fullStr = flattened[position + 8:position + 12]
     full = int(fullStr, 16)
-    frontStr = flattened[16:20]
+    frontStr = flattened[position + 16:position + 20]
     front = int(frontStr, 16)
     if front > 2**15-1:
         front = front - 2**16
@@ -236,53 +838,135 @@ def _parseFixpoint(t, flattened):
         raise RuntimeError("Unknown fixpoint type: %s" % t)
 
 
+def _integerDatatype(t):
+    """ Returns the datatype of a Boolean or integer cluster element. """
+    if t == 'BOOLEAN':
+        return FixpointDatatype(name='Boolean', integer=1, fractional=0, signed=False)
+    signed = t[0] == 'I'
+    return FixpointDatatype(name='t', integer=TYPE_TO_BITS[t], fractional=0, signed=signed)
+
+
+# The type of each type code of a type descriptor, without the flags in its
+# high byte.
+_TYPE_CODE_TO_TYPE = dict((number[2:], t.upper()) for number, t in NUMBER_TO_TYPES.items())
+_TYPE_CODE_TO_TYPE.update({'21': 'BOOLEAN', '40': 'ARRAY', '50': 'CLUSTER'})
+
+
+class _TypeDescriptor(object):
+    """ A type descriptor read from a flattened type string. """
+    __slots__ = ("type", "code_position", "dimensions", "elements")
+
+    def __init__(self, t, code_position):
+        self.type = t
+        self.code_position = code_position
+        self.dimensions = []
+        self.elements = []
+
+
+def _readTypeDescriptor(flattened, position):
+    """ Reads the type descriptor starting at position in a flattened type
+    string.
+
+    A type descriptor starts with its size in bytes, including the size
+    itself, followed by its type code. A cluster's descriptor continues with
+    its number of elements and an array's with its number of dimensions and
+    the size of each, followed by the descriptors of their elements. Since
+    every descriptor holds its size, the string is read front to back once,
+    without searching for type codes.
+
+    Returns:
+        (_TypeDescriptor, int): The descriptor, and the position of the
+        descriptor following it.
+
+    Raises:
+        ValueError: If the string does not hold a type descriptor at position.
+    """
+    size = int(flattened[position:position + 4], 16)
+    end = position + 2 * size
+    if size < 4 or end > len(flattened):
+        raise ValueError("Invalid type descriptor size %d at %d" % (size, position))
+    code = flattened[position + 6:position + 8].upper()
+    try:
+        descriptor = _TypeDescriptor(_TYPE_CODE_TO_TYPE[code], position + 4)
+    except KeyError:
+        raise ValueError("Type code %s at %d not supported" % (code, position + 4))
+    element_position = position + 4
+    if descriptor.type in ('CLUSTER', 'ARRAY'):
+        count = int(flattened[position + 8:position + 12], 16)
+        element_position = position + 12
+        if descriptor.type == 'ARRAY':
+            for _ in range(count):
+                descriptor.dimensions.append(int(flattened[element_position:element_position + 8], 16))
+                element_position += 8
+            count = 1
+        for _ in range(count):
+            element, element_position = _readTypeDescriptor(flattened, element_position)
+            descriptor.elements.append(element)
+    if element_position > end:
+        raise ValueError("Type descriptor at %d overruns its size %d" % (position, size))
+    return descriptor, end
+
+
+def _datatypeFromDescriptor(type_xml, descriptor, flattened):
+    """ Returns the datatype of a register or cluster element from its type
+    descriptor, taking the element names from its Datatype XML.
+
+    Raises:
+        ValueError: If the XML and the type descriptor do not agree.
+    """
+    t = type_xml.tag.upper()
+    if t != descriptor.type:
+        raise ValueError("Type %s does not match type descriptor %s" % (t, descriptor.type))
+    if t == 'CLUSTER':
+        elements_xml = list(type_xml.find("TypeList"))
+        if len(elements_xml) != len(descriptor.elements):
+            raise ValueError("Cluster has %d elements, its type descriptor %d"
+                             % (len(elements_xml), len(descriptor.elements)))
+        return ClusterDatatype([(element_xml.find("Name").text,
+                                 _datatypeFromDescriptor(element_xml, element, flattened))
+                                for element_xml, element in zip(elements_xml, descriptor.elements)])
+    if t == 'ARRAY':
+        size = int(type_xml.find("Size").text)
+        element_xml = list(type_xml.find("Type"))[0]
+        return ArrayDatatype(_datatypeFromDescriptor(element_xml, descriptor.elements[0], flattened), size)
+    if t in ["FXP", "CFXP"]:
+        return _parseFixpoint(t, flattened, descriptor.code_position)
+    return _integerDatatype(t)
+
+
 def parseFlattenedFixpoint(typeholder, flattened):
-    typeStr = TYPE_TO_NUMBER[typeholder]
-    pos = flattened.find(typeStr)
-    assert pos > 0
-    flattened = flattened[pos:]
-    return _parseFixpoint(typeholder, flattened)
-
-def _parseCluster(types, flattened):
-    result = []
-    for p, t in enumerate(types):
-        try:
-            typeStr = TYPE_TO_NUMBER[t]
-        except KeyError:
-            raise RuntimeError("Type %s not supported in cluster" % t)
-        pos = flattened.find(typeStr)
-        if pos == -1:
-            raise RuntimeError("Could not find type %s at %dth position!" % (t, p))
-        flattened = flattened[pos:]
-        if t in ["FXP", "CFXP"]:
-            result.append(_parseFixpoint(t, flattened))
-        elif t.upper() == 'BOOLEAN':
-            result.append(FixpointDatatype(name='Boolean', integer=1, fractional=0,signed=False))
-        else:
-            signed = t[0] == 'I'
-            result.append(FixpointDatatype(name='t', integer=TYPE_TO_BITS[t], fractional=0, signed=signed))
-        flattened = flattened[len(typeStr):]
-    return result
+    """ Returns the datatype of a fixed-point register or of the elements of
+    a fixed-point array register.
 
-def parseFlattenedCluster(reg_xml):
-    flattened = reg_xml.find("FlattenedType").text
-    typelist = reg_xml.find("Datatype").getchildren()[0].find("TypeList")
-    types = []
-    names = []
-    for C in typelist.getchildren():
-        type = C.tag.upper()
-        types.append(type)
-        name = C.find("Name").text
-        names.append(name)
-    typeDetails = _parseCluster(types, flattened)
-    bitCount = sum(x.num_bits for x in typeDetails)
-    bitCount_fromXML = int(reg_xml.find("SizeInBits").text)
-    assert bitCount == bitCount_fromXML, "Bitcount %d not equal expected value %d for cluster %s" % (bitCount, bitCount_fromXML, reg_xml.find("Name").text)
-    elements = list(zip(names, typeDetails))
-    return ClusterDatatype(elements)
+    Raises:
+        ValueError: If the flattened type is not a well-formed type
+            descriptor of typeholder, or of an array of typeholder.
+    """
+    descriptor, _ = _readTypeDescriptor(flattened, 0)
+    if descriptor.type == 'ARRAY':
+        descriptor = descriptor.elements[0]
+    if descriptor.type != typeholder:
+        raise ValueError("Type %s does not match type descriptor %s" % (typeholder, descriptor.type))
+    return _parseFixpoint(typeholder, flattened, descriptor.code_position)
 
 
+def parseFlattenedCluster(reg_xml):
+    """ Returns the datatype of a cluster or array of clusters register,
+    including nested clusters and arrays.
 
+    Raises:
+        ValueError: If the flattened type is not a well-formed type
+            descriptor, or does not match the Datatype XML.
+    """
+    flattened = reg_xml.find("FlattenedType").text
+    datatype_xml = list(reg_xml.find("Datatype"))[0]
+    descriptor, _ = _readTypeDescriptor(flattened, 0)
+    datatype = _datatypeFromDescriptor(datatype_xml, descriptor, flattened)
+    size_in_bits = reg_xml.find("SizeInBits")
+    if size_in_bits is not None:
+        bitCount_fromXML = int(size_in_bits.text)
+        assert datatype.num_bits == bitCount_fromXML, "Bitcount %d not equal expected value %d for cluster %s" % (datatype.num_bits, bitCount_fromXML, reg_xml.find("Name").text)
+    return datatype
 
 
 _SessionType = ctypes.c_uint32
@@ -294,304 +978,330 @@ CLOSE_ATTRIBUTE_NO_RESET_IF_LAST_SESSION = 1
 INFINITE_TIMEOUT = 0xffffffff
 
 
-class _NiFpga(StatusCheckedLibrary):
-    """
-    _NiFpga, a thin wrapper around the FPGA Interface C API
-
-    Defines FPGA Interface C API types, and provides the _NiFpga class
-    which loads C API symbols and allows them to be called, e.g.
-    nifpga.Open(<args>) or nifpga["ReadU32](<args>). If any NiFpga function
-    return status is non-zero, the appropriate exception derived from either
-    WarningStatus or ErrorStatus is raised.
-
-    While _NiFpga can be used directly, Session provides a higher-level and
-    more convenient API that is better-suited for most users.
-    """
+def _nifpga_library_function_infos():
+    """ Returns the LibraryFunctionInfo of every entry point of the NiFpga
+    library that _NiFpga binds. """
+    library_function_infos = [
+        LibraryFunctionInfo(
+            pretty_name="Open",
+            name_in_library="NiFpgaDll_Open",
+            named_argtypes=[
+                NamedArgtype("bitfile path", ctypes.c_char_p),
+                NamedArgtype("signature", ctypes.c_char_p),
+                NamedArgtype("resource", ctypes.c_char_p),
+                NamedArgtype("attribute", ctypes.c_uint32),
+                NamedArgtype("session", ctypes.POINTER(_SessionType)),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="Run",
+            name_in_library="NiFpgaDll_Run",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("attribute", ctypes.c_uint32),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="Close",
+            name_in_library="NiFpgaDll_Close",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("attribute", ctypes.c_uint32),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="OpenResource",
+            name_in_library="NiFpgaDll_OpenResource",
+            named_argtypes=[
+                NamedArgtype("parentSession", _SessionType),
+                NamedArgtype("parentIndex", ctypes.c_uint32),
+                NamedArgtype("globalIndex", ctypes.c_uint32),
+                NamedArgtype("childSession", ctypes.POINTER(_SessionType)),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="AddResources",
+            name_in_library="NiFpgaDll_AddResources",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("resourceNames", ctypes.POINTER(ctypes.c_char_p)),
+                NamedArgtype("resourceValues", ctypes.POINTER(ctypes.c_uint32)),
+                NamedArgtype("externalRegisters", ctypes.POINTER(ctypes.c_uint32)),
+                NamedArgtype("numberOfResources", ctypes.c_size_t),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="GetResourceIndex",
+            name_in_library="NiFpgaDll_GetResourceIndex",
+            named_argtypes=[
+                NamedArgtype("resourceName", ctypes.c_char_p),
+                NamedArgtype("resourceIndex", ctypes.POINTER(ctypes.c_uint32)),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="ReleaseResourceIndex",
+            name_in_library="NiFpgaDll_ReleaseResourceIndex",
+            named_argtypes=[
+                NamedArgtype("resourceName", ctypes.c_char_p),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="GetResourceName",
+            name_in_library="NiFpgaDll_GetResourceName",
+            named_argtypes=[
+                NamedArgtype("resourceIndex", ctypes.c_uint32),
+                NamedArgtype("resourceName", ctypes.POINTER(ctypes.c_char_p)),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="Reset",
+            name_in_library="NiFpgaDll_Reset",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="Abort",
+            name_in_library="NiFpgaDll_Abort",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="Download",
+            name_in_library="NiFpgaDll_Download",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="ReserveIrqContext",
+            name_in_library="NiFpgaDll_ReserveIrqContext",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("context", ctypes.POINTER(_IrqContextType)),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="UnreserveIrqContext",
+            name_in_library="NiFpgaDll_UnreserveIrqContext",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("context", ctypes.POINTER(_IrqContextType)),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="WaitOnIrqs",
+            name_in_library="NiFpgaDll_WaitOnIrqs",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("context", ctypes.POINTER(_IrqContextType)),
+                NamedArgtype("irqs", ctypes.c_uint32),
+                NamedArgtype("timeout ms", ctypes.c_uint32),
+                NamedArgtype("irqs asserted", ctypes.POINTER(ctypes.c_uint32)),
+                NamedArgtype("timed out", ctypes.POINTER(DataType.Bool._return_ctype())),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="AcknowledgeIrqs",
+            name_in_library="NiFpgaDll_AcknowledgeIrqs",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("irqs", ctypes.c_uint32),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="ConfigureFifo",
+            name_in_library="NiFpgaDll_ConfigureFifo",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("fifo", ctypes.c_uint32),
+                NamedArgtype("depth", ctypes.c_size_t),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="ConfigureFifo2",
+            name_in_library="NiFpgaDll_ConfigureFifo2",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("fifo", ctypes.c_uint32),
+                NamedArgtype("requested depth", ctypes.c_size_t),
+                NamedArgtype("actual depth", ctypes.POINTER(ctypes.c_size_t))
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="StartFifo",
+            name_in_library="NiFpgaDll_StartFifo",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("fifo", ctypes.c_uint32),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="StopFifo",
+            name_in_library="NiFpgaDll_StopFifo",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("fifo", ctypes.c_uint32),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="ReleaseFifoElements",
+            name_in_library="NiFpgaDll_ReleaseFifoElements",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("fifo", ctypes.c_uint32),
+                NamedArgtype("elements", ctypes.c_size_t),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="GetPeerToPeerFifoEndpoint",
+            name_in_library="NiFpgaDll_GetPeerToPeerFifoEndpoint",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("fifo", ctypes.c_uint32),
+                NamedArgtype("endpoint", ctypes.POINTER(ctypes.c_uint32)),
+            ]),
+        LibraryFunctionInfo(
+            pretty_name="ClientFunctionCall",
+            name_in_library="NiFpgaDll_ClientFunctionCall",
+            named_argtypes=[
+                NamedArgtype("session", _SessionType),
+                NamedArgtype("group", ctypes.c_uint32),
+                NamedArgtype("functionId", ctypes.c_uint32),
+                NamedArgtype("inBuffer", ctypes.c_void_p),
+                NamedArgtype("inBufferSize", ctypes.c_size_t),
+                NamedArgtype("outBuffer", ctypes.c_void_p),
+                NamedArgtype("outBufferSize", ctypes.c_size_t),
+            ])
+    ]  # list of function_infos
 
-    def __init__(self):
-        library_function_infos = [
+    for datatype in DataType:
+        type_ctype = datatype._return_ctype()
+        library_function_infos.extend([
             LibraryFunctionInfo(
-                pretty_name="Open",
-                name_in_library="NiFpgaDll_Open",
-                named_argtypes=[
-                    NamedArgtype("bitfile path", ctypes.c_char_p),
-                    NamedArgtype("signature", ctypes.c_char_p),
-                    NamedArgtype("resource", ctypes.c_char_p),
-                    NamedArgtype("attribute", ctypes.c_uint32),
-                    NamedArgtype("session", ctypes.POINTER(_SessionType)),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="Run",
-                name_in_library="NiFpgaDll_Run",
+                pretty_name="Read%s" % datatype,
+                name_in_library="NiFpgaDll_Read%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
-                    NamedArgtype("attribute", ctypes.c_uint32),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="Close",
-                name_in_library="NiFpgaDll_Close",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("attribute", ctypes.c_uint32),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="OpenResource",
-                name_in_library="NiFpgaDll_OpenResource",
-                named_argtypes=[
-                    NamedArgtype("parentSession", _SessionType),
-                    NamedArgtype("parentIndex", ctypes.c_uint32),
-                    NamedArgtype("globalIndex", ctypes.c_uint32),
-                    NamedArgtype("childSession", ctypes.POINTER(_SessionType)),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="AddResources",
-                name_in_library="NiFpgaDll_AddResources",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("resourceNames", ctypes.POINTER(ctypes.c_char_p)),
-                    NamedArgtype("resourceValues", ctypes.POINTER(ctypes.c_uint32)),
-                    NamedArgtype("externalRegisters", ctypes.POINTER(ctypes.c_uint32)),
-                    NamedArgtype("numberOfResources", ctypes.c_size_t),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="GetResourceIndex",
-                name_in_library="NiFpgaDll_GetResourceIndex",
-                named_argtypes=[
-                    NamedArgtype("resourceName", ctypes.c_char_p),
-                    NamedArgtype("resourceIndex", ctypes.POINTER(ctypes.c_uint32)),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="ReleaseResourceIndex",
-                name_in_library="NiFpgaDll_ReleaseResourceIndex",
-                named_argtypes=[
-                    NamedArgtype("resourceName", ctypes.c_char_p),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="GetResourceName",
-                name_in_library="NiFpgaDll_GetResourceName",
-                named_argtypes=[
-                    NamedArgtype("resourceIndex", ctypes.c_uint32),
-                    NamedArgtype("resourceName", ctypes.POINTER(ctypes.c_char_p)),
+                    NamedArgtype("indicator", ctypes.c_uint32),
+                    NamedArgtype("value", ctypes.POINTER(type_ctype)),
                 ]),
             LibraryFunctionInfo(
-                pretty_name="Reset",
-                name_in_library="NiFpgaDll_Reset",
+                pretty_name="Write%s" % datatype,
+                name_in_library="NiFpgaDll_Write%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
+                    NamedArgtype("control", ctypes.c_uint32),
+                    NamedArgtype("value", type_ctype),
                 ]),
             LibraryFunctionInfo(
-                pretty_name="Abort",
-                name_in_library="NiFpgaDll_Abort",
+                pretty_name="ReadArray%s" % datatype,
+                name_in_library="NiFpgaDll_ReadArray%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
+                    NamedArgtype("indicator", ctypes.c_uint32),
+                    NamedArgtype("array", ctypes.POINTER(type_ctype)),
+                    NamedArgtype("size", ctypes.c_size_t),
                 ]),
             LibraryFunctionInfo(
-                pretty_name="Download",
-                name_in_library="NiFpgaDll_Download",
+                pretty_name="WriteArray%s" % datatype,
+                name_in_library="NiFpgaDll_WriteArray%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
+                    NamedArgtype("control", ctypes.c_uint32),
+                    NamedArgtype("array", ctypes.POINTER(type_ctype)),
+                    NamedArgtype("size", ctypes.c_size_t),
                 ]),
             LibraryFunctionInfo(
-                pretty_name="ReserveIrqContext",
-                name_in_library="NiFpgaDll_ReserveIrqContext",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("context", ctypes.POINTER(_IrqContextType)),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="UnreserveIrqContext",
-                name_in_library="NiFpgaDll_UnreserveIrqContext",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("context", ctypes.POINTER(_IrqContextType)),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="WaitOnIrqs",
-                name_in_library="NiFpgaDll_WaitOnIrqs",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("context", ctypes.POINTER(_IrqContextType)),
-                    NamedArgtype("irqs", ctypes.c_uint32),
-                    NamedArgtype("timeout ms", ctypes.c_uint32),
-                    NamedArgtype("irqs asserted", ctypes.POINTER(ctypes.c_uint32)),
-                    NamedArgtype("timed out", ctypes.POINTER(DataType.Bool._return_ctype())),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="AcknowledgeIrqs",
-                name_in_library="NiFpgaDll_AcknowledgeIrqs",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("irqs", ctypes.c_uint32),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="ConfigureFifo",
-                name_in_library="NiFpgaDll_ConfigureFifo",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("fifo", ctypes.c_uint32),
-                    NamedArgtype("depth", ctypes.c_size_t),
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="ConfigureFifo2",
-                name_in_library="NiFpgaDll_ConfigureFifo2",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("fifo", ctypes.c_uint32),
-                    NamedArgtype("requested depth", ctypes.c_size_t),
-                    NamedArgtype("actual depth", ctypes.POINTER(ctypes.c_size_t))
-                ]),
-            LibraryFunctionInfo(
-                pretty_name="StartFifo",
-                name_in_library="NiFpgaDll_StartFifo",
+                pretty_name="ReadFifo%s" % datatype,
+                name_in_library="NiFpgaDll_ReadFifo%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
                     NamedArgtype("fifo", ctypes.c_uint32),
+                    NamedArgtype("data", ctypes.POINTER(type_ctype)),
+                    NamedArgtype("number of elements", ctypes.c_size_t),
+                    NamedArgtype("timeout ms", ctypes.c_uint32),
+                    NamedArgtype("elements remaining", ctypes.POINTER(ctypes.c_size_t)),
                 ]),
             LibraryFunctionInfo(
-                pretty_name="StopFifo",
-                name_in_library="NiFpgaDll_StopFifo",
+                pretty_name="WriteFifo%s" % datatype,
+                name_in_library="NiFpgaDll_WriteFifo%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
                     NamedArgtype("fifo", ctypes.c_uint32),
+                    NamedArgtype("data", ctypes.POINTER(type_ctype)),
+                    NamedArgtype("number of elements", ctypes.c_size_t),
+                    NamedArgtype("timeout ms", ctypes.c_uint32),
+                    NamedArgtype("empty elements remaining", ctypes.POINTER(ctypes.c_size_t)),
                 ]),
             LibraryFunctionInfo(
-                pretty_name="ReleaseFifoElements",
-                name_in_library="NiFpgaDll_ReleaseFifoElements",
+                pretty_name="AcquireFifoReadElements%s" % datatype,
+                name_in_library="NiFpgaDll_AcquireFifoReadElements%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
                     NamedArgtype("fifo", ctypes.c_uint32),
-                    NamedArgtype("elements", ctypes.c_size_t),
+                    NamedArgtype("elements", ctypes.POINTER(ctypes.POINTER(type_ctype))),
+                    NamedArgtype("elements requested ", ctypes.c_size_t),
+                    NamedArgtype("timeout ms", ctypes.c_uint32),
+                    NamedArgtype("elements acquired", ctypes.POINTER(ctypes.c_size_t)),
+                    NamedArgtype("elements remaining", ctypes.POINTER(ctypes.c_size_t)),
                 ]),
             LibraryFunctionInfo(
-                pretty_name="GetPeerToPeerFifoEndpoint",
-                name_in_library="NiFpgaDll_GetPeerToPeerFifoEndpoint",
+                pretty_name="AcquireFifoWriteElements%s" % datatype,
+                name_in_library="NiFpgaDll_AcquireFifoWriteElements%s" % datatype,
                 named_argtypes=[
                     NamedArgtype("session", _SessionType),
                     NamedArgtype("fifo", ctypes.c_uint32),
-                    NamedArgtype("endpoint", ctypes.POINTER(ctypes.c_uint32)),
+                    NamedArgtype("elements", ctypes.POINTER(ctypes.POINTER(type_ctype))),
+                    NamedArgtype("elements requested ", ctypes.c_size_t),
+                    NamedArgtype("timeout ms", ctypes.c_uint32),
+                    NamedArgtype("elements acquired", ctypes.POINTER(ctypes.c_size_t)),
+                    NamedArgtype("elements remaining", ctypes.POINTER(ctypes.c_size_t)),
                 ]),
-            LibraryFunctionInfo(
-                pretty_name="ClientFunctionCall",
-                name_in_library="NiFpgaDll_ClientFunctionCall",
-                named_argtypes=[
-                    NamedArgtype("session", _SessionType),
-                    NamedArgtype("group", ctypes.c_uint32),
-                    NamedArgtype("functionId", ctypes.c_uint32),
-                    NamedArgtype("inBuffer", ctypes.c_void_p),
-                    NamedArgtype("inBufferSize", ctypes.c_size_t),
-                    NamedArgtype("outBuffer", ctypes.c_void_p),
-                    NamedArgtype("outBufferSize", ctypes.c_size_t),
-                ])
-        ]  # list of function_infos
-
-        for datatype in DataType:
-            type_ctype = datatype._return_ctype()
-            library_function_infos.extend([
-                LibraryFunctionInfo(
-                    pretty_name="Read%s" % datatype,
-                    name_in_library="NiFpgaDll_Read%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("indicator", ctypes.c_uint32),
-                        NamedArgtype("value", ctypes.POINTER(type_ctype)),
-                    ]),
-                LibraryFunctionInfo(
-                    pretty_name="Write%s" % datatype,
-                    name_in_library="NiFpgaDll_Write%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("control", ctypes.c_uint32),
-                        NamedArgtype("value", type_ctype),
-                    ]),
-                LibraryFunctionInfo(
-                    pretty_name="ReadArray%s" % datatype,
-                    name_in_library="NiFpgaDll_ReadArray%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("indicator", ctypes.c_uint32),
-                        NamedArgtype("array", ctypes.POINTER(type_ctype)),
-                        NamedArgtype("size", ctypes.c_size_t),
-                    ]),
-                LibraryFunctionInfo(
-                    pretty_name="WriteArray%s" % datatype,
-                    name_in_library="NiFpgaDll_WriteArray%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("control", ctypes.c_uint32),
-                        NamedArgtype("array", ctypes.POINTER(type_ctype)),
-                        NamedArgtype("size", ctypes.c_size_t),
-                    ]),
-                LibraryFunctionInfo(
-                    pretty_name="ReadFifo%s" % datatype,
-                    name_in_library="NiFpgaDll_ReadFifo%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("fifo", ctypes.c_uint32),
-                        NamedArgtype("data", ctypes.POINTER(type_ctype)),
-                        NamedArgtype("number of elements", ctypes.c_size_t),
-                        NamedArgtype("timeout ms", ctypes.c_uint32),
-                        NamedArgtype("elements remaining", ctypes.POINTER(ctypes.c_size_t)),
-                    ]),
-                LibraryFunctionInfo(
-                    pretty_name="WriteFifo%s" % datatype,
-                    name_in_library="NiFpgaDll_WriteFifo%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("fifo", ctypes.c_uint32),
-                        NamedArgtype("data", ctypes.POINTER(type_ctype)),
-                        NamedArgtype("number of elements", ctypes.c_size_t),
-                        NamedArgtype("timeout ms", ctypes.c_uint32),
-                        NamedArgtype("empty elements remaining", ctypes.POINTER(ctypes.c_size_t)),
-                    ]),
-                LibraryFunctionInfo(
-                    pretty_name="AcquireFifoReadElements%s" % datatype,
-                    name_in_library="NiFpgaDll_AcquireFifoReadElements%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("fifo", ctypes.c_uint32),
-                        NamedArgtype("elements", ctypes.POINTER(ctypes.POINTER(type_ctype))),
-                        NamedArgtype("elements requested ", ctypes.c_size_t),
-                        NamedArgtype("timeout ms", ctypes.c_uint32),
-                        NamedArgtype("elements acquired", ctypes.POINTER(ctypes.c_size_t)),
-                        NamedArgtype("elements remaining", ctypes.POINTER(ctypes.c_size_t)),
-                    ]),
-                LibraryFunctionInfo(
-                    pretty_name="AcquireFifoWriteElements%s" % datatype,
-                    name_in_library="NiFpgaDll_AcquireFifoWriteElements%s" % datatype,
-                    named_argtypes=[
-                        NamedArgtype("session", _SessionType),
-                        NamedArgtype("fifo", ctypes.c_uint32),
-                        NamedArgtype("elements", ctypes.POINTER(ctypes.POINTER(type_ctype))),
-                        NamedArgtype("elements requested ", ctypes.c_size_t),
-                        NamedArgtype("timeout ms", ctypes.c_uint32),
-                        NamedArgtype("elements acquired", ctypes.POINTER(ctypes.c_size_t)),
-                        NamedArgtype("elements remaining", ctypes.POINTER(ctypes.c_size_t)),
-                    ]),
-            ])  # end of library_function_infos.extend() call
+        ])  # end of library_function_infos.extend() call
+    return library_function_infos
+
+
+def _library_not_found_error(e):
+    """ Returns a LibraryNotFoundError for the NiFpga library with
+    instructions for installing it on this platform. """
+    import platform
+    system = platform.system().lower()
+    if system == 'windows':
+        return LibraryNotFoundError(
+            "Unable to find NiFpga.dll on your system, "
+            "ensure you have installed the relevent RIO distribution for your device. "
+            "Search for your product here: http://www.ni.com/downloads/ni-drivers/ "
+            "Original Exception: " + str(e))
+    if system == 'linux':
+        return LibraryNotFoundError(
+            "Unable to find libNiFpga.so on your system, "
+            "If you are on desktop linux, ensure you have installed the latest "
+            "RIO Linux distribution for your product, such as http://www.ni.com/download/ni-rio-15.0/5603/en/ "
+            "If you are on a Linux RT embedded target (cRIO, sbRIO, FlexRIO, Industrial Controller, etc) install NI-RIO to your target "
+            "though MAX following these instructions: https://www.ni.com/getting-started/set-up-hardware/compactrio/controller-software "
+            "Original Exception: " + str(e))
+    if system == 'darwin':
+        return LibraryNotFoundError(
+            "Unable to find NiFpga.Framework on your system, "
+            "Sorry we don't yet support using RIO Devices on OSX, contact your sales person "
+            "for the latest information on OSX support. "
+            "Original Exception: " + str(e))
+    return e
+
+
+class _NiFpga(StatusCheckedLibrary):
+    """
+    _NiFpga, a thin wrapper around the FPGA Interface C API
+
+    Defines FPGA Interface C API types, and provides the _NiFpga class
+    which loads C API symbols and allows them to be called, e.g.
+    nifpga.Open(<args>) or nifpga["ReadU32](<args>). If any NiFpga function
+    return status is non-zero, the appropriate exception derived from either
+    WarningStatus or ErrorStatus is raised.
+
+    While _NiFpga can be used directly, Session provides a higher-level and
+    more convenient API that is better-suited for most users.
+    """
+
+    def __init__(self):
         try:
             super(_NiFpga, self).__init__(library_name="NiFpga",
-                                          library_function_infos=library_function_infos)
+                                          library_function_infos=_nifpga_library_function_infos())
         except LibraryNotFoundError as e:
-            import platform
-            system = platform.system().lower()
-            if system == 'windows':
-                raise LibraryNotFoundError(
-                    "Unable to find NiFpga.dll on your system, "
-                    "ensure you have installed the relevent RIO distribution for your device. "
-                    "Search for your product here: http://www.ni.com/downloads/ni-drivers/ "
-                    "Original Exception: " + str(e))
-            if system == 'linux':
-                raise LibraryNotFoundError(
-                    "Unable to find libNiFpga.so on your system, "
-                    "If you are on desktop linux, ensure you have installed the latest "
-                    "RIO Linux distribution for your product, such as http://www.ni.com/download/ni-rio-15.0/5603/en/ "
-                    "If you are on a Linux RT embedded target (cRIO, sbRIO, FlexRIO, Industrial Controller, etc) install NI-RIO to your target "
-                    "though MAX following these instructions: https://www.ni.com/getting-started/set-up-hardware/compactrio/controller-software "
-                    "Original Exception: " + str(e))
-            if system == 'darwin':
-                raise LibraryNotFoundError(
-                    "Unable to find NiFpga.Framework on your system, "
-                    "Sorry we don't yet support using RIO Devices on OSX, contact your sales person "
-                    "for the latest information on OSX support. "
-                    "Original Exception: " + str(e))
-            raise
+            raise _library_not_found_error(e)
+
+
+_shared_nifpga = None
+_shared_nifpga_lock = threading.Lock()
+
+
+def _get_nifpga():
+    """ Returns the _NiFpga shared by all sessions in this process, loading
+    the library the first time. """
+    global _shared_nifpga
+    with _shared_nifpga_lock:
+        if _shared_nifpga is None:
+            _shared_nifpga = _NiFpga()
+        return _shared_nifpga
@@ -0,0 +1,107 @@
+"""
+CallProfiler, which records how often each C API entry point is called and
+how long the calls take, to tell time spent in the driver and in ctypes
+apart from time spent in Python around it::
+
+    with CallProfiler() as profiler:
+        fifo.read(1024)
+    print(profiler.as_dict()["ReadFifoU32"]["count"])
+
+Copyright (c) 2017 National Instruments
+"""
+import threading
+from .status import add_call_hook, remove_call_hook
+
+
+class _EntryPointStatistics(object):
+    __slots__ = ["count", "total_seconds", "min_seconds", "max_seconds", "histogram"]
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.min_seconds = float("inf")
+        self.max_seconds = 0.0
+        self.histogram = []
+
+    def add(self, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds < self.min_seconds:
+            self.min_seconds = seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        bucket = int(seconds * 1e6).bit_length()
+        histogram = self.histogram
+        if bucket >= len(histogram):
+            histogram.extend([0] * (bucket + 1 - len(histogram)))
+        histogram[bucket] += 1
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.count,
+            "min_seconds": self.min_seconds,
+            "max_seconds": self.max_seconds,
+            "histogram": list(self.histogram),
+        }
+
+
+class CallProfiler(object):
+    """
+    Records the number of calls, the total time and a latency histogram of
+    each entry point called through check_status, e.g. by a Session, while
+    it is started.
+
+    The histogram of an entry point is a list whose element i counts the
+    calls that took less than 2**i microseconds, and at least 2**(i - 1)
+    microseconds for i > 0. The time of a call includes converting its
+    arguments with ctypes, but not the Python code around it.
+    """
+    def __init__(self):
+        self._statistics = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def __call__(self, name, function_name, args, status, seconds):
+        with self._lock:
+            try:
+                statistics = self._statistics[name]
+            except KeyError:
+                statistics = self._statistics[name] = _EntryPointStatistics()
+            statistics.add(seconds)
+
+    def start(self):
+        """ Starts recording calls. """
+        if not self._started:
+            add_call_hook(self)
+            self._started = True
+
+    def stop(self):
+        """ Stops recording calls, keeping what was recorded. """
+        if self._started:
+            remove_call_hook(self)
+            self._started = False
+
+    def reset(self):
+        """ Forgets the calls recorded so far. """
+        with self._lock:
+            self._statistics = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exception_type, exception_val, trace):
+        self.stop()
+
+    def as_dict(self):
+        """
+        Returns:
+            (dict): The name of each entry point called, e.g. "ReadFifoU32",
+            mapped to a dictionary of its "count", "total_seconds",
+            "mean_seconds", "min_seconds", "max_seconds" and "histogram".
+        """
+        with self._lock:
+            return dict((name, statistics.as_dict())
+                        for name, statistics in self._statistics.items())
@@ -4,17 +4,40 @@ Session, a convenient wrapper around the low-level _NiFpga class.
 Copyright (c) 2017 National Instruments
 """
 
-from .nifpga import (_SessionType, _IrqContextType, _NiFpga, DataType,
+from .nifpga import (_SessionType, _IrqContextType, _get_nifpga, DataType,
                      OPEN_ATTRIBUTE_NO_RUN, RUN_ATTRIBUTE_WAIT_UNTIL_DONE,
                      CLOSE_ATTRIBUTE_NO_RESET_IF_LAST_SESSION)
-from .bitfile import Bitfile
-from .status import InvalidSessionError
+from .bitfile import Bitfile, load_bitfile
+from .bitfileindex import find_bitfile
+from .status import FifoTimeoutError, InvalidSessionError, IrqTimeoutError
 from collections import namedtuple
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+import binascii
 import ctypes
-from builtins import bytes
-from future.utils import iteritems
+import threading
 from .nifpga import BoolArrayMappedDatatype
-import numpy as np
+from .lazyimport import LazyModule
+
+np = LazyModule("numpy")
+
+WaitOnIrqsReturnValues = namedtuple('WaitOnIrqsReturnValues',
+                                    ["irqs_asserted", "timed_out"])
+
+
+def _call_polling(function, args, timeout_code):
+    """ Calls a status checked function, e.g. nifpga["ReadFifoU32"], and
+    returns False instead of raising if it returns timeout_code. Other
+    statuses are raised or warned as usual. Skipping the exception makes
+    timing out cheap, for polling. """
+    status = function.unchecked(*args)
+    if status:
+        if status == timeout_code:
+            return False
+        function.check(status, args)
+    return True
 
 
 class Session(object):
@@ -72,7 +95,10 @@ class Session(object):
 
         Args:
             bitfile (str)(Bitfile): A bitfile.Bitfile() instance or a string
-                                    filepath to a bitfile.
+                                    filepath to a bitfile. Bitfiles are
+                                    loaded with bitfile.load_bitfile(), so
+                                    a file is only parsed again if it
+                                    changed.
             resource (str): e.g. "RIO0", "PXI1Slot2", or "rio://hostname/RIO0"
             no_run (bool): If true, don't run the bitfile, just open the
                 session.
@@ -82,8 +108,8 @@ class Session(object):
         """
         if not isinstance(bitfile, Bitfile):
             """ The bitfile we were passed is a path to an lvbitx."""
-            bitfile = Bitfile(bitfile)
-        self._nifpga = _NiFpga()
+            bitfile = load_bitfile(bitfile)
+        self._nifpga = _get_nifpga()
         self._session = _SessionType()
 
         open_attribute = 0
@@ -94,9 +120,9 @@ class Session(object):
         if no_run:
             open_attribute = open_attribute | OPEN_ATTRIBUTE_NO_RUN
 
-        bitfile_path = bytes(bitfile.filepath, 'ascii')
-        bitfile_signature = bytes(bitfile.signature, 'ascii')
-        resource = bytes(resource, 'ascii')
+        bitfile_path = bitfile.filepath.encode('ascii')
+        bitfile_signature = bitfile.signature.encode('ascii')
+        resource = resource.encode('ascii')
         self._nifpga.Open(bitfile_path,
                           bitfile_signature,
                           resource,
@@ -104,38 +130,46 @@ class Session(object):
                           self._session)
 
         self._reset_if_last_session_on_exit = reset_if_last_session_on_exit
-        self._registers = {}
-        self._internal_registers_dict = {}
-        base_address_on_device = bitfile.base_address_on_device()
-        for name, bitfile_register in iteritems(bitfile.registers):
-            assert name not in self._registers, \
-                "One or more registers have the same name '%s', this is not supported" % name
-            if bitfile_register.is_array():
-                array_register = _ArrayRegister(self._session, self._nifpga,
-                                                bitfile_register,
-                                                base_address_on_device)
-                if bitfile_register.is_internal():
-                    self._internal_registers_dict[name] = array_register
-                else:
-                    self._registers[name] = array_register
-
+        self._base_address_on_device = bitfile.base_address_on_device()
+        public_registers = {}
+        internal_registers = {}
+        for name, bitfile_register in bitfile.registers.items():
+            if bitfile_register.is_internal():
+                internal_registers[name] = bitfile_register
             else:
-                if isinstance(bitfile_register.datatype, DataType):
-                    register = _Register(self._session, self._nifpga,
-                                         bitfile_register, base_address_on_device)
-                else:
-                    register = _BoolArrayMappedRegister(self._session, self._nifpga,
-                                                        bitfile_register, base_address_on_device)
-                if bitfile_register.is_internal():
-                    self._internal_registers_dict[name] = register
-                else:
-                    self._registers[name] = register
-
-        self._fifos = {}
-        for name, bitfile_fifo in iteritems(bitfile.fifos):
-            assert name not in self._fifos, \
-                "One or more FIFOs have the same name '%s', this is not supported" % name
-            self._fifos[name] = _FIFO(self._session, self._nifpga, bitfile_fifo)
+                public_registers[name] = bitfile_register
+        self._registers = _LazyAccessorDict(public_registers, self._create_register)
+        self._internal_registers_dict = _LazyAccessorDict(internal_registers,
+                                                          self._create_register)
+        self._fifos = _LazyAccessorDict(bitfile.fifos, self._create_fifo)
+
+    @classmethod
+    def from_signature(cls, signature, resource, index, **kwargs):
+        """Creates a session with the bitfile that has the given signature,
+        found in an index built by bitfileindex.build_index().
+
+        Args:
+            signature (str): The signature of the bitfile.
+            resource (str): e.g. "RIO0", "PXI1Slot2", or "rio://hostname/RIO0"
+            index (dict)(str): The index, or the path of an index file.
+            **kwargs: Passed to Session().
+        """
+        return cls(bitfile=find_bitfile(signature, index), resource=resource, **kwargs)
+
+    def _create_register(self, bitfile_register):
+        if isinstance(bitfile_register.datatype, DataType):
+            if bitfile_register.is_array():
+                return _ArrayRegister(self._session, self._nifpga,
+                                      bitfile_register,
+                                      self._base_address_on_device)
+            return _Register(self._session, self._nifpga,
+                             bitfile_register, self._base_address_on_device)
+        return _BoolArrayMappedRegister(self._session, self._nifpga,
+                                        bitfile_register,
+                                        self._base_address_on_device)
+
+    def _create_fifo(self, bitfile_fifo):
+        return _FIFO(self._session, self._nifpga, bitfile_fifo)
 
     def __enter__(self):
         return self
@@ -203,6 +237,29 @@ class Session(object):
                     the time out expired before all irqs were asserted.
 
         """
+        irqs_asserted, timed_out = self._wait_on_irqs(irqs, timeout_ms, polling=False)
+        return WaitOnIrqsReturnValues(irqs_asserted=irqs_asserted,
+                                      timed_out=timed_out)
+
+    def try_wait_on_irqs(self, irqs, timeout_ms=0):
+        """ Like :meth:`Session.wait_on_irqs`, but for polling: returns None
+        if the timeout expires before any of the IRQs is asserted, without
+        creating an exception if the driver reports the timeout as an
+        error.
+
+        Args:
+            irqs: A list of irq ordinals 0-31, e.g. [0, 6, 31].
+            timeout_ms: The timeout to wait in milliseconds.
+
+        Returns:
+            irqs_asserted (list): The asserted IRQs, or None on timeout.
+        """
+        irqs_asserted, timed_out = self._wait_on_irqs(irqs, timeout_ms, polling=True)
+        if timed_out:
+            return None
+        return irqs_asserted
+
+    def _wait_on_irqs(self, irqs, timeout_ms, polling):
         if type(irqs) != list:
             irqs = [irqs]
         irqs_bitmask = self._irq_ordinals_to_bitmask(irqs)
@@ -212,20 +269,19 @@ class Session(object):
 
         irqs_asserted_bitmask = ctypes.c_uint32(0)
         timed_out = DataType.Bool._return_ctype()()
+        args = (self._session, context, irqs_bitmask, timeout_ms,
+                irqs_asserted_bitmask, timed_out)
         try:
-            self._nifpga.WaitOnIrqs(self._session,
-                                    context,
-                                    irqs_bitmask,
-                                    timeout_ms,
-                                    irqs_asserted_bitmask,
-                                    timed_out)
+            if polling:
+                if not _call_polling(self._nifpga.WaitOnIrqs, args,
+                                     IrqTimeoutError.CODE):
+                    return [], True
+            else:
+                self._nifpga.WaitOnIrqs(*args)
         finally:
             self._nifpga.UnreserveIrqContext(self._session, context)
         irqs_asserted = [i for i in range(32) if irqs_asserted_bitmask.value & (1 << i)]
-        WaitOnIrqsReturnValues = namedtuple('WaitOnIrqsReturnValues',
-                                            ["irqs_asserted", "timed_out"])
-        return WaitOnIrqsReturnValues(irqs_asserted=irqs_asserted,
-                                      timed_out=bool(timed_out.value))
+        return irqs_asserted, bool(timed_out.value)
 
     def acknowledge_irqs(self, irqs):
         """ Acknowledges an IRQ or set of IRQs.
@@ -250,7 +306,8 @@ class Session(object):
     def registers(self):
         """ This property returns a dictionary containing all registers that
         are associated with the bitfile opened with the session. A register can
-        be accessed by its unique name.
+        be accessed by its unique name. Each register object is created the
+        first time it is accessed.
         """
         return self._registers
 
@@ -263,24 +320,79 @@ class Session(object):
     def fifos(self):
         """ This property returns a dictionary containing all FIFOs that are
         associated with the bitfile opened with the session. A FIFO can be
-        accessed by its unique name.
+        accessed by its unique name. Each FIFO object is created the first
+        time it is accessed.
         """
         return self._fifos
 
 
+class _LazyAccessorDict(Mapping):
+    """ A read-only dictionary of name to register or FIFO object that only
+    creates an object the first time it is looked up.
+
+    Listing, counting and membership tests only use the bitfile descriptions,
+    so opening a session with a large bitfile costs nothing for the registers
+    and FIFOs that are never used.
+    """
+    def __init__(self, bitfile_items, create):
+        self._bitfile_items = bitfile_items
+        self._create = create
+        self._created = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._created[name]
+        except KeyError:
+            accessor = self._create(self._bitfile_items[name])
+            # if another thread created it first, keep using that one
+            return self._created.setdefault(name, accessor)
+
+    def __contains__(self, name):
+        return name in self._bitfile_items
+
+    def __iter__(self):
+        return iter(self._bitfile_items)
+
+    def __len__(self):
+        return len(self._bitfile_items)
+
+
+class _PerThreadBuffer(threading.local):
+    """ A scratch buffer that registers and FIFOs reuse between calls.
+
+    The buffer is allocated lazily by calling factory(size), and is only
+    reallocated when a larger size is requested. Each thread gets its own
+    buffer, so a register or FIFO can be used from several threads at once
+    without locking and without one thread overwriting data another thread
+    is still converting.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._capacity = -1
+        self._buffer = None
+
+    def get(self, size=0):
+        """ Returns this thread's buffer, holding at least size elements. """
+        if size > self._capacity:
+            self._buffer = self._factory(size)
+            self._capacity = size
+        return self._buffer
+
+
 class _Register(object):
     """ _Register is a private class that is a wrapper of logic that is
     associated with controls and indicators.
 
     All Registers will exists in a sessions session.registers property. This
-    means that all possible registers for a given session are created during
-    session initialization; a user should never need to create a new instance
-    of this class.
+    means that all possible registers for a given session are created by the
+    session the first time they are accessed; a user should never need to
+    create a new instance of this class.
 
     """
     def __init__(self, session, nifpga, bitfile_register, base_address_on_device):
         self._datatype = bitfile_register.datatype
         self._name = bitfile_register.name
+        self._is_array = bitfile_register.is_array()
         self._session = session
         self._nifpga = nifpga
         if isinstance(self._datatype, DataType):
@@ -295,6 +407,7 @@ class _Register(object):
             self._read_func = None
 
         self._ctype_type = self._datatype._return_ctype()
+        self._buffer = _PerThreadBuffer(self._allocate_buffer)
         self._resource = bitfile_register.offset + base_address_on_device
         if bitfile_register.access_may_timeout():
             self._resource = self._resource | 0x80000000
@@ -307,6 +420,9 @@ class _Register(object):
         """
         return 1
 
+    def _allocate_buffer(self, size):
+        return self._ctype_type()
+
     def write(self, data):
         """ Writes the specified data to the control or indicator
 
@@ -323,12 +439,22 @@ class _Register(object):
         Returns:
             data (DataType.value): The data inside the register.
         """
-        data = self._ctype_type()
+        data = self._buffer.get()
         self._read_func(self._session, self._resource, data)
         if self._datatype is DataType.Bool:
             return bool(data.value)
         return data.value
 
+    def _raw_layout(self):
+        """ Returns the ctype and count of the elements that _read_raw
+        transfers. """
+        return self._ctype_type, 1
+
+    def _read_raw(self, pointer):
+        """ Reads the register into the memory pointer refers to, without
+        any conversion. """
+        self._read_func(self._session, self._resource, pointer)
+
     @property
     def name(self):
         """ Property of a register that returns the name of the control or
@@ -345,20 +471,69 @@ class _BoolArrayMappedRegister(_Register):
     def __init__(self, session, nifpga, bitfile_register, base_address_on_device):
         super(_BoolArrayMappedRegister, self).__init__(session, nifpga, bitfile_register, base_address_on_device)
         assert isinstance(self._datatype, BoolArrayMappedDatatype)
+        self._num_elements = len(bitfile_register)
+        self._num_bits = self._datatype.num_bits
+        # the number of zero bits np.packbits pads the last byte with
+        self._pad_bits = -self._num_bits % 8
+        self._pointer_type = ctypes.POINTER(DataType.Bool._return_ctype())
+        self._write_func = nifpga['WriteArrayBool']
+        self._read_func = nifpga['ReadArrayBool']
+
+    def __len__(self):
+        """ Returns the number of elements, e.g. the length of a fixed-point
+        array, or 1 for a single fixed-point number or cluster. """
+        return self._num_elements
+
+    def _allocate_buffer(self, size):
+        """ Returns a uint8 array with one element per bit, and a pointer to
+        its memory to pass to the driver. """
+        buf = np.zeros(self._num_bits, dtype=np.uint8)
+        return buf, buf.ctypes.data_as(self._pointer_type)
 
     def getEmptyValue(self):
         return self._datatype.getEmptyValue()
 
     def write(self, data):
-        boolarray = self._datatype.toBoolArray(data)
-        buf = self._ctype_type(*boolarray)
-        self._nifpga['WriteArrayBool'](self._session, self._resource, buf, len(boolarray))
+        buf, pointer = self._buffer.get()
+        self._datatype.toBoolArray(data, out=buf)
+        self._write_func(self._session, self._resource, pointer, self._num_bits)
 
     def read(self):
-        buf = self._ctype_type()
-        self._nifpga['ReadArrayBool'](self._session, self._resource, buf, len(buf))
-        boolarray = np.array(buf, dtype=np.uint8)
-        return self._datatype.fromBoolArray(boolarray)
+        buf, pointer = self._buffer.get()
+        self._read_func(self._session, self._resource, pointer, self._num_bits)
+        return self._datatype.fromBoolArray(buf)
+
+    def write_packed(self, value):
+        """ Writes the register from the integer its bits represent, the
+        first bit being the most significant.
+
+        Args:
+            value (int): A non-negative integer of at most len(register) bits.
+        """
+        assert 0 <= value < (1 << self._num_bits), \
+            "%s does not fit in %d bits" % (value, self._num_bits)
+        num_bytes = (self._num_bits + 7) // 8
+        packed = binascii.unhexlify("%0*x" % (2 * num_bytes, value << self._pad_bits))
+        buf, pointer = self._buffer.get()
+        buf[:] = np.unpackbits(np.frombuffer(packed, dtype=np.uint8))[:self._num_bits]
+        self._write_func(self._session, self._resource, pointer, self._num_bits)
+
+    def read_packed(self):
+        """ Reads the register as the integer its bits represent, the first
+        bit being the most significant.
+
+        Returns:
+            (int): The bits of the register packed into an integer.
+        """
+        buf, pointer = self._buffer.get()
+        self._read_func(self._session, self._resource, pointer, self._num_bits)
+        return int(binascii.hexlify(np.packbits(buf).tobytes()), 16) >> self._pad_bits
+
+    def _raw_layout(self):
+        return ctypes.c_uint8, self._datatype.num_bits
+
+    def _read_raw(self, pointer):
+        self._read_func(self._session, self._resource, pointer, self._num_bits)
 
 
 class _ArrayRegister(_Register):
@@ -377,6 +552,8 @@ class _ArrayRegister(_Register):
                                              base_address_on_device)
         self._num_elements = len(bitfile_register)
         self._ctype_type = self._ctype_type * self._num_elements
+        self._numpy_dtype = self._datatype._return_numpy_dtype()
+        self._pointer_type = ctypes.POINTER(self._datatype._return_ctype())
         self._write_func = nifpga["WriteArray%s" % self._datatype]
         self._read_func = nifpga["ReadArray%s" % self._datatype]
 
@@ -388,33 +565,76 @@ class _ArrayRegister(_Register):
         """
         return self._num_elements
 
+    def _allocate_buffer(self, size):
+        buf = np.empty(len(self), dtype=self._numpy_dtype)
+        return buf, buf.ctypes.data_as(self._pointer_type)
+
+    def _array_pointer(self, array):
+        """ Returns what to pass the driver for a contiguous array of the
+        register's dtype and length. """
+        if array.flags.writeable:
+            # a ctypes array over the same memory is several times cheaper
+            # to create than array.ctypes.data_as
+            return self._ctype_type.from_buffer(array)
+        return array.ctypes.data_as(self._pointer_type)
+
     def write(self, data):
         """ Writes the specified array of data to the control or indicator
 
             Args:
-                data (list): The data "array" to be written into the registers
-                wrapped into a python list.
+                data (list)(numpy.ndarray): The data "array" to be written into
+                    the registers wrapped into a python list, or a numpy array.
         """
         # if data is not iterable make it iterable
-        try:
-            iter(data)
-        except TypeError:
-            data = [data]
+        data = np.asarray(data)
+        if data.ndim == 0:
+            data = data.reshape(1)
         assert len(data) == len(self), \
             "Bad data length %d for register '%s', expected %s" \
             % (len(data), self._name, len(self))
-        buf = self._ctype_type(*data)
-        self._write_func(self._session, self._resource, buf, len(self))
+        # NumPy would silently truncate floats into an integer buffer
+        if data.dtype.kind in "fc" and self._numpy_dtype.kind in "biu":
+            raise TypeError("Cannot write %s data to %s register '%s'"
+                            % (data.dtype, self._datatype, self._name))
+        if data.dtype == self._numpy_dtype and data.flags.c_contiguous:
+            # the driver can read the caller's array directly
+            data_ptr = self._array_pointer(data)
+        else:
+            buf, data_ptr = self._buffer.get()
+            buf[:] = data
+        self._write_func(self._session, self._resource, data_ptr, len(self))
 
-    def read(self):
+    def read(self, as_numpy=False, out=None):
         """ Reads the entire array from the control or indicator.
 
+        Args:
+            as_numpy (bool): If true, return the data as a new numpy array of
+                the register's dtype instead of a python list.
+            out (numpy.ndarray): A contiguous array of the register's dtype
+                and length to read into. If given, it is filled and returned
+                instead of allocating a new array.
+
         Returns:
-            (list): The data in the register in a python list.
+            (list)(numpy.ndarray): The data in the register.
         """
-        buf = self._ctype_type()
-        self._read_func(self._session, self._resource, buf, len(self))
-        return [bool(elem) if self._datatype is DataType.Bool else elem for elem in buf]
+        if out is not None:
+            assert out.dtype == self._numpy_dtype and out.flags.c_contiguous \
+                and len(out) == len(self), \
+                "Output array for register '%s' must be a contiguous %s array of length %d" \
+                % (self._name, self._numpy_dtype, len(self))
+            self._read_func(self._session, self._resource, self._array_pointer(out), len(self))
+            return out
+        buf, buf_ptr = self._buffer.get()
+        self._read_func(self._session, self._resource, buf_ptr, len(self))
+        if as_numpy:
+            return buf.copy()
+        return buf.tolist()
+
+    def _raw_layout(self):
+        return self._datatype._return_ctype(), len(self)
+
+    def _read_raw(self, pointer):
+        self._read_func(self._session, self._resource, pointer, len(self))
 
 
 ReadValues = namedtuple("ReadValues", ["data", "elements_remaining"])
@@ -423,23 +643,40 @@ class _FIFO(object):
     associated with a FIFO.
 
     All FIFOs will exists in a sessions session.fifos property. This means that
-    all possible FIFOs for a given session are created during session
-    initialization; a user should never need to create a new instance of this
-    class.
+    all possible FIFOs for a given session are created by the session the
+    first time they are accessed; a user should never need to create a new
+    instance of this class.
     """
     def __init__(self, session, nifpga, bitfile_fifo):
         self._datatype = bitfile_fifo.datatype
         self._number = bitfile_fifo.number
         self._session = session
-        self._write_func = nifpga["WriteFifo%s" % self._datatype]
-        self._read_func = nifpga["ReadFifo%s" % self._datatype]
-        self._acquire_read_func = nifpga["AcquireFifoReadElements%s" % self._datatype]
-        self._acquire_write_func = nifpga["AcquireFifoWriteElements%s" % self._datatype]
+        # Fixed-point FIFOs transfer each element as a U64 word
+        self._is_fixpoint = isinstance(self._datatype, BoolArrayMappedDatatype)
+        if self._is_fixpoint:
+            assert self._datatype.num_bits <= 64, \
+                "FIFO '%s' elements do not fit in 64 bits" % bitfile_fifo.name
+            transfer_datatype = DataType.U64
+        else:
+            transfer_datatype = self._datatype
+        self._write_func = nifpga["WriteFifo%s" % transfer_datatype]
+        self._read_func = nifpga["ReadFifo%s" % transfer_datatype]
+        self._acquire_read_func = nifpga["AcquireFifoReadElements%s" % transfer_datatype]
+        self._acquire_write_func = nifpga["AcquireFifoWriteElements%s" % transfer_datatype]
         self._release_elements_func = nifpga["ReleaseFifoElements"]
         self._nifpga = nifpga
-        self._ctype_type = self._datatype._return_ctype()
+        self._ctype_type = transfer_datatype._return_ctype()
+        self._buffer = _PerThreadBuffer(self._allocate_buffer)
+        self._elements_remaining = _PerThreadBuffer(self._allocate_size)
         self._name = bitfile_fifo.name
 
+    def _allocate_buffer(self, size):
+        return (self._ctype_type * size)()
+
+    @staticmethod
+    def _allocate_size(size):
+        return ctypes.c_size_t()
+
     def configure(self, requested_depth):
         """ Specifies the depth of the host memory part of the DMA FIFO.
 
@@ -474,27 +711,54 @@ class _FIFO(object):
             continue to work as expected.
 
         Args:
-            data (list): Data to be written to the FIFO.
+            data (list): Data to be written to the FIFO. Fixed-point FIFOs
+                also take NumPy arrays, e.g. of complex128 for complex
+                fixed-point.
             timeout_ms (int): The timeout to wait in milliseconds.
 
         Returns:
             elements_remaining (int): The number of elements remaining in the
             host memory part of the DMA FIFO.
         """
-        # if data is not iterable make it iterable
-        try:
-            iter(data)
-        except TypeError:
-            data = [data]
-        buf_type = self._ctype_type * len(data)
-        buf = buf_type(*data)
-        empty_elements_remaining = ctypes.c_size_t()
-        self._write_func(self._session,
-                         self._number,
-                         buf,
-                         len(data),
-                         timeout_ms,
-                         empty_elements_remaining)
+        return self._write(data, timeout_ms, polling=False)
+
+    def try_write(self, data, timeout_ms=0):
+        """ Like :meth:`_FIFO.write`, but for polling: returns None if there
+        is no room for the data before the timeout, instead of creating and
+        raising a FifoTimeoutError.
+
+        Returns:
+            elements_remaining (int): The number of elements remaining in the
+            host memory part of the DMA FIFO, or None on timeout.
+        """
+        return self._write(data, timeout_ms, polling=True)
+
+    def _write(self, data, timeout_ms, polling):
+        if self._is_fixpoint:
+            words = np.ascontiguousarray(self._datatype.encode_words(data))
+            data = words
+            buf = self._buffer.get(len(words))
+            ctypes.memmove(buf, words.ctypes.data, words.nbytes)
+        else:
+            # if data is not iterable make it iterable
+            try:
+                iter(data)
+            except TypeError:
+                data = [data]
+            buf = self._buffer.get(len(data))
+            buf[:len(data)] = data
+        empty_elements_remaining = self._elements_remaining.get()
+        args = (self._session,
+                self._number,
+                buf,
+                len(data),
+                timeout_ms,
+                empty_elements_remaining)
+        if polling:
+            if not _call_polling(self._write_func, args, FifoTimeoutError.CODE):
+                return None
+        else:
+            self._write_func(*args)
         return empty_elements_remaining.value
 
     def read(self, number_of_elements, timeout_ms=0):
@@ -514,20 +778,50 @@ class _FIFO(object):
             ReadValues (namedtuple)::
 
                 ReadValues.data (list): containing the data from
-                    the FIFO.
+                    the FIFO. Fixed-point FIFOs return a NumPy array, of
+                    complex128 for complex fixed-point.
                 ReadValues.elements_remaining (int): The amount of elements
                     remaining in the FIFO.
         """
-        buf_type = self._ctype_type * number_of_elements
-        buf = buf_type()
-        elements_remaining = ctypes.c_size_t()
-        self._read_func(self._session,
-                        self._number,
-                        buf,
-                        number_of_elements,
-                        timeout_ms,
-                        elements_remaining)
-        data = [bool(elem) if self._datatype is DataType.Bool else elem for elem in buf]
+        return self._read(number_of_elements, timeout_ms, polling=False)
+
+    def try_read(self, number_of_elements, timeout_ms=0):
+        """ Like :meth:`_FIFO.read`, but for polling: returns None if the
+        elements are not available before the timeout, instead of creating
+        and raising a FifoTimeoutError::
+
+            while running:
+                values = fifo.try_read(1024)
+                if values is not None:
+                    process(values.data)
+
+        Returns:
+            ReadValues (namedtuple): As :meth:`_FIFO.read` does, or None on
+            timeout.
+        """
+        return self._read(number_of_elements, timeout_ms, polling=True)
+
+    def _read(self, number_of_elements, timeout_ms, polling):
+        buf = self._buffer.get(number_of_elements)
+        elements_remaining = self._elements_remaining.get()
+        args = (self._session,
+                self._number,
+                buf,
+                number_of_elements,
+                timeout_ms,
+                elements_remaining)
+        if polling:
+            if not _call_polling(self._read_func, args, FifoTimeoutError.CODE):
+                return None
+        else:
+            self._read_func(*args)
+        if self._is_fixpoint:
+            words = np.ctypeslib.as_array(buf)[:number_of_elements]
+            data = self._datatype.decode_words(words)
+        else:
+            data = buf[:number_of_elements]
+        if self._datatype is DataType.Bool:
+            data = [bool(elem) for elem in data]
         return ReadValues(data=data,
                           elements_remaining=elements_remaining.value)
 
@@ -5,7 +5,8 @@ function returns either a warning or error status.
 Use check_status() to raise an appropriate exception if necessary.
 
 Error and Warning exception class names are auto-generated from the
-strings in 'codeToString' in this file.
+strings in 'error_codes' in this file. Each class is created the first time
+it is used.
 For example, handle a fatal error like this:
 
     >>> @check_status('frob', ['foo', 'bar', 'baz'])
@@ -38,7 +39,14 @@ Or handle a warning like this:
 Copyright (c) 2017 National Instruments
 """
 import functools
+import sys
+import threading
+import time
 import warnings
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
 
 
 def _raise_or_warn_if_nonzero_status(status, function_name, argument_names, *args):
@@ -60,12 +68,15 @@ def _raise_or_warn_if_nonzero_status(status, function_name, argument_names, *arg
     """
     if status == 0:
         return
+    if status > 0 and _warning_policy != WARN_ALWAYS \
+            and not _count_warning(status, function_name):
+        return
 
     if status in codes_to_exception_classes:
         if status < 0:
-            raise codes_to_exception_classes[status](function_name, argument_names, *args)
+            raise _exception_class(status)(function_name, argument_names, *args)
         else:
-            warning = codes_to_exception_classes[status](function_name, argument_names, *args)
+            warning = _exception_class(status)(function_name, argument_names, *args)
             warnings.warn(warning)
     else:
         if status < 0:
@@ -74,7 +85,121 @@ def _raise_or_warn_if_nonzero_status(status, function_name, argument_names, *arg
             warnings.warn(UnknownWarning(status, function_name, argument_names, *args))
 
 
-def check_status(function_name, argument_names):
+_perf_counter = getattr(time, "perf_counter", time.time)  # Python 2
+
+# Warning policies, see set_warning_policy()
+WARN_ALWAYS = "always"
+WARN_AGGREGATE = "aggregate"
+WARN_INTERVAL = "interval"
+
+_warning_policy = WARN_ALWAYS
+_warning_interval_seconds = 1.0
+# (code, function name) to the number of warnings since the last reset,
+# and to when one was last emitted
+_warning_counts = {}
+_warning_emitted = {}
+_warning_lock = threading.Lock()
+
+
+def set_warning_policy(policy, interval_seconds=1.0):
+    """
+    Sets what check_status does when a function returns a warning status.
+
+    policy:
+        WARN_ALWAYS: warn every time, the default.
+        WARN_AGGREGATE: only count the warnings by code and function, see
+            get_warning_summary().
+        WARN_INTERVAL: count the warnings, and warn for a code and function
+            at most once every interval_seconds.
+
+    Counting a warning is much cheaper than creating and warning it, for
+    loops that get a benign warning on every iteration.
+    """
+    global _warning_policy, _warning_interval_seconds
+    if policy not in (WARN_ALWAYS, WARN_AGGREGATE, WARN_INTERVAL):
+        raise ValueError("Unknown warning policy '%s'" % policy)
+    with _warning_lock:
+        _warning_policy = policy
+        _warning_interval_seconds = interval_seconds
+        _warning_emitted.clear()
+
+
+def get_warning_policy():
+    """ Returns the warning policy set with set_warning_policy(). """
+    return _warning_policy
+
+
+def get_warning_summary():
+    """
+    Returns the warnings counted since the last reset_warning_summary(),
+    while the policy was WARN_AGGREGATE or WARN_INTERVAL, as a dictionary
+    of (code, function name) to count, e.g.
+    {(50400, "NiFpgaDll_ReadFifoU32"): 1000}.
+    """
+    with _warning_lock:
+        return dict(_warning_counts)
+
+
+def reset_warning_summary():
+    """ Forgets the warnings counted so far. """
+    with _warning_lock:
+        _warning_counts.clear()
+        _warning_emitted.clear()
+
+
+def _count_warning(status, function_name):
+    """ Counts a warning under the current policy, and returns whether it
+    should also be warned. """
+    key = (status, function_name)
+    with _warning_lock:
+        _warning_counts[key] = _warning_counts.get(key, 0) + 1
+        if _warning_policy != WARN_INTERVAL:
+            return False
+        now = _perf_counter()
+        last = _warning_emitted.get(key)
+        if last is not None and now - last < _warning_interval_seconds:
+            return False
+        _warning_emitted[key] = now
+        return True
+
+
+# Callables that check_status calls after every call, see add_call_hook()
+_call_hooks = []
+_call_hooks_lock = threading.Lock()
+
+
+def add_call_hook(hook):
+    """
+    Makes every function checked by check_status also call
+    hook(name, function_name, args, status, seconds) after the function
+    returns, and before its status is raised or warned.
+
+    name: the name the function is called by, e.g. "ReadFifoU32"
+    function_name: the name of the function, e.g. "NiFpgaDll_ReadFifoU32"
+    args: the arguments that were passed to the function
+    status: the status it returned
+    seconds: how long the call took, including converting its arguments
+
+    Functions are only timed while a hook is added, so when none is the
+    only cost is checking that the list of hooks is empty.
+    """
+    global _call_hooks
+    with _call_hooks_lock:
+        # replace the list rather than change it, so calls in other threads
+        # can iterate over it without a lock
+        _call_hooks = _call_hooks + [hook]
+
+
+def remove_call_hook(hook):
+    """ Stops calling a hook added with add_call_hook(). """
+    global _call_hooks
+    with _call_hooks_lock:
+        hooks = list(_call_hooks)
+        hooks.remove(hook)
+        _call_hooks = hooks
+
+
+def check_status(function_name, argument_names, name=None):
     """
     Decorator (that takes arguments) to call a function and raise
     an appropriate subclass of Status if the
@@ -89,15 +214,47 @@ def check_status(function_name, argument_names):
         Used to make the exception message more useful, and to find the
         arguments after catching an exception if the function fails
         (e.g. 'e.get_args()["session"]').
+    name: the name the function is called by, e.g. "ConfigureFifo", that
+        call hooks see. Defaults to function_name.
+
+    The decorated function also has an 'unchecked' attribute, which calls
+    it and returns its status, and a 'check' attribute, check(status, args),
+    which raises or warns a status the way calling it would have.
     """
+    if name is None:
+        name = function_name
+
     def decorator(function):
-        @functools.wraps(function)
-        def internal(*args):
+        def unchecked(*args):
+            """ Calls the function and returns its status, without raising
+            or warning it. """
             if hasattr(function, "argtypes") and len(args) != len(function.argtypes):
                 raise TypeError("%s takes exactly %u arguments (%u given)"
                                 % (function_name, len(function.argtypes), len(args)))
+            hooks = _call_hooks
+            if not hooks:
+                return function(*args)
+            start = _perf_counter()
             status = function(*args)
+            seconds = _perf_counter() - start
+            for hook in hooks:
+                hook(name, function_name, args, status, seconds)
+            return status
+
+        def check(status, args):
+            """ Raises or warns a status that unchecked() returned for
+            args. """
             _raise_or_warn_if_nonzero_status(status, function_name, argument_names, args)
+
+        @functools.wraps(function)
+        def internal(*args):
+            status = unchecked(*args)
+            if status:
+                _raise_or_warn_if_nonzero_status(status, function_name, argument_names, args)
+        # for callers that handle some statuses themselves, e.g. timeouts
+        # when polling, without the cost of creating an exception
+        internal.unchecked = unchecked
+        internal.check = check
         return internal
     return decorator
 
@@ -332,42 +489,97 @@ error_codes = [
     (-63198, "OutOfHandles"),
 ]
 
-# create an exception class for each error code and add to dictionary
-# ie FifoTimeoutWarning, FifoTimeoutError
-codes_to_exception_classes = {}
-_g = globals()
-for code, code_string in error_codes:
-    # we need introduce a scope, otherwise code, and code_string
-    # will all reference the same value.
-    def add_classes(code, code_string):
-        classname = code_string + 'Error'
-
-        def __init__(self, function_name, argument_names, function_args):
-            ErrorStatus.__init__(self,
-                                 code=code,
-                                 code_string=code_string,
-                                 function_name=function_name,
-                                 argument_names=argument_names,
-                                 function_args=function_args)
-        error_class = type(classname, (ErrorStatus,),
-                           {'__init__': __init__, 'CODE': code})
-        codes_to_exception_classes[code] = error_class
-        # copy the exception type into module globals
-        _g[error_class.__name__] = error_class
-
-        classname = code_string + 'Warning'
+_code_strings = dict(error_codes)
+# the name of each status class to its code, e.g. "FifoTimeoutError": -50400
+_class_names_to_codes = dict((code_string + suffix, sign * code)
+                             for code, code_string in error_codes
+                             for suffix, sign in (("Error", 1), ("Warning", -1)))
+_exception_classes = {}
+_exception_classes_lock = threading.Lock()
+
+
+def _exception_class(code):
+    """ Returns the status class of a code in error_codes, e.g.
+    FifoTimeoutError for -50400 and FifoTimeoutWarning for 50400, creating
+    it the first time it is needed. """
+    try:
+        return _exception_classes[code]
+    except KeyError:
+        pass
+    code_string = _code_strings[-abs(code)]
+    with _exception_classes_lock:
+        # another thread may have created it while we waited
+        if code in _exception_classes:
+            return _exception_classes[code]
+        base = ErrorStatus if code < 0 else WarningStatus
+        classname = code_string + ("Error" if code < 0 else "Warning")
 
         def __init__(self, function_name, argument_names, function_args):
-            WarningStatus.__init__(self,
-                                   code=-code,
-                                   code_string=code_string,
-                                   function_name=function_name,
-                                   argument_names=argument_names,
-                                   function_args=function_args)
-        warning_class = type(classname, (WarningStatus,),
-                             {'__init__': __init__, 'CODE': -code})
-        codes_to_exception_classes[-code] = warning_class
-        # copy the warning type into module globals
-        _g[warning_class.__name__] = warning_class
-
-    add_classes(code, code_string)
+            base.__init__(self,
+                          code=code,
+                          code_string=code_string,
+                          function_name=function_name,
+                          argument_names=argument_names,
+                          function_args=function_args)
+        exception_class = type(classname, (base,),
+                               {'__init__': __init__, 'CODE': code})
+        # copy the exception type into module globals, so later lookups do
+        # not go through __getattr__
+        globals()[classname] = exception_class
+        _exception_classes[code] = exception_class
+        return exception_class
+
+
+class _ExceptionClasses(Mapping):
+    """ A read-only dictionary of status code to status class that creates
+    each class the first time it is looked up. """
+    def __getitem__(self, code):
+        if -abs(code) not in _code_strings:
+            raise KeyError(code)
+        return _exception_class(code)
+
+    def __contains__(self, code):
+        return -abs(code) in _code_strings
+
+    def __iter__(self):
+        for code in _code_strings:
+            yield code
+            yield -code
+
+    def __len__(self):
+        return 2 * len(_code_strings)
+
+
+# e.g. codes_to_exception_classes[-50400] is FifoTimeoutError
+codes_to_exception_classes = _ExceptionClasses()
+
+
+__all__ = [
+    "check_status", "add_call_hook", "remove_call_hook",
+    "WARN_ALWAYS", "WARN_AGGREGATE", "WARN_INTERVAL",
+    "set_warning_policy", "get_warning_policy",
+    "get_warning_summary", "reset_warning_summary",
+    "Status", "WarningStatus", "ErrorStatus", "UnknownWarning", "UnknownError",
+    "error_codes", "codes_to_exception_classes",
+    # "from nifpga.status import *" creates every status class
+] + sorted(_class_names_to_codes)
+
+
+def __getattr__(name):
+    """ Creates the status class of the name, e.g. FifoTimeoutError, when it
+    is first used. """
+    try:
+        code = _class_names_to_codes[name]
+    except KeyError:
+        raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+    return _exception_class(code)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_class_names_to_codes))
+
+
+if sys.version_info < (3, 7):
+    # module __getattr__ is not supported, so create every class now
+    for code in list(codes_to_exception_classes):
+        _exception_class(code)
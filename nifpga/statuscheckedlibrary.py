@@ -1,6 +1,8 @@
 from .status import check_status, VersionMismatchError
 import ctypes
 import ctypes.util
+import os
+import threading
 
 StatusType = ctypes.c_int32
 
@@ -79,16 +81,28 @@ class StatusCheckedFunctions(object):
         # function with a status check
         self._wrapped_functions = {}
         for function_info in function_infos:
-            decorator = check_status(function_info.function.__name__,
-                                     function_info.argument_names)
-            closure = decorator(function_info.function)
+            self._wrap(function_info)
 
-            # e.g. "self.Open = closure"
-            # So now "<this object>.Open(...)" works
-            setattr(self, function_info.name, closure)
+    def _wrap(self, function_info):
+        """ Wraps a function with a status check and makes it available by
+        its name. Returns the wrapped function. """
+        decorator = check_status(function_info.function.__name__,
+                                 function_info.argument_names,
+                                 function_info.name)
+        closure = decorator(function_info.function)
 
-            # Store closure this so __getitem__ can provide more convenience
-            self._wrapped_functions[function_info.name] = closure
+        # e.g. "self.Open = closure"
+        # So now "<this object>.Open(...)" works
+        setattr(self, function_info.name, closure)
+
+        # Store closure this so __getitem__ can provide more convenience
+        self._wrapped_functions[function_info.name] = closure
+        return closure
+
+    def _resolve(self, name):
+        """ Called for names that are not wrapped yet. Subclasses can wrap
+        functions on first use by overriding this; raises KeyError. """
+        raise KeyError(name)
 
     def __getitem__(self, key):
         """
@@ -99,7 +113,20 @@ class StatusCheckedFunctions(object):
             datatype = "U64"
             <this object>['ReadArray%s' % datatype](session, ...)
         """
-        return self._wrapped_functions[key]
+        try:
+            return self._wrapped_functions[key]
+        except KeyError:
+            return self._resolve(key)
+
+    def __getattr__(self, name):
+        # only called for attributes that are not set, i.e. functions that
+        # are not wrapped yet
+        if name.startswith("_"):
+            raise AttributeError(name)
+        try:
+            return self._resolve(name)
+        except KeyError:
+            raise AttributeError(name)
 
 
 class NamedArgtype(object):
@@ -140,12 +167,22 @@ class LibraryNotFoundError(RuntimeError):
     pass
 
 
+def find_library(library_name):
+    """ Returns the path of a library, given its name, e.g. "NiFpga" for
+    libNiFpga.so or NiFpga.dll, or its path. Returns None if there is no
+    such library. """
+    if os.path.sep in library_name:
+        return library_name if os.path.exists(library_name) else None
+    return ctypes.util.find_library(library_name)
+
+
 class StatusCheckedLibrary(StatusCheckedFunctions):
     def __init__(self, library_name, library_function_infos):
         """
         Raises exceptions from entry points that return NiFpga_Status codes.
 
-        library_name: e.g. "NiFpga" (libNiFpga.so, NiFpga.dll)
+        library_name: e.g. "NiFpga" (libNiFpga.so, NiFpga.dll), or the path
+            of a library
         library_function_infos: a list of library_function_info objects
 
         Automatically wraps each entry point named in library_function_infos
@@ -169,15 +206,30 @@ class StatusCheckedLibrary(StatusCheckedFunctions):
             # argument.
             cool_library.AwesomeFunction(7)
             cool_library["AwesomeFunction"](7)
+
+        Entry points are looked up in the library, and their argtypes set
+        and wrapped, the first time they are used, so creating a library
+        with many entry points costs little more than loading it.
         """
-        library = ctypes.util.find_library(library_name)
+        library = find_library(library_name)
         if library is None:
             raise LibraryNotFoundError(library_name)
-        library = ctypes.cdll.LoadLibrary(library)
-        function_infos = []
-        for lfi in library_function_infos:
+        self._library = ctypes.cdll.LoadLibrary(library)
+        self._library_function_infos = dict((lfi.pretty_name, lfi)
+                                            for lfi in library_function_infos)
+        self._resolve_lock = threading.Lock()
+        super(StatusCheckedLibrary, self).__init__([])
+
+    def _resolve(self, name):
+        """ Looks up, sets up and wraps the entry point with the pretty
+        name, the first time it is used. """
+        lfi = self._library_function_infos[name]
+        with self._resolve_lock:
+            if name in self._wrapped_functions:
+                # another thread wrapped it first
+                return self._wrapped_functions[name]
             try:
-                func = getattr(library, lfi.name_in_library)  # i.e., dlsym()
+                func = getattr(self._library, lfi.name_in_library)  # i.e., dlsym()
                 # ctypes functions have special 'argtypes' and 'restype' fields
                 # that we set, so ctypes can automatically convert types and knows
                 # how to call into the library.
@@ -192,8 +244,7 @@ class StatusCheckedLibrary(StatusCheckedFunctions):
                     """ Always returns the version mismatch error code. """
                     return VersionMismatchError.CODE
                 func = returnsVersionMismatchError
-            function_infos.append(
+            return self._wrap(
                 FunctionInfo(function=func,
                              name=lfi.pretty_name,
                              argument_names=[named_argtype.name for named_argtype in lfi.named_argtypes]))
-        super(StatusCheckedLibrary, self).__init__(function_infos)
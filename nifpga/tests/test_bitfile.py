@@ -0,0 +1,436 @@
+import json
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+from xml.etree.ElementTree import fromstring
+
+import nifpga.bitfile
+from nifpga.bitfile import (Bitfile, Register, _datatype_from_values,
+                            _datatype_values, load_bitfile, read_signature)
+from nifpga.nifpga import (ArrayDatatype, ClusterDatatype,
+                           ComplexFixpointDatatype, DataType,
+                           FixpointDatatype)
+
+
+def type_descriptor(code, contents=""):
+    """ Returns the hex string of a LabVIEW type descriptor, which starts
+    with its size in bytes. """
+    return "%04X%s%s" % (4 + len(contents) // 2, code, contents)
+
+
+def array_type_descriptor(size, element):
+    return type_descriptor("4040", "0001%08X%s" % (size, element))
+
+
+def cluster_type_descriptor(*elements):
+    return type_descriptor("4050", "%04X%s" % (len(elements), "".join(elements)))
+
+
+def fixpoint_flattened_type(code, word_length, integer_word_length, signed):
+    """ Returns the hex string of a LabVIEW fixed-point type descriptor. """
+    return type_descriptor(code, "0000%04X0000%04X%04d" % (
+        word_length, integer_word_length & 0xFFFF, signed))
+
+
+def register_xml_string(name, datatype_xml, flattened, offset=0x100,
+                        internal=False):
+    return ("<Register>"
+            "<Name>%s</Name>"
+            "<Indicator>false</Indicator>"
+            "<Datatype>%s</Datatype>"
+            "<FlattenedType>%s</FlattenedType>"
+            "<Offset>%d</Offset>"
+            "<Internal>%s</Internal>"
+            "<AccessMayTimeout>false</AccessMayTimeout>"
+            "</Register>" % (name, datatype_xml, flattened, offset,
+                             "true" if internal else "false"))
+
+
+def register_xml(*args, **kwargs):
+    return fromstring(register_xml_string(*args, **kwargs))
+
+
+def fifo_xml_string(name, number, subtype, datatype_xml=""):
+    return ("<Channel name=\"%s\">"
+            "<DataType><SubType>%s</SubType>%s</DataType>"
+            "<Number>%d</Number>"
+            "</Channel>" % (name, subtype, datatype_xml, number))
+
+
+def fixpoint_fifo_xml_string(name, number, subtype, word_length,
+                             integer_word_length, signed):
+    return fifo_xml_string(name, number, subtype,
+                           "<Signed>%s</Signed>"
+                           "<WordLength>%d</WordLength>"
+                           "<IntegerWordLength>%d</IntegerWordLength>"
+                           % ("true" if signed else "false", word_length,
+                              integer_word_length))
+
+
+def bitfile_xml_string(registers, fifos, signature="0123456789ABCDEF0123456789ABCDEF",
+                       bitstream=""):
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?>"
+            "<Bitfile>"
+            "<BitfileVersion>4.0</BitfileVersion>"
+            "<SignatureRegister>%s</SignatureRegister>"
+            "<VI><Name>Main.vi</Name><RegisterList>%s</RegisterList></VI>"
+            "<Project><CompilationResultsTree><CompilationResults><NiFpga>"
+            "<BaseAddressOnDevice>65536</BaseAddressOnDevice>"
+            "<DmaChannelAllocationList>%s</DmaChannelAllocationList>"
+            "</NiFpga></CompilationResults></CompilationResultsTree></Project>"
+            "<Bitstream>%s</Bitstream>"
+            "</Bitfile>" % (signature, "".join(registers), "".join(fifos), bitstream))
+
+
+EXAMPLE_REGISTERS = [
+    register_xml_string("Input U32", "<U32></U32>", "000C40070000", offset=0x10),
+    register_xml_string("Input Array I16",
+                        "<Array><Name>Input Array I16</Name><Size>4</Size>"
+                        "<Type><I16></I16></Type></Array>",
+                        "0010404000010000000400044002", offset=0x20),
+    register_xml_string("Fxp", "<FXP></FXP>",
+                        fixpoint_flattened_type("405F", 16, 8, 1), offset=0x30),
+    register_xml_string("Internal U8", "<U8></U8>", "000C40050000", offset=0x40,
+                        internal=True),
+]
+EXAMPLE_FIFOS = [
+    fifo_xml_string("Host to FPGA U32", 0, "U32"),
+    fifo_xml_string("FPGA to Host I64", 1, "I64"),
+]
+
+
+class TemporaryBitfile(object):
+    """ Context manager that writes an .lvbitx file into a temporary
+    directory and returns its path. """
+    def __init__(self, registers=EXAMPLE_REGISTERS, fifos=EXAMPLE_FIFOS, **kwargs):
+        self._contents = bitfile_xml_string(registers, fifos, **kwargs)
+
+    def __enter__(self):
+        self._directory = tempfile.mkdtemp()
+        path = os.path.join(self._directory, "test.lvbitx")
+        with open(path, "w") as bitfile:
+            bitfile.write(self._contents)
+        return path
+
+    def __exit__(self, exception_type, exception_val, trace):
+        shutil.rmtree(self._directory)
+
+
+def array_xml(name, size, element_xml):
+    return ("<Array><Name>%s</Name><Size>%d</Size><Type>%s</Type></Array>"
+            % (name, size, element_xml))
+
+
+def cluster_xml(name, *elements_xml):
+    return ("<Cluster><Name>%s</Name><TypeList>%s</TypeList></Cluster>"
+            % (name, "".join(elements_xml)))
+
+
+def element_xml(tag, name):
+    return "<%s><Name>%s</Name></%s>" % (tag, name, tag)
+
+
+# A cluster of {"Gain": I4.12, "Enabled": Boolean, "Limits": {"Low": I16,
+# "High": U8}} and the descriptors of its elements in a flattened type
+CONFIG_CLUSTER_XML = cluster_xml(
+    "Config",
+    "<FXP><Name>Gain</Name></FXP>",
+    element_xml("Boolean", "Enabled"),
+    cluster_xml("Limits", element_xml("I16", "Low"), element_xml("U8", "High")))
+CONFIG_CLUSTER_FLATTENED = cluster_type_descriptor(
+    fixpoint_flattened_type("405F", 16, 4, 1),
+    type_descriptor("4021"),
+    cluster_type_descriptor(type_descriptor("4002"), type_descriptor("4005")))
+
+
+class BitfileTest(unittest.TestCase):
+    def test_parse(self):
+        with TemporaryBitfile() as path:
+            bitfile = Bitfile(path)
+        self.assertEqual(path, bitfile.filepath)
+        self.assertEqual("0123456789ABCDEF0123456789ABCDEF", bitfile.signature)
+        self.assertEqual(65536, bitfile.base_address_on_device())
+        self.assertEqual(set(["Input U32", "Input Array I16", "Fxp", "Internal U8"]),
+                         set(bitfile.registers))
+        self.assertTrue(bitfile.registers["Internal U8"].is_internal())
+        self.assertEqual(DataType.I16, bitfile.registers["Input Array I16"].datatype)
+        self.assertEqual(DataType.I64, bitfile.fifos["FPGA to Host I64"].datatype)
+        self.assertEqual(1, bitfile.fifos["FPGA to Host I64"].number)
+        self.assertEqual(["Fxp", "Input Array I16", "Input U32", "Internal U8"],
+                         bitfile.register_names)
+        self.assertFalse(bitfile.header_only)
+
+    def test_header_only(self):
+        with TemporaryBitfile() as path:
+            with mock.patch.object(nifpga.bitfile, "Register") as register, \
+                    mock.patch.object(nifpga.bitfile, "Fifo") as fifo:
+                bitfile = Bitfile(path, header_only=True)
+        self.assertFalse(register.called)
+        self.assertFalse(fifo.called)
+        self.assertTrue(bitfile.header_only)
+        self.assertEqual("0123456789ABCDEF0123456789ABCDEF", bitfile.signature)
+        self.assertEqual(65536, bitfile.base_address_on_device())
+        self.assertEqual({}, bitfile.registers)
+        self.assertEqual(["Fxp", "Input Array I16", "Input U32", "Internal U8"],
+                         bitfile.register_names)
+        self.assertEqual(["FPGA to Host I64", "Host to FPGA U32"], bitfile.fifo_names)
+
+    def test_stops_reading_at_the_bitstream(self):
+        # malformed XML far enough into the bitstream that the parser only
+        # sees it if it keeps reading
+        bitstream = "0" * (1 << 20) + "<unclosed"
+        with TemporaryBitfile(bitstream=bitstream) as path:
+            bitfile = Bitfile(path)
+        self.assertEqual(set(["Input U32", "Input Array I16", "Fxp", "Internal U8"]),
+                         set(bitfile.registers))
+        self.assertEqual(2, len(bitfile.fifos))
+
+    def test_reads_registers_after_the_bitstream(self):
+        contents = bitfile_xml_string(EXAMPLE_REGISTERS, EXAMPLE_FIFOS, bitstream="00FF")
+        vi = contents[contents.index("<VI>"):contents.index("</VI>") + len("</VI>")]
+        contents = contents.replace(vi, "").replace("</Bitfile>", vi + "</Bitfile>")
+        with TemporaryBitfile() as path:
+            with open(path, "w") as bitfile:
+                bitfile.write(contents)
+            bitfile = Bitfile(path)
+            header = Bitfile(path, header_only=True)
+        self.assertEqual(set(["Input U32", "Input Array I16", "Fxp", "Internal U8"]),
+                         set(bitfile.registers))
+        self.assertEqual(2, len(bitfile.fifos))
+        self.assertEqual(65536, bitfile.base_address_on_device())
+        self.assertEqual(bitfile.register_names, header.register_names)
+        self.assertEqual(bitfile.fifo_names, header.fifo_names)
+
+    def test_register_with_malformed_type_is_skipped(self):
+        registers = EXAMPLE_REGISTERS + [
+            register_xml_string("Broken", "<FXP></FXP>", type_descriptor("4021"), offset=0x50)]
+        with TemporaryBitfile(registers=registers) as path:
+            with mock.patch("sys.stdout"):
+                bitfile = Bitfile(path)
+        self.assertEqual(set(["Input U32", "Input Array I16", "Fxp", "Internal U8"]),
+                         set(bitfile.registers))
+
+    def test_missing_signature(self):
+        contents = bitfile_xml_string(EXAMPLE_REGISTERS, EXAMPLE_FIFOS)
+        contents = contents.replace("SignatureRegister", "Other")
+        with TemporaryBitfile() as path:
+            with open(path, "w") as bitfile:
+                bitfile.write(contents)
+            with self.assertRaises(RuntimeError):
+                Bitfile(path)
+
+
+class FifoTest(unittest.TestCase):
+    def _parse(self, fifo_xml):
+        with TemporaryBitfile(fifos=[fifo_xml]) as path:
+            bitfile = Bitfile(path)
+        return list(bitfile.fifos.values())[0]
+
+    def test_fixpoint(self):
+        fifo = self._parse(fixpoint_fifo_xml_string("Fxp", 2, "FXP", 24, 4, True))
+        self.assertIsInstance(fifo.datatype, FixpointDatatype)
+        self.assertEqual(24, fifo.datatype.num_bits)
+        self.assertEqual("I4.20", fifo.datatype.name)
+
+    def test_complex_fixpoint(self):
+        fifo = self._parse(fixpoint_fifo_xml_string("IQ", 3, "CFXP", 16, 1, True))
+        self.assertIsInstance(fifo.datatype, ComplexFixpointDatatype)
+        self.assertEqual(32, fifo.datatype.num_bits)
+
+
+class LoadBitfileTest(unittest.TestCase):
+    def setUp(self):
+        nifpga.bitfile._bitfile_cache.clear()
+        self.addCleanup(nifpga.bitfile._bitfile_cache.clear)
+        self._bitfile = TemporaryBitfile()
+        self._path = self._bitfile.__enter__()
+        self.addCleanup(self._bitfile.__exit__, None, None, None)
+        self._cache_dir = os.path.join(os.path.dirname(self._path), "cache")
+
+    def _rewrite(self, signature):
+        """ Changes the signature without changing the size or mtime. """
+        stat = os.stat(self._path)
+        with open(self._path, "w") as bitfile:
+            bitfile.write(bitfile_xml_string(EXAMPLE_REGISTERS, EXAMPLE_FIFOS,
+                                             signature=signature))
+        os.utime(self._path, (stat.st_atime, stat.st_mtime))
+
+    def test_read_signature(self):
+        self.assertEqual("0123456789ABCDEF0123456789ABCDEF", read_signature(self._path))
+
+    def test_in_process_cache(self):
+        bitfile = load_bitfile(self._path)
+        self.assertIs(bitfile, load_bitfile(os.path.relpath(self._path)))
+        stat = os.stat(self._path)
+        os.utime(self._path, (stat.st_atime, stat.st_mtime + 10))
+        reloaded = load_bitfile(self._path)
+        self.assertIsNot(bitfile, reloaded)
+        self.assertEqual(bitfile.signature, reloaded.signature)
+
+    def test_disk_cache(self):
+        bitfile = load_bitfile(self._path, cache_dir=self._cache_dir)
+        self.assertEqual(1, len(os.listdir(self._cache_dir)))
+        nifpga.bitfile._bitfile_cache.clear()
+        with mock.patch.object(Bitfile, "__init__", side_effect=AssertionError("parsed")):
+            cached = load_bitfile(self._path, cache_dir=self._cache_dir)
+        self.assertIsNot(bitfile, cached)
+        self.assertEqual(self._path, cached.filepath)
+        self.assertEqual(set(bitfile.registers), set(cached.registers))
+        self.assertEqual(str(bitfile.registers["Fxp"].datatype),
+                         str(cached.registers["Fxp"].datatype))
+        self.assertEqual(-0.5, cached.registers["Fxp"].datatype.fromBoolArray(
+            bitfile.registers["Fxp"].datatype.toBoolArray(-0.5)))
+        for name, register in bitfile.registers.items():
+            other = cached.registers[name]
+            self.assertEqual((str(register.datatype), register.offset, len(register),
+                              register.is_array(), register.access_may_timeout(),
+                              register.is_internal()),
+                             (str(other.datatype), other.offset, len(other),
+                              other.is_array(), other.access_may_timeout(),
+                              other.is_internal()))
+        for name, fifo in bitfile.fifos.items():
+            self.assertEqual((str(fifo.datatype), fifo.number),
+                             (str(cached.fifos[name].datatype), cached.fifos[name].number))
+
+    def test_cached_datatypes(self):
+        datatype = ClusterDatatype([
+            ("Gain", FixpointDatatype("FXP", 4, 12, True)),
+            ("IQ", ComplexFixpointDatatype("CFXP", 2, 14)),
+            ("Taps", ArrayDatatype(FixpointDatatype("FXP", 2, 6, False), 3)),
+        ])
+        values = json.loads(json.dumps(_datatype_values(datatype)))
+        self.assertEqual(str(datatype), str(_datatype_from_values(values)))
+
+    def test_disk_cache_from_another_version_is_ignored(self):
+        load_bitfile(self._path, cache_dir=self._cache_dir)
+        nifpga.bitfile._bitfile_cache.clear()
+        with mock.patch("nifpga.bitfile._package_version", return_value="0.0.1"), \
+                mock.patch.object(Bitfile, "__init__", side_effect=AssertionError("parsed")):
+            with self.assertRaises(AssertionError):
+                load_bitfile(self._path, cache_dir=self._cache_dir)
+
+    def test_disk_cache_from_environment(self):
+        with mock.patch.dict(os.environ, {"NIFPGA_BITFILE_CACHE_DIR": self._cache_dir}):
+            load_bitfile(self._path)
+        self.assertEqual(1, len(os.listdir(self._cache_dir)))
+
+    def test_disk_cache_checks_signature(self):
+        load_bitfile(self._path, cache_dir=self._cache_dir)
+        self._rewrite("FEDCBA9876543210FEDCBA9876543210")
+        nifpga.bitfile._bitfile_cache.clear()
+        bitfile = load_bitfile(self._path, cache_dir=self._cache_dir)
+        self.assertEqual("FEDCBA9876543210FEDCBA9876543210", bitfile.signature)
+
+    def test_corrupt_disk_cache_is_ignored(self):
+        load_bitfile(self._path, cache_dir=self._cache_dir)
+        for name in os.listdir(self._cache_dir):
+            with open(os.path.join(self._cache_dir, name), "wb") as cached:
+                cached.write(b"garbage")
+        nifpga.bitfile._bitfile_cache.clear()
+        self.assertEqual("0123456789ABCDEF0123456789ABCDEF",
+                         load_bitfile(self._path, cache_dir=self._cache_dir).signature)
+
+
+class RegisterTest(unittest.TestCase):
+    def test_scalar(self):
+        reg = Register(register_xml("Input U64", "<U64></U64>", "000C40080000"))
+        self.assertEqual(DataType.U64, reg.datatype)
+        self.assertFalse(reg.is_array())
+        self.assertEqual(0x100, reg.offset)
+
+    def test_array_of_bool(self):
+        reg = Register(register_xml("Bools", array_xml("Bools", 17, "<Boolean></Boolean>"),
+                                    "0010404000010000001100044021"))
+        self.assertEqual(DataType.Bool, reg.datatype)
+        self.assertTrue(reg.is_array())
+        self.assertEqual(17, len(reg))
+
+    def test_fixpoint(self):
+        flattened = fixpoint_flattened_type("405F", 16, 8, 1)
+        reg = Register(register_xml("Fxp", "<FXP></FXP>", flattened))
+        self.assertIsInstance(reg.datatype, FixpointDatatype)
+        self.assertEqual(16, reg.datatype.num_bits)
+        self.assertEqual("I8.8 (16 bits)", str(reg.datatype))
+
+    def test_array_of_fixpoint(self):
+        flattened = array_type_descriptor(4, fixpoint_flattened_type("405F", 12, -3, 1))
+        reg = Register(register_xml("FxpArray", array_xml("FxpArray", 4, "<FXP></FXP>"),
+                                    flattened))
+        self.assertTrue(reg.is_array())
+        self.assertEqual(4, len(reg))
+        self.assertIsInstance(reg.datatype, ArrayDatatype)
+        self.assertEqual(48, reg.datatype.num_bits)
+        self.assertEqual("I-3.15 (12 bits)", str(reg.datatype.element_datatype))
+
+    def test_nested_cluster(self):
+        reg = Register(register_xml("Config", CONFIG_CLUSTER_XML,
+                                    CONFIG_CLUSTER_FLATTENED))
+        self.assertFalse(reg.is_array())
+        datatype = reg.datatype
+        self.assertIsInstance(datatype, ClusterDatatype)
+        self.assertEqual(16 + 1 + 16 + 8, datatype.num_bits)
+        value = datatype.getEmptyValue()
+        value.Gain = -0.25
+        value.Enabled = 1
+        value.Limits.Low = -300
+        value.Limits.High = 200
+        result = datatype.fromBoolArray(datatype.toBoolArray(value))
+        self.assertEqual(-0.25, result.Gain)
+        self.assertEqual(1, result.Enabled)
+        self.assertEqual(-300, result.Limits.Low)
+        self.assertEqual(200, result.Limits.High)
+
+    def test_array_of_clusters(self):
+        flattened = array_type_descriptor(3, CONFIG_CLUSTER_FLATTENED)
+        reg = Register(register_xml("Table", array_xml("Table", 3, CONFIG_CLUSTER_XML),
+                                    flattened))
+        self.assertTrue(reg.is_array())
+        self.assertEqual(3, len(reg))
+        self.assertIsInstance(reg.datatype, ArrayDatatype)
+        self.assertIsInstance(reg.datatype.element_datatype, ClusterDatatype)
+        self.assertEqual(3 * 41, reg.datatype.num_bits)
+
+    def test_type_code_inside_other_fields(self):
+        # The size of the array holds 405F, the FXP type code
+        datatype_xml = cluster_xml("Settings", element_xml("Boolean", "Flag"),
+                                   array_xml("Gains", 0x405F, "<FXP></FXP>"))
+        flattened = cluster_type_descriptor(
+            type_descriptor("4021"),
+            array_type_descriptor(0x405F, fixpoint_flattened_type("405F", 12, 2, 0)))
+        reg = Register(register_xml("Settings", datatype_xml, flattened))
+        self.assertEqual("Array of 16479 U2.10 (12 bits)", reg.datatype._types.Gains)
+
+    def test_fixpoint_without_name_flag(self):
+        reg = Register(register_xml("Fxp", "<FXP></FXP>",
+                                    fixpoint_flattened_type("005F", 16, 8, 1)))
+        self.assertEqual("I8.8 (16 bits)", str(reg.datatype))
+        flattened = cluster_type_descriptor(type_descriptor("0021"),
+                                            fixpoint_flattened_type("005F", 12, 2, 0))
+        reg = Register(register_xml("Settings",
+                                    cluster_xml("Settings", element_xml("Boolean", "Flag"),
+                                                element_xml("FXP", "Gain")),
+                                    flattened))
+        self.assertEqual("U2.10 (12 bits)", reg.datatype._types.Gain)
+
+    def test_flattened_type_without_sizes(self):
+        flattened = "00004050000100000000" + "405F0000001000000008" + "0001"
+        with self.assertRaises(ValueError):
+            Register(register_xml("Config", cluster_xml("Config", element_xml("FXP", "Gain")),
+                                  flattened))
+
+    def test_flattened_type_not_matching_xml(self):
+        flattened = cluster_type_descriptor(type_descriptor("4021"))
+        with self.assertRaises(ValueError):
+            Register(register_xml("Config", cluster_xml("Config", element_xml("FXP", "Gain")),
+                                  flattened))
+        with self.assertRaises(ValueError):
+            Register(register_xml("Fxp", "<FXP></FXP>", type_descriptor("4021")))
+
+    def test_array_of_complex_fixpoint(self):
+        flattened = array_type_descriptor(2, fixpoint_flattened_type("405E", 8, 4, 1))
+        reg = Register(register_xml("CfxpArray", array_xml("CfxpArray", 2, "<CFXP></CFXP>"),
+                                    flattened))
+        self.assertIsInstance(reg.datatype.element_datatype, ComplexFixpointDatatype)
+        self.assertEqual(32, reg.datatype.num_bits)
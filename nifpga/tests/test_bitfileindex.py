@@ -0,0 +1,97 @@
+import mock
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+
+from nifpga.bitfileindex import build_index, find_bitfile, read_index
+from nifpga.session import Session
+from nifpga.tests.test_bitfile import (EXAMPLE_FIFOS, EXAMPLE_REGISTERS,
+                                       bitfile_xml_string)
+from nifpga.tests.test_session import FakeNiFpga
+
+SIGNATURES = ["%032X" % (i + 1) for i in range(3)]
+
+
+class BitfileIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._directory)
+        self._paths = []
+        for i, signature in enumerate(SIGNATURES):
+            subdirectory = os.path.join(self._directory, "target%d" % i)
+            os.makedirs(subdirectory)
+            self._paths.append(self._write(os.path.join(subdirectory, "fpga.lvbitx"),
+                                           bitfile_xml_string(EXAMPLE_REGISTERS[:i + 1],
+                                                              EXAMPLE_FIFOS,
+                                                              signature=signature)))
+        self._write(os.path.join(self._directory, "notes.txt"), "not a bitfile")
+
+    def _write(self, path, contents):
+        with open(path, "w") as output:
+            output.write(contents)
+        return path
+
+    def test_build_index(self):
+        index = build_index(self._directory, processes=1)
+        self.assertEqual(set(SIGNATURES), set(index))
+        entry = index[SIGNATURES[1]]
+        self.assertEqual(self._paths[1], entry["path"])
+        self.assertEqual(["Input Array I16", "Input U32"], entry["registers"])
+        self.assertEqual(["FPGA to Host I64", "Host to FPGA U32"], entry["fifos"])
+        self.assertEqual(65536, entry["base_address_on_device"])
+
+    def test_process_pool_gives_the_same_index(self):
+        self.assertEqual(build_index(self._directory, processes=1),
+                         build_index(self._directory, processes=2))
+
+    def test_process_pool_without_concurrent_futures(self):
+        # as on Python 2 without the futures backport
+        with mock.patch.dict(sys.modules, {"concurrent.futures": None}):
+            index = build_index(self._directory, processes=2)
+        self.assertEqual(build_index(self._directory, processes=1), index)
+
+    def test_index_file_without_os_replace(self):
+        # as on Python 2
+        index_path = os.path.join(self._directory, "index.json")
+        python2_os = mock.Mock(spec=["path", "remove", "rename"], path=os.path,
+                               remove=os.remove, rename=os.rename)
+        with mock.patch("nifpga.bitfile.os", python2_os):
+            build_index(self._directory, index_path=index_path, processes=1)
+            index = build_index(self._directory, index_path=index_path, processes=1)
+        self.assertEqual(index, read_index(index_path))
+
+    def test_index_file(self):
+        index_path = os.path.join(self._directory, "index.json")
+        index = build_index(self._directory, index_path=index_path, processes=1)
+        self.assertEqual(index, read_index(index_path))
+        self.assertEqual(self._paths[2], find_bitfile(SIGNATURES[2].lower(), index_path))
+
+    def test_unreadable_and_duplicate_bitfiles_are_skipped(self):
+        self._write(os.path.join(self._directory, "broken.lvbitx"), "<Bitfile>")
+        self._write(os.path.join(self._directory, "zcopy.lvbitx"),
+                    bitfile_xml_string(EXAMPLE_REGISTERS, EXAMPLE_FIFOS,
+                                       signature=SIGNATURES[0]))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            index = build_index(self._directory, processes=1)
+        self.assertEqual(2, len(caught))
+        self.assertEqual(set(SIGNATURES), set(index))
+        self.assertEqual(self._paths[0], index[SIGNATURES[0]]["path"])
+
+    def test_find_bitfile_checks_the_signature(self):
+        index = build_index(self._directory, processes=1)
+        with self.assertRaises(KeyError):
+            find_bitfile("F" * 32, index)
+        self._write(self._paths[0], bitfile_xml_string(EXAMPLE_REGISTERS, EXAMPLE_FIFOS,
+                                                       signature="F" * 32))
+        with self.assertRaises(KeyError):
+            find_bitfile(SIGNATURES[0], index)
+
+    def test_session_from_signature(self):
+        index = build_index(self._directory, processes=1)
+        with mock.patch("nifpga.session._get_nifpga", return_value=FakeNiFpga()):
+            session = Session.from_signature(SIGNATURES[2], "RIO0", index)
+        self.assertIn("Fxp", session.registers)
@@ -0,0 +1,181 @@
+import ctypes
+import io
+import os
+import tempfile
+import unittest
+import warnings
+
+import nifpga
+from nifpga import calltrace
+from nifpga.calltrace import (TracedMemory, TraceLibrary, TraceRecorder,
+                              read_trace, replay)
+from nifpga.statuscheckedlibrary import (FunctionInfo, LibraryFunctionInfo,
+                                         NamedArgtype, StatusCheckedFunctions)
+
+LIBRARY_FUNCTION_INFOS = [
+    LibraryFunctionInfo(
+        pretty_name="ReadArrayU32",
+        name_in_library="NiFpgaDll_ReadArrayU32",
+        named_argtypes=[
+            NamedArgtype("session", ctypes.c_uint32),
+            NamedArgtype("indicator", ctypes.c_uint32),
+            NamedArgtype("array", ctypes.POINTER(ctypes.c_uint32)),
+            NamedArgtype("size", ctypes.c_size_t),
+        ]),
+    LibraryFunctionInfo(
+        pretty_name="WriteU32",
+        name_in_library="NiFpgaDll_WriteU32",
+        named_argtypes=[
+            NamedArgtype("session", ctypes.c_uint32),
+            NamedArgtype("control", ctypes.c_uint32),
+            NamedArgtype("value", ctypes.c_uint32),
+        ]),
+]
+
+
+def read_array(session, indicator, array, size):
+    for i in range(size):
+        array[i] = indicator + i
+    return 0
+
+
+def write(session, control, value):
+    return -50400 if value == 0 else 0
+
+
+class CallTraceTest(unittest.TestCase):
+    def setUp(self):
+        self._library = StatusCheckedFunctions([
+            FunctionInfo(function=read_array, name="ReadArrayU32",
+                         argument_names=["session", "indicator", "array", "size"]),
+            FunctionInfo(function=write, name="WriteU32",
+                         argument_names=["session", "control", "value"]),
+        ])
+
+    def _record(self, max_buffer_bytes=None):
+        trace_file = io.BytesIO()
+        session = ctypes.c_uint32(7)
+        with TraceRecorder(trace_file, max_buffer_bytes) as recorder:
+            array = (ctypes.c_uint32 * 4)()
+            self._library.ReadArrayU32(session, 10, array, 4)
+            self._library.WriteU32(session, 2, 5)
+            with self.assertRaises(nifpga.FifoTimeoutError):
+                self._library.WriteU32(session, 2, 0)
+        self.assertEqual([], nifpga.status._call_hooks)
+        self.assertFalse(recorder._started)
+        trace_file.seek(0)
+        return read_trace(trace_file)
+
+    def test_record(self):
+        trace = self._record()
+        self.assertEqual(["ReadArrayU32", "WriteU32", "WriteU32"], [call.name for call in trace])
+        self.assertEqual([0, 0, -50400], [call.status for call in trace])
+        session, indicator, array, size = trace[0].args
+        self.assertEqual(TracedMemory(4, b"\x07\x00\x00\x00"), session)
+        self.assertEqual((10, 4), (indicator, size))
+        self.assertEqual(16, array.size)
+        self.assertEqual([10, 11, 12, 13], list((ctypes.c_uint32 * 4).from_buffer_copy(array.data)))
+        self.assertEqual((2, 5), trace[1].args[1:])
+        self.assertTrue(all(call.seconds >= 0 for call in trace))
+
+    def test_only_transferred_elements_are_recorded(self):
+        trace_file = io.BytesIO()
+        with TraceRecorder(trace_file):
+            # a reused buffer larger than the transfer
+            array = (ctypes.c_uint32 * 64)()
+            self._library.ReadArrayU32(ctypes.c_uint32(7), 10, array, 2)
+        trace_file.seek(0)
+        recorded = read_trace(trace_file)[0].args[2]
+        self.assertEqual(TracedMemory(8, b"\x0a\x00\x00\x00\x0b\x00\x00\x00"), recorded)
+
+    def test_truncated_buffers(self):
+        trace = self._record(max_buffer_bytes=8)
+        array = trace[0].args[2]
+        self.assertEqual(16, array.size)
+        self.assertEqual(8, len(array.data))
+
+    def test_not_a_trace(self):
+        with self.assertRaises(ValueError):
+            read_trace(io.BytesIO(b"not a trace"))
+
+    def test_trace_library_answers_with_the_trace(self):
+        library = TraceLibrary(self._record(), LIBRARY_FUNCTION_INFOS)
+        array = (ctypes.c_uint32 * 4)()
+        library.ReadArrayU32(ctypes.c_uint32(7), 0, ctypes.cast(array, ctypes.POINTER(ctypes.c_uint32)), 4)
+        self.assertEqual([10, 11, 12, 13], list(array))
+        library.WriteU32(ctypes.c_uint32(7), 2, 5)
+        with self.assertRaises(nifpga.FifoTimeoutError):
+            library.WriteU32(ctypes.c_uint32(7), 2, 5)
+        with self.assertRaises(RuntimeError):
+            library.WriteU32(ctypes.c_uint32(7), 2, 5)
+
+    def test_trace_library_checks_the_order_of_calls(self):
+        library = TraceLibrary(self._record(), LIBRARY_FUNCTION_INFOS)
+        with self.assertRaises(RuntimeError):
+            library.WriteU32(ctypes.c_uint32(7), 2, 5)
+
+    def test_replay(self):
+        trace = self._record()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            result = replay(trace, TraceLibrary(trace, LIBRARY_FUNCTION_INFOS))
+        self.assertEqual(3, result.calls)
+        self.assertEqual(0, result.status_mismatches)
+        result = replay(trace, self._library, LIBRARY_FUNCTION_INFOS)
+        self.assertEqual(0, result.status_mismatches)
+
+    def test_replay_irq_calls(self):
+        infos = [lfi for lfi in nifpga.nifpga._nifpga_library_function_infos()
+                 if lfi.pretty_name in ("ReserveIrqContext", "WaitOnIrqs", "UnreserveIrqContext")]
+        contexts = []
+
+        def reserve(session, context):
+            context[0] = 1234
+            return 0
+
+        def wait(session, context, irqs, timeout, irqs_asserted, timed_out):
+            contexts.append(context[0])
+            irqs_asserted[0] = irqs
+            return 0
+
+        def unreserve(session, context):
+            contexts.append(context[0])
+            return 0
+
+        functions = {"ReserveIrqContext": reserve, "WaitOnIrqs": wait, "UnreserveIrqContext": unreserve}
+        function_infos = []
+        for lfi in infos:
+            argtypes = [named_argtype.argtype for named_argtype in lfi.named_argtypes]
+            # a C function pointer, which checks its arguments like the library
+            function = ctypes.CFUNCTYPE(ctypes.c_int32, *argtypes)(functions[lfi.pretty_name])
+            function.__name__ = lfi.name_in_library
+            function_infos.append(FunctionInfo(
+                function=function, name=lfi.pretty_name,
+                argument_names=[named_argtype.name for named_argtype in lfi.named_argtypes]))
+        library = StatusCheckedFunctions(function_infos)
+        trace_file = io.BytesIO()
+        session = ctypes.c_uint32(7)
+        with TraceRecorder(trace_file):
+            context = ctypes.c_void_p()
+            library.ReserveIrqContext(session, context)
+            library.WaitOnIrqs(session, context, 3, 100, ctypes.c_uint32(), ctypes.c_uint8())
+            library.UnreserveIrqContext(session, context)
+        trace_file.seek(0)
+        trace = read_trace(trace_file)
+        del contexts[:]
+        result = replay(trace, library, infos)
+        self.assertEqual(3, result.calls)
+        self.assertEqual(0, result.status_mismatches)
+        self.assertEqual([1234, 1234], contexts)
+
+    def test_main(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "calls.trace")
+        try:
+            with TraceRecorder(path):
+                self._library.WriteU32(ctypes.c_uint32(7), 2, 5)
+            self.assertEqual(1, len(read_trace(path)))
+            self.assertEqual(0, calltrace.main(["calltrace", path]))
+        finally:
+            os.remove(path)
+            os.rmdir(directory)
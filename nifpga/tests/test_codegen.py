@@ -0,0 +1,70 @@
+import mock
+import unittest
+
+from nifpga.bitfile import Bitfile
+from nifpga.codegen import generate_module
+from nifpga.nifpga import ClusterDatatype
+from nifpga.tests.test_bitfile import (CONFIG_CLUSTER_FLATTENED, CONFIG_CLUSTER_XML,
+                                       EXAMPLE_FIFOS, EXAMPLE_REGISTERS,
+                                       TemporaryBitfile, fixpoint_fifo_xml_string,
+                                       register_xml_string)
+from nifpga.tests.test_session import FakeNiFpga
+
+REGISTERS = EXAMPLE_REGISTERS + [
+    register_xml_string("Config", CONFIG_CLUSTER_XML, CONFIG_CLUSTER_FLATTENED, offset=0x50),
+    register_xml_string("2nd run", "<U8></U8>", "000440050000", offset=0x60),
+]
+FIFOS = EXAMPLE_FIFOS + [fixpoint_fifo_xml_string("Fxp FIFO", 2, "FXP", 16, 4, True)]
+
+
+class CodegenTest(unittest.TestCase):
+    def setUp(self):
+        with TemporaryBitfile(REGISTERS, FIFOS) as path:
+            self._bitfile = Bitfile(path)
+            self._source = generate_module(path, class_name="ExampleSession")
+        self._module = {}
+        with mock.patch.object(Bitfile, "_parse") as parse:
+            exec(compile(self._source, "example.py", "exec"), self._module)
+        self.assertFalse(parse.called)
+        self._nifpga = FakeNiFpga()
+        patcher = mock.patch("nifpga.session._get_nifpga", return_value=self._nifpga)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bitfile_is_rebuilt(self):
+        bitfile = self._module["BITFILE"]
+        self.assertEqual(self._bitfile.filepath, bitfile.filepath)
+        self.assertEqual(self._bitfile.signature, bitfile.signature)
+        self.assertEqual(self._bitfile.base_address_on_device(), bitfile.base_address_on_device())
+        self.assertEqual(self._bitfile.register_names, bitfile.register_names)
+        for name, register in self._bitfile.registers.items():
+            generated = bitfile.registers[name]
+            self.assertEqual(str(register.datatype), str(generated.datatype))
+            self.assertEqual(register.offset, generated.offset)
+            self.assertEqual(len(register), len(generated))
+            self.assertEqual(register.is_array(), generated.is_array())
+            self.assertEqual(register.is_internal(), generated.is_internal())
+        for name, fifo in self._bitfile.fifos.items():
+            self.assertEqual(str(fifo.datatype), str(bitfile.fifos[name].datatype))
+            self.assertEqual(fifo.number, bitfile.fifos[name].number)
+        self.assertIsInstance(bitfile.registers["Config"].datatype, ClusterDatatype)
+
+    def test_attributes(self):
+        session = self._module["ExampleSession"]("RIO0")
+        session.Input_U32.write(7)
+        self.assertEqual({65536 + 0x10: 7}, self._nifpga.memory)
+        self.assertIs(session.registers["Input U32"], session.Input_U32)
+        self.assertIn("Input_U32", vars(session))
+        self.assertIs(session.fifos["Fxp FIFO"], session.Fxp_FIFO)
+        self.assertIs(session.registers["2nd run"], session._2nd_run)
+        self.assertFalse(hasattr(session, "Internal_U8"))
+
+    def test_names_do_not_shadow_session_attributes(self):
+        with TemporaryBitfile([register_xml_string("run", "<U8></U8>", "000440050000")],
+                              []) as path:
+            source = generate_module(path, class_name="RunSession")
+        module = {}
+        exec(compile(source, "run.py", "exec"), module)
+        session = module["RunSession"]("RIO0")
+        self.assertIs(session.registers["run"], session.run_)
+        self.assertTrue(callable(session.run))
@@ -0,0 +1,104 @@
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import numpy.testing as nt
+
+from nifpga.datalogger import NpyChunkWriter, RegisterSampler
+from nifpga.session import Session
+from nifpga.tests.test_bitfile import (EXAMPLE_REGISTERS, TemporaryBitfile,
+                                       register_xml_string)
+from nifpga.tests.test_session import FakeNiFpga
+
+
+class RegisterSamplerTest(unittest.TestCase):
+    def setUp(self):
+        self._nifpga = FakeNiFpga()
+        patcher = mock.patch("nifpga.session._get_nifpga", return_value=self._nifpga)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with TemporaryBitfile() as path:
+            self._session = Session(path, "RIO0")
+
+    def _count_up(self, sampler, number_of_samples):
+        """ Takes samples while changing the registers between samples. """
+        registers = self._session.registers
+        for i in range(number_of_samples):
+            registers["Input U32"].write(i)
+            registers["Input Array I16"].write([i, -i, 2 * i, -2 * i])
+            registers["Fxp"].write(i / 256.0)
+            sampler.sample()
+
+    def test_chunks(self):
+        sampler = RegisterSampler(self._session,
+                                  ["Input U32", "Input Array I16", "Fxp"],
+                                  rate_hz=1000, chunk_size=4)
+        self._count_up(sampler, 6)
+        self.assertEqual(1, len(sampler.chunks))
+        sampler.flush()
+        self.assertEqual(2, len(sampler.chunks))
+
+        first, second = sampler.chunks
+        self.assertEqual(np.uint32, first["Input U32"].dtype)
+        nt.assert_array_equal([0, 1, 2, 3], first["Input U32"])
+        nt.assert_array_equal([4, 5], second["Input U32"])
+        nt.assert_array_equal([[5, -5, 10, -10]], second["Input Array I16"][1:])
+        nt.assert_array_equal(np.arange(4) / 256.0, first["Fxp"])
+        self.assertEqual((4,), first["timestamp"].shape)
+        self.assertTrue(np.all(np.diff(first["timestamp"]) >= 0))
+
+    def test_single_element_array_keeps_its_shape(self):
+        registers = EXAMPLE_REGISTERS + [
+            register_xml_string("Array U16", "<Array><Name>Array U16</Name><Size>1</Size>"
+                                "<Type><U16></U16></Type></Array>",
+                                "0010404000010000000100044006", offset=0x50)]
+        with TemporaryBitfile(registers=registers) as path:
+            session = Session(path, "RIO0")
+        session.registers["Array U16"].write([7])
+        sampler = RegisterSampler(session, ["Array U16", "Input U32"], rate_hz=1000)
+        sampler.sample()
+        sampler.sample()
+        sampler.flush()
+        chunk = sampler.chunks[0]
+        nt.assert_array_equal([[7], [7]], chunk["Array U16"])
+        self.assertEqual((2,), chunk["Input U32"].shape)
+
+    def test_register_named_timestamp_is_rejected(self):
+        registers = EXAMPLE_REGISTERS + [
+            register_xml_string("timestamp", "<U32></U32>", "000C40070000", offset=0x50)]
+        with TemporaryBitfile(registers=registers) as path:
+            session = Session(path, "RIO0")
+        with self.assertRaises(ValueError):
+            RegisterSampler(session, ["Input U32", "timestamp"], rate_hz=1000)
+
+    def test_run_stops_after_number_of_samples(self):
+        sampler = RegisterSampler(self._session, ["Input U32"], rate_hz=2000,
+                                  chunk_size=8)
+        sampler.run(number_of_samples=20)
+        self.assertEqual([8, 8, 4], [len(c["timestamp"]) for c in sampler.chunks])
+        timestamps = np.concatenate([c["timestamp"] for c in sampler.chunks])
+        self.assertGreaterEqual(timestamps[-1] - timestamps[0], 19 / 2000.0 * 0.9)
+
+    def test_run_stops_on_event(self):
+        stop = threading.Event()
+        stop.set()
+        sampler = RegisterSampler(self._session, ["Input U32"], rate_hz=10)
+        sampler.run(stop_event=stop)
+        self.assertEqual([], sampler.chunks)
+
+    def test_npy_chunk_writer(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        sampler = RegisterSampler(self._session, ["Input U32", "Input Array I16"],
+                                  rate_hz=1000, chunk_size=3,
+                                  on_chunk=NpyChunkWriter(directory))
+        self._count_up(sampler, 5)
+        sampler.flush()
+        self.assertEqual(["chunk000000.npy", "chunk000001.npy"], sorted(os.listdir(directory)))
+        records = np.load(os.path.join(directory, "chunk000001.npy"), mmap_mode="r")
+        nt.assert_array_equal([3, 4], records["Input U32"])
+        nt.assert_array_equal([4, -4, 8, -8], records["Input Array I16"][1])
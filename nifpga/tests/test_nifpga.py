@@ -1,5 +1,6 @@
 import ctypes
 import mock
+import subprocess
 import unittest
 import sys
 import warnings
@@ -7,6 +8,7 @@ from contextlib import contextmanager
 from nose import SkipTest
 
 import nifpga
+from nifpga.lazyimport import LazyModule
 from nifpga.statuscheckedlibrary import (check_status,
                                          NamedArgtype,
                                          LibraryFunctionInfo,
@@ -137,6 +139,55 @@ class CheckStatusTest(unittest.TestCase):
             return_a_checked_status(1)
 
 
+class WarningPolicyTest(unittest.TestCase):
+    def tearDown(self):
+        nifpga.set_warning_policy(nifpga.WARN_ALWAYS)
+        nifpga.reset_warning_summary()
+
+    def test_aggregate(self):
+        nifpga.set_warning_policy(nifpga.WARN_AGGREGATE)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            for _ in range(3):
+                return_a_checked_status(50400)
+            return_a_checked_status(1)
+        self.assertEqual([], w)
+        self.assertEqual({(50400, "Fake Function Name"): 3,
+                          (1, "Fake Function Name"): 1},
+                         nifpga.get_warning_summary())
+        nifpga.reset_warning_summary()
+        self.assertEqual({}, nifpga.get_warning_summary())
+
+    def test_errors_are_still_raised(self):
+        nifpga.set_warning_policy(nifpga.WARN_AGGREGATE)
+        with self.assertRaises(nifpga.FifoTimeoutError):
+            return_a_checked_status(-50400)
+        self.assertEqual({}, nifpga.get_warning_summary())
+
+    @mock.patch("nifpga.status._perf_counter")
+    def test_interval(self, mock_perf_counter):
+        nifpga.set_warning_policy(nifpga.WARN_INTERVAL, interval_seconds=10)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            for now in [0, 1, 9, 10, 11]:
+                mock_perf_counter.return_value = now
+                return_a_checked_status(50400)
+        self.assertEqual(2, len(w))
+        self.assertIsInstance(w[0].message, nifpga.FifoTimeoutWarning)
+        self.assertEqual({(50400, "Fake Function Name"): 5},
+                         nifpga.get_warning_summary())
+
+    def test_always_does_not_count(self):
+        with assert_warns(nifpga.FifoTimeoutWarning):
+            return_a_checked_status(50400)
+        self.assertEqual(nifpga.WARN_ALWAYS, nifpga.get_warning_policy())
+        self.assertEqual({}, nifpga.get_warning_summary())
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            nifpga.set_warning_policy("sometimes")
+
+
 class StatusCheckedLibraryTestCRunTime(unittest.TestCase):
     """
     Since we can't load NiFpga on a dev machine unless we have all its
@@ -268,6 +319,18 @@ class StatusCheckedLibraryTestMockedLibrary(unittest.TestCase):
         self._mock_awesome_function.return_value = 0
         self._library.AwesomeFunction(ctypes.c_uint32(33), ctypes.c_char_p(b"2"))
 
+    def test_entry_points_are_set_up_on_first_use(self):
+        self.assertNotIn("AwesomeFunction", self._library._wrapped_functions)
+        function = self._library["AwesomeFunction"]
+        self.assertEqual([ctypes.c_uint32, ctypes.c_char_p], self._mock_awesome_function.argtypes)
+        self.assertIs(function, self._library.AwesomeFunction)
+
+    def test_unknown_function(self):
+        with self.assertRaises(KeyError):
+            self._library["NotAFunction"]
+        with self.assertRaises(AttributeError):
+            self._library.NotAFunction
+
     def test_good_error_message_if_wrong_number_of_arguments(self):
         """ Tests that calling a function with wrong number of arguments is error """
         try:
@@ -287,3 +350,68 @@ class NiFpgaTest(unittest.TestCase):
             nifpga.nifpga._NiFpga()
         except LibraryNotFoundError:
             pass
+
+    @mock.patch("nifpga.nifpga._NiFpga")
+    def test_one_library_per_process(self, mock_nifpga):
+        with mock.patch("nifpga.nifpga._shared_nifpga", None):
+            first = nifpga.nifpga._get_nifpga()
+            self.assertIs(first, nifpga.nifpga._get_nifpga())
+        self.assertEqual(1, mock_nifpga.call_count)
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_does_not_import_numpy(self):
+        code = "import sys, nifpga; print('numpy' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(b"False", output.strip())
+
+    def test_lazy_module(self):
+        module = LazyModule("colorsys")
+        self.assertIn("lazy", repr(module))
+        self.assertEqual((1.0, 1.0, 1.0), module.hsv_to_rgb(0.0, 0.0, 1.0))
+        import colorsys
+        self.assertIs(colorsys.hsv_to_rgb, module.hsv_to_rgb)
+        with self.assertRaises(AttributeError):
+            module.not_an_attribute
+
+    def test_star_import_exports_status_classes(self):
+        namespace = {}
+        exec("from nifpga import *", namespace)
+        self.assertIs(nifpga.status.codes_to_exception_classes[-61141],
+                      namespace["FpgaBusyError"])
+        self.assertIn("FifoTimeoutWarning", namespace)
+        self.assertIn("Session", namespace)
+        namespace = {}
+        exec("from nifpga.status import *", namespace)
+        self.assertIn("FpgaBusyError", namespace)
+        self.assertIn("check_status", namespace)
+
+    def test_status_classes_without_module_getattr(self):
+        # before Python 3.7 the package has no module __getattr__, so the
+        # classes have to be its attributes
+        code = ("import sys; sys.version_info = (3, 6, 15, 'final', 0); import nifpga; "
+                "from nifpga import FifoTimeoutError; namespace = {}; "
+                "exec('from nifpga import *', namespace); "
+                "print('FifoTimeoutError' in vars(nifpga) and "
+                "namespace['FpgaBusyError'] is nifpga.status.FpgaBusyError)")
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(b"True", output.strip())
+
+    def test_import_status_class(self):
+        from nifpga import FifoTimeoutError
+        self.assertIs(nifpga.status.codes_to_exception_classes[-50400], FifoTimeoutError)
+
+    def test_status_classes_are_created_once(self):
+        error_class = nifpga.status.codes_to_exception_classes[-50400]
+        self.assertIs(nifpga.FifoTimeoutError, error_class)
+        self.assertIs(nifpga.status.FifoTimeoutError, error_class)
+        self.assertEqual(-50400, error_class.CODE)
+        self.assertTrue(issubclass(error_class, nifpga.ErrorStatus))
+        self.assertTrue(issubclass(nifpga.FifoTimeoutWarning, nifpga.WarningStatus))
+        self.assertIn(50400, nifpga.status.codes_to_exception_classes)
+        self.assertNotIn(-1, nifpga.status.codes_to_exception_classes)
+        self.assertEqual(2 * len(nifpga.status.error_codes),
+                         len(list(nifpga.status.codes_to_exception_classes)))
+        self.assertIn("FpgaBusyError", dir(nifpga))
+        with self.assertRaises(AttributeError):
+            nifpga.NotAStatusError
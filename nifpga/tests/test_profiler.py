@@ -0,0 +1,64 @@
+import mock
+import unittest
+import warnings
+
+import nifpga
+from nifpga.profiler import CallProfiler
+from nifpga.statuscheckedlibrary import FunctionInfo, StatusCheckedFunctions
+
+
+def return_status(status):
+    return status
+
+
+class CallProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self._functions = StatusCheckedFunctions([
+            FunctionInfo(function=return_status,
+                         name="ReturnStatus",
+                         argument_names=["status"])])
+
+    def test_records_calls_while_started(self):
+        self._functions.ReturnStatus(0)
+        with CallProfiler() as profiler:
+            self._functions.ReturnStatus(0)
+            self._functions["ReturnStatus"](0)
+        self._functions.ReturnStatus(0)
+        statistics = profiler.as_dict()
+        self.assertEqual(["ReturnStatus"], list(statistics))
+        self.assertEqual(2, statistics["ReturnStatus"]["count"])
+        self.assertEqual(2, sum(statistics["ReturnStatus"]["histogram"]))
+        self.assertLessEqual(statistics["ReturnStatus"]["min_seconds"],
+                             statistics["ReturnStatus"]["max_seconds"])
+
+    def test_records_calls_that_fail(self):
+        with CallProfiler() as profiler:
+            with self.assertRaises(nifpga.FifoTimeoutError):
+                self._functions.ReturnStatus(-50400)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                self._functions.ReturnStatus(50400)
+        self.assertEqual(2, profiler.as_dict()["ReturnStatus"]["count"])
+
+    @mock.patch("nifpga.status._perf_counter")
+    def test_histogram(self, mock_perf_counter):
+        # calls of 0.5 us, 3 us and 3 us
+        mock_perf_counter.side_effect = [0, 0.5e-6, 0, 3e-6, 0, 3e-6]
+        with CallProfiler() as profiler:
+            for _ in range(3):
+                self._functions.ReturnStatus(0)
+        statistics = profiler.as_dict()["ReturnStatus"]
+        self.assertEqual([1, 0, 2], statistics["histogram"])
+        self.assertAlmostEqual(6.5e-6, statistics["total_seconds"])
+        self.assertAlmostEqual(3e-6, statistics["max_seconds"])
+
+    def test_reset(self):
+        profiler = CallProfiler()
+        profiler.start()
+        try:
+            self._functions.ReturnStatus(0)
+            profiler.reset()
+            self.assertEqual({}, profiler.as_dict())
+        finally:
+            profiler.stop()
+        self.assertEqual([], nifpga.status._call_hooks)
@@ -0,0 +1,443 @@
+import ctypes
+import mock
+import threading
+import unittest
+
+import numpy as np
+import numpy.testing as nt
+
+import nifpga
+
+from nifpga.nifpga import (ArrayDatatype, ClusterDatatype,
+                           ComplexFixpointDatatype, DataType, FixpointDatatype)
+from nifpga.status import FifoTimeoutError, check_status
+from nifpga.session import (Session, _ArrayRegister, _BoolArrayMappedRegister,
+                            _FIFO, _Register)
+from nifpga.tests.test_bitfile import TemporaryBitfile
+
+
+class FakeBitfileRegister(object):
+    """
+    Stands in for a bitfile.Register, so register wrappers can be created
+    without parsing an .lvbitx file.
+    """
+    def __init__(self, name, datatype, num_elements=1, offset=0x100,
+                 is_array=None, internal=False, access_may_timeout=False):
+        self.name = name
+        self.datatype = datatype
+        self.offset = offset
+        self._num_elements = num_elements
+        self._is_array = num_elements > 1 if is_array is None else is_array
+        self._internal = internal
+        self._access_may_timeout = access_may_timeout
+
+    def __len__(self):
+        return self._num_elements
+
+    def is_array(self):
+        return self._is_array
+
+    def is_internal(self):
+        return self._internal
+
+    def access_may_timeout(self):
+        return self._access_may_timeout
+
+
+class FakeBitfileFifo(object):
+    def __init__(self, name, datatype, number=0):
+        self.name = name
+        self.datatype = datatype
+        self.number = number
+
+
+class FakeNiFpga(object):
+    """
+    Stands in for _NiFpga. Register reads and writes go to a dictionary of
+    resource to value, FIFOs are python lists, every call is counted by its
+    pretty name, and every buffer passed to the driver is kept in 'buffers'.
+    WaitOnIrqs returns the IRQs in the 'irqs' bitmask, or times out.
+    """
+    def __init__(self):
+        self.memory = {}
+        self.fifos = {}
+        self.calls = {}
+        self.buffers = []
+        self.irqs = 0
+
+    def __getitem__(self, name):
+        if name.startswith("ReadFifo"):
+            return self._counted(name, self._read_fifo)
+        if name.startswith("WriteFifo"):
+            return self._counted(name, self._write_fifo)
+        if name.startswith("AcquireFifo") or name == "ReleaseFifoElements":
+            return self._counted(name, lambda *args: 0)
+        if name.startswith("ReadArray"):
+            return self._counted(name, self._read_array)
+        if name.startswith("WriteArray"):
+            return self._counted(name, self._write_array)
+        if name.startswith("Read"):
+            return self._counted(name, self._read)
+        if name.startswith("Write"):
+            return self._counted(name, self._write)
+        raise KeyError(name)
+
+    def __getattr__(self, name):
+        # Open, Close, Run and friends succeed without doing anything
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name == "WaitOnIrqs":
+            return self._counted(name, self._wait_on_irqs)
+        return self._counted(name, lambda *args: 0)
+
+    def _counted(self, name, function):
+        def counted(*args):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return function(*args) or 0
+        counted.__name__ = name
+        argument_names = ["argument %d" % i for i in range(8)]
+        return check_status(name, argument_names, name)(counted)
+
+    def _wait_on_irqs(self, session, context, irqs, timeout_ms, irqs_asserted, timed_out):
+        irqs_asserted.value = self.irqs & irqs
+        timed_out.value = not irqs_asserted.value
+
+    def _read(self, session, indicator, value):
+        self.buffers.append(value)
+        if isinstance(value, ctypes._Pointer):
+            value[0] = self.memory.get(indicator, 0)
+        else:
+            value.value = self.memory.get(indicator, 0)
+
+    def _write(self, session, control, value):
+        self.memory[control] = value
+
+    def _read_array(self, session, indicator, array, size):
+        self.buffers.append(array)
+        stored = self.memory.get(indicator, [0] * size)
+        for i in range(size):
+            array[i] = stored[i]
+
+    def _write_array(self, session, control, array, size):
+        self.buffers.append(array)
+        self.memory[control] = [array[i] for i in range(size)]
+
+    def _read_fifo(self, session, fifo, data, number_of_elements, timeout_ms,
+                   elements_remaining):
+        self.buffers.append(data)
+        queue = self.fifos.setdefault(fifo, [])
+        if len(queue) < number_of_elements:
+            return FifoTimeoutError.CODE
+        for i in range(number_of_elements):
+            data[i] = queue.pop(0)
+        elements_remaining.value = len(queue)
+
+    def _write_fifo(self, session, fifo, data, number_of_elements, timeout_ms,
+                    empty_elements_remaining):
+        self.buffers.append(data)
+        queue = self.fifos.setdefault(fifo, [])
+        if len(queue) + number_of_elements > 1024:
+            return FifoTimeoutError.CODE
+        queue.extend(data[i] for i in range(number_of_elements))
+        empty_elements_remaining.value = 1024 - len(queue)
+
+
+def distinct(objects):
+    return len(set(id(o) for o in objects))
+
+
+class ArrayRegisterTest(unittest.TestCase):
+    def _create(self, datatype, num_elements=4):
+        self._nifpga = FakeNiFpga()
+        bitfile_register = FakeBitfileRegister("Array", datatype, num_elements)
+        return _ArrayRegister(ctypes.c_uint32(1), self._nifpga,
+                              bitfile_register, 0)
+
+    def test_write_list_and_read_list(self):
+        register = self._create(DataType.I16)
+        register.write([1, -2, 3, -4])
+        self.assertEqual([1, -2, 3, -4], register.read())
+
+    def test_write_floats_to_integer_array_raises(self):
+        register = self._create(DataType.I16, num_elements=2)
+        with self.assertRaises(TypeError):
+            register.write([1.7, -2.2])
+        with self.assertRaises(TypeError):
+            register.write(np.array([1.0, 2.0]))
+        register = self._create(DataType.Sgl, num_elements=2)
+        register.write([1.5, 2])
+        self.assertEqual([1.5, 2.0], register.read())
+
+    def test_write_and_read_numpy(self):
+        register = self._create(DataType.U32)
+        data = np.arange(4, dtype=np.uint32) * 1000
+        register.write(data)
+        result = register.read(as_numpy=True)
+        self.assertEqual(np.uint32, result.dtype)
+        nt.assert_array_equal(data, result)
+
+    def test_write_contiguous_numpy_without_copying(self):
+        register = self._create(DataType.I16)
+        data = np.array([1, -2, 3, -4], dtype=np.int16)
+        register.write(data)
+        self.assertEqual(data.ctypes.data,
+                         ctypes.cast(self._nifpga.buffers[-1], ctypes.c_void_p).value)
+        register.write(data.astype(np.int32))
+        self.assertNotEqual(data.ctypes.data,
+                            ctypes.cast(self._nifpga.buffers[-1], ctypes.c_void_p).value)
+        self.assertEqual([1, -2, 3, -4], register.read())
+
+    def test_write_non_contiguous_numpy(self):
+        register = self._create(DataType.Dbl)
+        data = np.arange(8, dtype=np.float64)[::2]
+        register.write(data)
+        self.assertEqual([0.0, 2.0, 4.0, 6.0], register.read())
+
+    def test_bool_array_reads_python_bools(self):
+        register = self._create(DataType.Bool, 3)
+        register.write([True, False, True])
+        result = register.read()
+        self.assertEqual([True, False, True], result)
+        self.assertTrue(all(type(elem) is bool for elem in result))
+        self.assertEqual(np.bool_, register.read(as_numpy=True).dtype)
+
+    def test_bad_length(self):
+        register = self._create(DataType.U8)
+        with self.assertRaises(AssertionError):
+            register.write([1, 2, 3])
+
+    def test_read_into_out_array(self):
+        register = self._create(DataType.I32)
+        register.write([5, 6, 7, 8])
+        out = np.zeros(4, dtype=np.int32)
+        self.assertIs(out, register.read(out=out))
+        nt.assert_array_equal([5, 6, 7, 8], out)
+
+    def test_numpy_read_does_not_alias_reused_buffer(self):
+        register = self._create(DataType.U8)
+        register.write([1, 2, 3, 4])
+        first = register.read(as_numpy=True)
+        register.write([5, 6, 7, 8])
+        register.read(as_numpy=True)
+        nt.assert_array_equal([1, 2, 3, 4], first)
+
+    def test_buffer_is_reused_between_calls(self):
+        register = self._create(DataType.U16)
+        for i in range(10):
+            register.write([i] * 4)
+            register.read()
+        self.assertEqual(1, distinct(self._nifpga.buffers))
+
+
+class FixpointArrayRegisterTest(unittest.TestCase):
+    def setUp(self):
+        self._nifpga = FakeNiFpga()
+        datatype = ArrayDatatype(FixpointDatatype("I4.4", 4, 4, True), 5)
+        self._register = _BoolArrayMappedRegister(
+            ctypes.c_uint32(1), self._nifpga,
+            FakeBitfileRegister("Coefficients", datatype, 5), 0)
+
+    def test_write_and_read(self):
+        coefficients = np.array([0.5, -0.25, 7.9375, -8, 0])
+        self._register.write(coefficients)
+        self.assertEqual(5, len(self._register))
+        nt.assert_array_equal(coefficients, self._register.read())
+        self.assertEqual({"WriteArrayBool": 1, "ReadArrayBool": 1}, self._nifpga.calls)
+
+
+class BoolArrayMappedRegisterTest(unittest.TestCase):
+    def setUp(self):
+        self._nifpga = FakeNiFpga()
+        # 25 fields of 8 bits, 200 bits in total
+        datatype = ClusterDatatype([("f%d" % i, FixpointDatatype("", 8, 0, True))
+                                    for i in range(25)])
+        self._register = _BoolArrayMappedRegister(
+            ctypes.c_uint32(1), self._nifpga,
+            FakeBitfileRegister("Cluster", datatype), 0)
+
+    def test_write_and_read(self):
+        value = dict(("f%d" % i, i - 12) for i in range(25))
+        for _ in range(3):
+            self._register.write(value)
+            result = self._register.read()
+        self.assertEqual(value, dict((k, v) for k, v in result.items()
+                                     if k != "__types__"))
+        self.assertEqual(1, distinct(self._nifpga.buffers))
+
+    def test_write_encodes_into_the_reused_buffer(self):
+        value = dict(("f%d" % i, i - 12) for i in range(25))
+        with mock.patch.object(ClusterDatatype, "toBoolArray",
+                               autospec=True,
+                               side_effect=ClusterDatatype.toBoolArray) as to_bool_array:
+            self._register.write(value)
+            self._register.write(value)
+        buf, _ = self._register._buffer.get()
+        for call in to_bool_array.call_args_list:
+            self.assertIs(buf, call[1]["out"])
+
+    def test_packed(self):
+        value = (1 << 199) | 0xBEEF
+        self._register.write_packed(value)
+        self.assertEqual(value, self._register.read_packed())
+        result = self._register.read()
+        self.assertEqual(-128, result.f0)
+        self.assertEqual(-66, result.f23)
+        self.assertEqual(-17, result.f24)
+
+    def test_packed_too_wide(self):
+        with self.assertRaises(AssertionError):
+            self._register.write_packed(1 << 200)
+
+
+class RegisterBufferTest(unittest.TestCase):
+    def setUp(self):
+        self._nifpga = FakeNiFpga()
+        self._register = _Register(ctypes.c_uint32(1), self._nifpga,
+                                   FakeBitfileRegister("U32", DataType.U32), 0)
+
+    def test_buffer_is_reused_between_calls(self):
+        for i in range(10):
+            self._register.write(i)
+            self.assertEqual(i, self._register.read())
+        self.assertEqual(1, distinct(self._nifpga.buffers))
+
+    def test_each_thread_gets_its_own_buffer(self):
+        def read_many():
+            for _ in range(10):
+                self._register.read()
+        threads = [threading.Thread(target=read_many) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(30, len(self._nifpga.buffers))
+        self.assertEqual(3, distinct(self._nifpga.buffers))
+
+
+class FifoTest(unittest.TestCase):
+    def setUp(self):
+        self._nifpga = FakeNiFpga()
+        self._fifo = _FIFO(ctypes.c_uint32(1), self._nifpga,
+                           FakeBitfileFifo("Fifo", DataType.I16))
+
+    def test_write_and_read(self):
+        self.assertEqual(1020, self._fifo.write([1, -2, 3, -4]))
+        result = self._fifo.read(3)
+        self.assertEqual([1, -2, 3], result.data)
+        self.assertEqual(1, result.elements_remaining)
+
+    def test_buffer_is_reused_and_grown_when_needed(self):
+        for _ in range(5):
+            self._fifo.write([1, 2])
+            self._fifo.read(2)
+        self.assertEqual(1, distinct(self._nifpga.buffers))
+        self._fifo.write(list(range(8)))
+        self.assertEqual(list(range(8)), self._fifo.read(8).data)
+        self.assertEqual(2, distinct(self._nifpga.buffers))
+
+    def test_read_timeout(self):
+        with self.assertRaises(FifoTimeoutError):
+            self._fifo.read(1)
+
+    def test_try_read(self):
+        self.assertIsNone(self._fifo.try_read(1))
+        self._fifo.write([5, 6])
+        result = self._fifo.try_read(1)
+        self.assertEqual([5], result.data)
+        self.assertEqual(1, result.elements_remaining)
+
+    def test_try_write(self):
+        self.assertEqual(0, self._fifo.try_write([0] * 1024))
+        self.assertIsNone(self._fifo.try_write([1]))
+        self.assertEqual(1024, len(self._nifpga.fifos[0]))
+
+    def test_try_read_raises_other_errors(self):
+        self._nifpga.fifos[0] = [1]
+        with mock.patch.object(self._fifo._read_func, "unchecked", return_value=-61141):
+            with self.assertRaises(nifpga.FpgaBusyError):
+                self._fifo.try_read(1)
+
+
+class FixpointFifoTest(unittest.TestCase):
+    def _create(self, datatype):
+        self._nifpga = FakeNiFpga()
+        return _FIFO(ctypes.c_uint32(1), self._nifpga,
+                     FakeBitfileFifo("Fifo", datatype))
+
+    def test_fixpoint_is_transferred_as_u64(self):
+        fifo = self._create(FixpointDatatype("I4.4", 4, 4, True))
+        fifo.write([0.5, -1])
+        self.assertEqual([0x08, 0xF0], self._nifpga.fifos[0])
+        self.assertEqual({"WriteFifoU64": 1}, self._nifpga.calls)
+        nt.assert_array_equal([0.5, -1], fifo.read(2).data)
+
+    def test_complex_fixpoint(self):
+        fifo = self._create(ComplexFixpointDatatype("C2.14", 2, 14))
+        iq = np.array([0.5 - 0.25j, -2 + 1.5j, 1.99993896484375j])
+        fifo.write(iq)
+        self.assertEqual(0x2000F000, self._nifpga.fifos[0][0])
+        data = fifo.read(3).data
+        self.assertEqual(np.complex128, data.dtype)
+        nt.assert_array_equal(iq, data)
+
+    def test_wider_than_64_bits(self):
+        with self.assertRaises(AssertionError):
+            self._create(ComplexFixpointDatatype("C16.24", 16, 24))
+
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self._nifpga = FakeNiFpga()
+        patcher = mock.patch("nifpga.session._get_nifpga", return_value=self._nifpga)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _open(self):
+        with TemporaryBitfile() as path:
+            return Session(path, "RIO0")
+
+    def test_registers_and_fifos_are_created_on_first_access(self):
+        session = self._open()
+        self.assertEqual({"Open": 1}, self._nifpga.calls)
+        self.assertEqual(set(["Input U32", "Input Array I16", "Fxp"]),
+                         set(session.registers.keys()))
+        self.assertEqual(2, len(session.fifos))
+        self.assertIn("Input U32", session.registers)
+        self.assertNotIn("Internal U8", session.registers)
+        self.assertEqual(0, len(session.registers._created))
+
+        register = session.registers["Input U32"]
+        self.assertIsInstance(register, _Register)
+        self.assertIs(register, session.registers["Input U32"])
+        self.assertEqual(1, len(session.registers._created))
+        self.assertEqual(0, len(session.fifos._created))
+
+        self.assertIsInstance(session.registers["Input Array I16"], _ArrayRegister)
+        self.assertIsInstance(session.registers["Fxp"], _BoolArrayMappedRegister)
+        self.assertIsInstance(session._internal_registers["Internal U8"], _Register)
+        self.assertIsInstance(session.fifos["FPGA to Host I64"], _FIFO)
+
+    def test_register_reads_and_writes_use_the_base_address(self):
+        session = self._open()
+        session.registers["Input U32"].write(7)
+        self.assertEqual({65536 + 0x10: 7}, self._nifpga.memory)
+        self.assertEqual(7, session.registers["Input U32"].read())
+
+    def test_wait_on_irqs(self):
+        session = self._open()
+        self._nifpga.irqs = 0b1001
+        self.assertEqual(([0, 3], False), tuple(session.wait_on_irqs([0, 1, 3], 0)))
+        self.assertEqual(([], True), tuple(session.wait_on_irqs(1, 0)))
+        self.assertEqual(2, self._nifpga.calls["UnreserveIrqContext"])
+
+    def test_try_wait_on_irqs(self):
+        session = self._open()
+        self._nifpga.irqs = 0b1001
+        self.assertEqual([3], session.try_wait_on_irqs([1, 3]))
+        self.assertIsNone(session.try_wait_on_irqs([1, 2]))
+        self.assertEqual(2, self._nifpga.calls["UnreserveIrqContext"])
+
+    def test_unknown_name(self):
+        session = self._open()
+        with self.assertRaises(KeyError):
+            session.registers["Nope"]
@@ -29,7 +29,7 @@ setup(name="nifpga",
       long_description=get_long_description(),
       version=get_version(),
       packages=find_packages(),
-      install_requires=['enum34', 'future'],
+      install_requires=['enum34'],
       package_data={'nifpga': ['VERSION']},
       author="National Instruments",
       url="https://github.com/ni/nifpga-python",
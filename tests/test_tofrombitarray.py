@@ -1,13 +1,16 @@
 import unittest
 import sys
 import os
+import mock
 import numpy as np
 import numpy.testing as nt
 
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from nifpga import FixpointDatatype, ComplexFixpointDatatype, ClusterDatatype
+from nifpga import FixpointDatatype, ComplexFixpointDatatype, ClusterDatatype, ArrayDatatype
+import nifpga.nifpga
+from nifpga.nifpga import _fixpointFromBoolMatrix, _fixpointWeights
 
 
 class TestFixpointToBitarray(unittest.TestCase):
@@ -132,6 +135,351 @@ class TestClusterDatatype(unittest.TestCase):
         self.assertEqual(V.e2, 128)
         self.assertEqual(V.e3, 1-1j)
 
+    def test_roundtrip_signed_and_64_bit_fields(self):
+        elements = [("small", FixpointDatatype("",4,2,True)),
+                    ("wide", FixpointDatatype("",64,0,False)),
+                    ("wide_signed", FixpointDatatype("",64,0,True)),
+                    ("z", ComplexFixpointDatatype("",8,16))]
+        C = ClusterDatatype(elements)
+        V = C.getEmptyValue()
+        V.small = -1.75
+        V.wide = 2**64 - 1
+        V.wide_signed = -2**63
+        V.z = -0.5+127.25j
+        result = C.fromBoolArray(C.toBoolArray(V))
+        self.assertEqual(-1.75, result.small)
+        self.assertEqual(2**64 - 1, result.wide)
+        self.assertEqual(-2**63, result.wide_signed)
+        self.assertEqual(-0.5+127.25j, result.z)
+        self.assertEqual(V.__types__, result.__types__)
+
+    def test_toBoolArray_into_out(self):
+        C = ClusterDatatype([("a", FixpointDatatype("",8,0,False)),
+                             ("b", FixpointDatatype("",8,0,True))])
+        out = np.ones(16, dtype=np.uint8)
+        self.assertIs(out, C.toBoolArray({"a": 3, "b": -1}, out=out))
+        nt.assert_array_equal([0,0,0,0,0,0,1,1] + [1]*8, out)
+
+    def test_element_without_fields(self):
+        elements = [("arr", ArrayDatatype(FixpointDatatype("",4,0,True), 2)),
+                    ("e", FixpointDatatype("",4,0,False))]
+        C = ClusterDatatype(elements)
+        result = C.fromBoolArray(C.toBoolArray({"arr": [-1, 2], "e": 9}))
+        nt.assert_array_equal([-1, 2], result.arr)
+        self.assertEqual(9, result.e)
+
+    def test_mismatching_fields(self):
+        C = ClusterDatatype([("a", FixpointDatatype("",8,0,False))])
+        with self.assertRaises(RuntimeError):
+            C.toBoolArray({"b": 1})
+
+
+class TestClusterBatch(unittest.TestCase):
+    def setUp(self):
+        self.C = ClusterDatatype([("flag", FixpointDatatype("Boolean",1,0,False)),
+                                  ("count", FixpointDatatype("",16,0,False)),
+                                  ("temp", FixpointDatatype("",8,8,True)),
+                                  ("wide", FixpointDatatype("",64,0,True)),
+                                  ("z", ComplexFixpointDatatype("",4,4))])
+
+    def test_structured_dtype(self):
+        dtype = self.C._return_numpy_dtype()
+        self.assertEqual(("flag", "count", "temp", "wide", "z"), dtype.names)
+        self.assertEqual(np.bool_, dtype["flag"])
+        self.assertEqual(np.uint64, dtype["count"])
+        self.assertEqual(np.float64, dtype["temp"])
+        self.assertEqual(np.int64, dtype["wide"])
+        self.assertEqual(np.complex128, dtype["z"])
+
+    def test_matches_single_codec(self):
+        values = np.zeros(3, dtype=self.C._return_numpy_dtype())
+        values["flag"] = [True, False, True]
+        values["count"] = [0, 65535, 42]
+        values["temp"] = [-128, 127.99609375, -0.5]
+        values["wide"] = [-2**63, 2**63 - 1, -1]
+        values["z"] = [-8+7.9375j, 0.0625j, -1]
+        bits = self.C.encode_batch(values)
+        self.assertEqual((3, self.C.num_bits), bits.shape)
+        for i in range(3):
+            single = self.C.getEmptyValue()
+            for name in values.dtype.names:
+                single[name] = values[name][i].item()
+            nt.assert_array_equal(self.C.toBoolArray(single), bits[i])
+        result = self.C.decode_batch(bits)
+        self.assertEqual(values.dtype, result.dtype)
+        nt.assert_array_equal(values, result)
+
+    def test_element_without_fields(self):
+        C = ClusterDatatype([("arr", ArrayDatatype(FixpointDatatype("",4,0,True), 2)),
+                             ("e", FixpointDatatype("",4,0,False))])
+        values = np.zeros(2, dtype=C._return_numpy_dtype())
+        values["arr"] = [[1, -2], [-8, 7]]
+        values["e"] = [3, 15]
+        nt.assert_array_equal(values, C.decode_batch(C.encode_batch(values)))
+
+
+class TestNestedCluster(unittest.TestCase):
+    def setUp(self):
+        self.limits = ClusterDatatype([("low", FixpointDatatype("",16,0,True)),
+                                       ("high", FixpointDatatype("",8,0,False))])
+        self.C = ClusterDatatype([("gain", FixpointDatatype("",4,12,True)),
+                                  ("limits", self.limits),
+                                  ("taps", ArrayDatatype(FixpointDatatype("",2,6,True), 3))])
+        self.table = ArrayDatatype(self.C, 2)
+        self.rows = [{"gain": -0.25, "limits": {"low": -300, "high": 200}, "taps": [0.5, -1, 0]},
+                     {"gain": 7.5, "limits": {"low": 5, "high": 0}, "taps": [1.984375, -2, 0.015625]}]
+
+    def _check_row(self, expected, actual):
+        self.assertEqual(expected["gain"], actual["gain"])
+        self.assertEqual(expected["limits"]["low"], actual["limits"]["low"])
+        self.assertEqual(expected["limits"]["high"], actual["limits"]["high"])
+        nt.assert_array_equal(expected["taps"], actual["taps"])
+
+    def test_nested_structured_dtype(self):
+        dtype = self.table._return_numpy_dtype()
+        self.assertEqual((2,), dtype.shape)
+        self.assertEqual(("low", "high"), dtype.base["limits"].names)
+        self.assertEqual((3,), dtype.base["taps"].shape)
+
+    def test_single_value(self):
+        value = self.C.getEmptyValue()
+        value.limits.low = -1
+        self.assertEqual(-1, self.C.fromBoolArray(self.C.toBoolArray(value)).limits.low)
+        row = self.rows[1]
+        self._check_row(row, self.C.fromBoolArray(self.C.toBoolArray(row)))
+
+    def test_array_of_clusters(self):
+        bits = self.table.toBoolArray(self.rows)
+        self.assertEqual(2 * self.C.num_bits, len(bits))
+        result = self.table.fromBoolArray(bits)
+        self.assertEqual(self.C._return_numpy_dtype(), result.dtype)
+        for expected, actual in zip(self.rows, result):
+            self._check_row(expected, actual)
+        nt.assert_array_equal(bits, self.table.toBoolArray(result))
+
+    def test_batch_of_arrays_of_clusters(self):
+        bits = self.table.encode_batch([self.rows, self.rows[::-1]])
+        result = self.table.decode_batch(bits)
+        self.assertEqual((2, 2), result.shape)
+        self._check_row(self.rows[0], result[1, 1])
+        nt.assert_array_equal(bits, self.table.encode_batch(result))
+
+
+class TestChunkedBatch(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(nifpga.nifpga, "_MIN_CHUNK_SIZE", 16)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _check(self, datatype, bits, **kwargs):
+        expected = datatype.decode_batch(bits, **kwargs)
+        result = datatype.decode_batch(bits, max_workers=3, **kwargs)
+        self.assertEqual(expected.dtype, result.dtype)
+        nt.assert_array_equal(expected, result)
+        nt.assert_array_equal(bits, datatype.encode_batch(result, max_workers=3))
+
+    def _random_bits(self, datatype, n=1000):
+        return np.random.RandomState(0).randint(0, 2, (n, datatype.num_bits)).astype(np.uint8)
+
+    def test_fixpoint(self):
+        F = FixpointDatatype("", 20, 12, True)
+        self._check(F, self._random_bits(F))
+
+    def test_complex(self):
+        Z = ComplexFixpointDatatype("", 4, 4)
+        self._check(Z, self._random_bits(Z), dtype=np.complex64)
+
+    def test_cluster(self):
+        C = ClusterDatatype([("a", FixpointDatatype("", 8, 24, True)),
+                             ("b", FixpointDatatype("", 20, 0, False)),
+                             ("z", ComplexFixpointDatatype("", 4, 20))])
+        self._check(C, self._random_bits(C))
+
+    def test_small_batches_are_not_split(self):
+        F = FixpointDatatype("", 8, 0, False)
+        with mock.patch.object(F, "_decode_batch", wraps=F._decode_batch) as decode:
+            F.decode_batch(self._random_bits(F, 31), max_workers=4)
+            self.assertEqual(1, decode.call_count)
+            F.decode_batch(self._random_bits(F, 32), max_workers=4)
+            self.assertEqual(3, decode.call_count)
+
+
+class TestFixpointRoundtrip(unittest.TestCase):
+    def _roundtrip(self, integer, fractional, signed, values):
+        F = FixpointDatatype("bla", integer, fractional, signed)
+        for value in values:
+            boolarray = F.toBoolArray(value)
+            self.assertEqual(len(boolarray), F.num_bits)
+            self.assertEqual(F.fromBoolArray(boolarray), value)
+
+    def test_64_bits_are_exact(self):
+        self._roundtrip(64, 0, False, [0, 1, 2**63, 2**64 - 1])
+        self._roundtrip(64, 0, True, [-2**63, -1, 0, 2**63 - 1])
+
+    def test_fractional(self):
+        self._roundtrip(1, 15, True, [-1, -0.5, 2**-15, 1 - 2**-15])
+        self._roundtrip(-3, 15, True, [2**-15, -2**-4])
+
+    def test_negative_fractional(self):
+        self._roundtrip(10, -2, False, [0, 4, 1020])
+
+    def test_rounds_to_nearest(self):
+        F = FixpointDatatype("bla", 4, 2, True)
+        self.assertEqual(F.fromBoolArray(F.toBoolArray(0.3)), 0.25)
+        self.assertEqual(F.fromBoolArray(F.toBoolArray(-0.7)), -0.75)
+
+
+class TestBatchCodec(unittest.TestCase):
+    def _roundtrip(self, F, values):
+        matrix = F.encode_batch(values)
+        self.assertEqual(matrix.shape, (len(values), F.num_bits))
+        self.assertEqual(matrix.dtype, np.uint8)
+        for row, value in zip(matrix, values):
+            nt.assert_array_equal(row, F.toBoolArray(value))
+        nt.assert_array_equal(F.decode_batch(matrix), values)
+
+    def test_signed_fraction(self):
+        self._roundtrip(FixpointDatatype("", 4, 4, True),
+                        np.array([0, 0.25, -0.5, 7.9375, -8]))
+
+    def test_unsigned_integer(self):
+        self._roundtrip(FixpointDatatype("", 8, 0, False), np.array([0, 1, 128, 255]))
+
+    def test_64_bits(self):
+        F = FixpointDatatype("", 64, 0, True)
+        values = np.array([-2**63, -1, 0, 2**63 - 1], dtype=np.int64)
+        nt.assert_array_equal(F.decode_batch(F.encode_batch(values)), values)
+        F = FixpointDatatype("", 64, 0, False)
+        values = np.array([0, 2**64 - 1], dtype=np.uint64)
+        nt.assert_array_equal(F.decode_batch(F.encode_batch(values)), values)
+
+    def test_negative_integer_word_length(self):
+        self._roundtrip(FixpointDatatype("", -3, 15, True), np.array([2**-15, 3 * 2**-10, -2**-4]))
+
+    def test_complex(self):
+        self._roundtrip(ComplexFixpointDatatype("", 2, 3), np.array([0.5+0.25j, 1-1j, -2+0j]))
+
+    def test_unsigned_negative(self):
+        with self.assertRaises(RuntimeError):
+            FixpointDatatype("", 8, 0, False).encode_batch([1, -1])
+
+
+class TestComplexBatchCodec(unittest.TestCase):
+    def _check(self, Z, values):
+        bits = Z.encode_batch(values)
+        for value, row in zip(values, bits):
+            nt.assert_array_equal(Z.toBoolArray(value), row)
+        result = Z.decode_batch(bits)
+        self.assertEqual(np.complex128, result.dtype)
+        nt.assert_array_equal(values, result)
+        result64 = Z.decode_batch(bits, dtype=np.complex64)
+        self.assertEqual(np.complex64, result64.dtype)
+        nt.assert_allclose(values, result64, rtol=1e-6)
+        nt.assert_array_equal(values, Z.decode_words(Z.encode_words(values)))
+
+    def test_narrow(self):
+        self._check(ComplexFixpointDatatype("", 2, 6), np.array([-2+1.984375j, 0.015625-0.5j, 0]))
+
+    def test_wide(self):
+        self._check(ComplexFixpointDatatype("", 4, 28), np.array([-8+7.5j, 2**-28-3j]))
+
+    def test_toBoolArray_layout(self):
+        Z = ComplexFixpointDatatype("", 2, 0)
+        nt.assert_array_equal([0, 1, 1, 1], Z.toBoolArray(1-1j))
+
+    def test_words(self):
+        Z = ComplexFixpointDatatype("", 4, 4)
+        nt.assert_array_equal([0x10F8], Z.encode_words([1-0.5j]))
+
+
+class TestFixpointWords(unittest.TestCase):
+    def test_roundtrip(self):
+        F = FixpointDatatype("", 8, 16, True)
+        values = np.array([-128, 127.5, 2**-16, 0])
+        words = F.encode_words(values)
+        self.assertEqual(0x800000, words[0])
+        nt.assert_array_equal(values, F.decode_words(words))
+
+    def test_ignores_high_bits(self):
+        F = FixpointDatatype("", 4, 0, False)
+        nt.assert_array_equal([15, 1], F.decode_words([0xFF, 0x11]))
+
+
+class TestFixpointLookupTable(unittest.TestCase):
+    def _all_bits(self, num_bits):
+        integers = np.arange(2**num_bits, dtype=np.uint64)
+        return (np.bitwise_and(integers[:, None], _fixpointWeights(num_bits)) != 0).astype(np.uint8)
+
+    def _check_matches_arithmetic(self, integer, fractional, signed):
+        F = FixpointDatatype("", integer, fractional, signed)
+        bits = self._all_bits(F.num_bits)
+        expected = _fixpointFromBoolMatrix(fractional, signed, F._weights, bits)
+        self.assertIsNotNone(F._lookup_table())
+        nt.assert_array_equal(expected, F.decode_batch(bits))
+        nt.assert_array_equal(bits, F.encode_batch(expected))
+        for row, value in zip(bits[::37], expected[::37].tolist()):
+            self.assertEqual(value, F.fromBoolArray(row))
+            nt.assert_array_equal(row, F.toBoolArray(value))
+
+    def test_signed_fraction(self):
+        self._check_matches_arithmetic(8, 8, True)
+
+    def test_unsigned_odd_width(self):
+        self._check_matches_arithmetic(5, 0, False)
+
+    def test_negative_integer_word_length(self):
+        self._check_matches_arithmetic(-2, 12, True)
+
+    def test_boolean(self):
+        self._check_matches_arithmetic(1, 0, False)
+
+    def test_complex(self):
+        Z = ComplexFixpointDatatype("", 3, 4)
+        values = np.array([-4+3.9375j, 0.0625-0.0625j, 0])
+        nt.assert_array_equal(values, Z.decode_batch(Z.encode_batch(values)))
+        self.assertEqual(-4+3.9375j, Z.fromBoolArray(Z.toBoolArray(-4+3.9375j)))
+
+    def test_shared_between_datatypes(self):
+        self.assertIs(FixpointDatatype("a", 4, 4, True)._lookup_table(),
+                      FixpointDatatype("b", 4, 4, True)._lookup_table())
+
+    def test_wide_types_have_no_table(self):
+        self.assertIsNone(FixpointDatatype("", 16, 1, True)._lookup_table())
+        self.assertIsNone(ComplexFixpointDatatype("", 16, 16)._lookup_table())
+
+    def test_cache_is_capped_by_bytes(self):
+        size = nifpga.nifpga._fixpointTable(12, 3, True).nbytes
+        with mock.patch.object(nifpga.nifpga, "_FIXPOINT_TABLE_CACHE_BYTES", 2 * size):
+            for fractional in range(4, 8):
+                nifpga.nifpga._fixpointTable(12, fractional, True)
+            tables = nifpga.nifpga._fixpoint_tables
+            self.assertLessEqual(sum(table.nbytes for table in tables.values()), 2 * size)
+            self.assertIn((12, 7, True), tables)
+
+    def test_returned_bits_are_writeable(self):
+        bits = FixpointDatatype("", 4, 0, False).toBoolArray(3)
+        bits[0] = 1
+        nt.assert_array_equal([1, 0, 1, 1], bits)
+
+
+class TestArrayDatatype(unittest.TestCase):
+    def test_roundtrip(self):
+        A = ArrayDatatype(FixpointDatatype("", 2, 6, True), 3)
+        self.assertEqual(A.num_bits, 24)
+        boolarray = A.toBoolArray([0.5, -0.25, 1.015625])
+        nt.assert_array_equal(boolarray[:8], [0, 0, 1, 0, 0, 0, 0, 0])
+        nt.assert_array_equal(A.fromBoolArray(boolarray), [0.5, -0.25, 1.015625])
+
+    def test_complex_elements(self):
+        A = ArrayDatatype(ComplexFixpointDatatype("", 4, 4), 2)
+        result = A.fromBoolArray(A.toBoolArray([1+0.5j, -0.25j]))
+        self.assertEqual(result.dtype, np.complex128)
+        nt.assert_array_equal(result, [1+0.5j, -0.25j])
+
+    def test_bad_length(self):
+        A = ArrayDatatype(FixpointDatatype("", 2, 6, True), 3)
+        with self.assertRaises(RuntimeError):
+            A.toBoolArray([0.5])
 
 
 if __name__ == '__main__':